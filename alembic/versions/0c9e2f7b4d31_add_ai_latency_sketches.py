@@ -0,0 +1,55 @@
+"""add_ai_latency_sketches
+
+Revision ID: 0c9e2f7b4d31
+Revises: d5b7e3a1c920
+Create Date: 2026-10-19 18:30:54.771902
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0c9e2f7b4d31'
+down_revision: Union[str, None] = 'd5b7e3a1c920'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('ai_latency_sketches',
+    sa.Column('business_id', sa.Integer(), nullable=False),
+    sa.Column('bucket_start', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('response_source', sa.String(), nullable=False),
+    sa.Column('count', sa.BigInteger(), nullable=False),
+    sa.Column('sum_ms', sa.Float(), nullable=False),
+    sa.Column('min_ms', sa.Float(), nullable=True),
+    sa.Column('max_ms', sa.Float(), nullable=True),
+    sa.Column('bins', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+    sa.ForeignKeyConstraint(['business_id'], ['businesses.id'], ),
+    sa.PrimaryKeyConstraint('business_id', 'bucket_start', 'response_source')
+    )
+    # Sketch merge = per-bin sum; used by the upsert so concurrent workers never lose counts
+    op.execute("""
+        CREATE FUNCTION latency_sketch_merge(a jsonb, b jsonb) RETURNS jsonb
+        LANGUAGE sql IMMUTABLE AS $$
+            SELECT coalesce(jsonb_object_agg(key, total), '{}'::jsonb)
+            FROM (
+                SELECT key, sum(value::bigint) AS total
+                FROM (
+                    SELECT * FROM jsonb_each_text(coalesce(a, '{}'::jsonb))
+                    UNION ALL
+                    SELECT * FROM jsonb_each_text(coalesce(b, '{}'::jsonb))
+                ) bins
+                GROUP BY key
+            ) merged
+        $$
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP FUNCTION latency_sketch_merge(jsonb, jsonb)")
+    op.drop_table('ai_latency_sketches')
@@ -0,0 +1,55 @@
+"""add_catalog_sync_jobs
+
+Revision ID: 2d7e5a9c1f63
+Revises: 6f2b9d4e7a58
+Create Date: 2026-10-19 21:27:40.665284
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2d7e5a9c1f63'
+down_revision: Union[str, None] = '6f2b9d4e7a58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('catalog_sync_jobs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('integration_id', sa.Integer(), nullable=False),
+    sa.Column('business_id', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('full', sa.Boolean(), nullable=True),
+    sa.Column('mode', sa.String(), nullable=True),
+    sa.Column('pages_fetched', sa.Integer(), nullable=False),
+    sa.Column('products_fetched', sa.Integer(), nullable=False),
+    sa.Column('products_total', sa.Integer(), nullable=True),
+    sa.Column('inserted', sa.Integer(), nullable=False),
+    sa.Column('updated', sa.Integer(), nullable=False),
+    sa.Column('unchanged', sa.Integer(), nullable=False),
+    sa.Column('deactivated', sa.Integer(), nullable=False),
+    sa.Column('cancel_requested', sa.Boolean(), nullable=False),
+    sa.Column('error', sa.String(), nullable=True),
+    sa.Column('worker', sa.String(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('started_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('heartbeat_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['business_id'], ['businesses.id'], ),
+    sa.ForeignKeyConstraint(['integration_id'], ['ecommerce_configs.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(
+        'uq_catalog_sync_jobs_active_integration', 'catalog_sync_jobs', ['integration_id'],
+        unique=True, postgresql_where=sa.text("status IN ('queued', 'running')")
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('uq_catalog_sync_jobs_active_integration', table_name='catalog_sync_jobs')
+    op.drop_table('catalog_sync_jobs')
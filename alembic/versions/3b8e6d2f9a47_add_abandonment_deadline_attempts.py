@@ -0,0 +1,26 @@
+"""add_abandonment_deadline_attempts
+
+Revision ID: 3b8e6d2f9a47
+Revises: 7c4a1e9b3f20
+Create Date: 2026-10-19 23:12:08.540193
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b8e6d2f9a47'
+down_revision: Union[str, None] = '7c4a1e9b3f20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('cart_abandonment_deadlines', sa.Column('attempts', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('cart_abandonment_deadlines', 'attempts')
@@ -0,0 +1,38 @@
+"""unique_customer_lifetime_values
+
+Revision ID: 3f8b1c6d5e27
+Revises: 7d2c5e9a4b18
+Create Date: 2026-10-19 16:11:45.902377
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f8b1c6d5e27'
+down_revision: Union[str, None] = '7d2c5e9a4b18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Keep the most recent row per customer before adding the constraint
+    op.execute("""
+        DELETE FROM customer_lifetime_values c
+        USING customer_lifetime_values newer
+        WHERE c.business_id = newer.business_id
+          AND c.user_phone = newer.user_phone
+          AND c.id < newer.id
+    """)
+    op.create_unique_constraint(
+        'uq_customer_lifetime_values_business_phone',
+        'customer_lifetime_values',
+        ['business_id', 'user_phone']
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint('uq_customer_lifetime_values_business_phone', 'customer_lifetime_values', type_='unique')
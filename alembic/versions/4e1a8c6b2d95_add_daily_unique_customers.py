@@ -0,0 +1,51 @@
+"""add_daily_unique_customers
+
+Revision ID: 4e1a8c6b2d95
+Revises: b8d1f4a6c372
+Create Date: 2026-10-19 19:48:02.116530
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4e1a8c6b2d95'
+down_revision: Union[str, None] = 'b8d1f4a6c372'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('analytics_daily_uniques',
+    sa.Column('business_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('channel', sa.String(), nullable=False),
+    sa.Column('registers', sa.LargeBinary(), nullable=False),
+    sa.ForeignKeyConstraint(['business_id'], ['businesses.id'], ),
+    sa.PrimaryKeyConstraint('business_id', 'day', 'channel')
+    )
+    # HyperLogLog merge = per-register max; used by the upsert so concurrent workers never lose counts
+    op.execute("""
+        CREATE FUNCTION hll_merge(a bytea, b bytea) RETURNS bytea
+        LANGUAGE sql IMMUTABLE AS $$
+            SELECT CASE
+                WHEN a IS NULL THEN b
+                WHEN b IS NULL THEN a
+                ELSE (
+                    SELECT string_agg(
+                        set_byte('\\x00'::bytea, 0, greatest(get_byte(a, i), get_byte(b, i))),
+                        ''::bytea ORDER BY i
+                    )
+                    FROM generate_series(0, length(a) - 1) AS i
+                )
+            END
+        $$
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP FUNCTION hll_merge(bytea, bytea)")
+    op.drop_table('analytics_daily_uniques')
@@ -0,0 +1,55 @@
+"""add_hot_path_cart_indexes
+
+Revision ID: 5e8a1f0c7d24
+Revises: c41d7e2a9b13
+Create Date: 2026-10-19 11:03:27.540112
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e8a1f0c7d24'
+down_revision: Union[str, None] = 'c41d7e2a9b13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_carts_active_business_phone', 'carts', ['business_id', 'user_phone'],
+            unique=False,
+            postgresql_where=sa.text('is_active'),
+            postgresql_concurrently=True
+        )
+        op.create_index(
+            'ix_carts_recovery_scan', 'carts', ['last_interaction'],
+            unique=False,
+            postgresql_include=['last_notified_at'],
+            postgresql_where=sa.text("is_active AND status = 'active'"),
+            postgresql_concurrently=True
+        )
+        op.create_index(
+            op.f('ix_cart_items_cart_id'), 'cart_items', ['cart_id'],
+            unique=False,
+            postgresql_concurrently=True
+        )
+        op.create_index(
+            'ix_products_business_active_stock', 'products', ['business_id', 'stock'],
+            unique=False,
+            postgresql_where=sa.text('is_active'),
+            postgresql_concurrently=True
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_products_business_active_stock', table_name='products', postgresql_concurrently=True)
+        op.drop_index(op.f('ix_cart_items_cart_id'), table_name='cart_items', postgresql_concurrently=True)
+        op.drop_index('ix_carts_recovery_scan', table_name='carts', postgresql_concurrently=True)
+        op.drop_index('ix_carts_active_business_phone', table_name='carts', postgresql_concurrently=True)
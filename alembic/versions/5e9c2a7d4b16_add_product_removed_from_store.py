@@ -0,0 +1,28 @@
+"""add_product_removed_from_store
+
+Revision ID: 5e9c2a7d4b16
+Revises: 3b8e6d2f9a47
+Create Date: 2026-10-20 09:41:27.604318
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e9c2a7d4b16'
+down_revision: Union[str, None] = '3b8e6d2f9a47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Which inactive synced products a full sync turned off cannot be told
+    # apart from merchant choices: existing inactive products stay off
+    op.add_column('products', sa.Column('removed_from_store', sa.Boolean(), server_default=sa.text('false'), nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('products', 'removed_from_store')
@@ -0,0 +1,28 @@
+"""add_ecommerce_sync_cursor
+
+Revision ID: 6f2b9d4e7a58
+Revises: 9a3c6e2f8d14
+Create Date: 2026-10-19 20:54:13.208671
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6f2b9d4e7a58'
+down_revision: Union[str, None] = '9a3c6e2f8d14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('ecommerce_configs', sa.Column('sync_cursor', sa.DateTime(timezone=True), nullable=True))
+    op.add_column('ecommerce_configs', sa.Column('last_full_sync_at', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('ecommerce_configs', 'last_full_sync_at')
+    op.drop_column('ecommerce_configs', 'sync_cursor')
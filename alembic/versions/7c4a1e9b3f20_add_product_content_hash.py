@@ -0,0 +1,29 @@
+"""add_product_content_hash
+
+Revision ID: 7c4a1e9b3f20
+Revises: 2d7e5a9c1f63
+Create Date: 2026-10-19 22:04:51.318027
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c4a1e9b3f20'
+down_revision: Union[str, None] = '2d7e5a9c1f63'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Existing rows start without a hash: the next sync writes each of them once
+    op.add_column('products', sa.Column('content_hash', sa.String(length=64), nullable=True))
+    op.add_column('ecommerce_configs', sa.Column('catalog_version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('ecommerce_configs', 'catalog_version')
+    op.drop_column('products', 'content_hash')
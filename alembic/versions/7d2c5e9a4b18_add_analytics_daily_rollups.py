@@ -0,0 +1,50 @@
+"""add_analytics_daily_rollups
+
+Revision ID: 7d2c5e9a4b18
+Revises: e27c4b9f1a06
+Create Date: 2026-10-19 15:02:31.448210
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7d2c5e9a4b18'
+down_revision: Union[str, None] = 'e27c4b9f1a06'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('analytics_daily_events',
+    sa.Column('business_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('event_type', postgresql.ENUM(name='eventtype', create_type=False), nullable=False),
+    sa.Column('event_count', sa.Integer(), nullable=False),
+    sa.Column('cart_value_sum', sa.Float(), nullable=False),
+    sa.Column('recovery_hours_sum', sa.Float(), nullable=False),
+    sa.Column('recovery_hours_count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['business_id'], ['businesses.id'], ),
+    sa.PrimaryKeyConstraint('business_id', 'day', 'event_type')
+    )
+    op.create_table('analytics_daily_ai',
+    sa.Column('business_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('response_source', sa.String(), nullable=False),
+    sa.Column('interactions', sa.Integer(), nullable=False),
+    sa.Column('conversions', sa.Integer(), nullable=False),
+    sa.Column('response_time_sum', sa.Float(), nullable=False),
+    sa.Column('response_time_count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['business_id'], ['businesses.id'], ),
+    sa.PrimaryKeyConstraint('business_id', 'day', 'response_source')
+    )
+    # Populate from existing events: python scripts/reconcile_analytics_rollups.py --days 3650
+
+
+def downgrade() -> None:
+    op.drop_table('analytics_daily_ai')
+    op.drop_table('analytics_daily_events')
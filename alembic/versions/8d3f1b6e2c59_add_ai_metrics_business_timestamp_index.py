@@ -0,0 +1,43 @@
+"""add_ai_metrics_business_timestamp_index
+
+Revision ID: 8d3f1b6e2c59
+Revises: 5e9c2a7d4b16
+Create Date: 2026-10-20 10:18:52.907164
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d3f1b6e2c59'
+down_revision: Union[str, None] = '5e9c2a7d4b16'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+TABLE = 'ai_performance_metrics'
+INDEX = 'ix_ai_performance_metrics_business_timestamp'
+DEFINITION = '(business_id, "timestamp")'
+
+
+def upgrade() -> None:
+    # Same as b8d1f4a6c372: parent index ON ONLY, partitions built concurrently and attached
+    with op.get_context().autocommit_block():
+        op.execute(f'CREATE INDEX IF NOT EXISTS {INDEX} ON ONLY {TABLE} {DEFINITION}')
+
+        partitions = op.get_bind().execute(sa.text(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = CAST(:table AS regclass)"
+        ), {"table": TABLE}).scalars().all()
+
+        for partition in partitions:
+            name = f'{partition}_business_timestamp_idx'
+            op.execute(f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {partition} {DEFINITION}')
+            op.execute(f'ALTER INDEX {INDEX} ATTACH PARTITION {name}')
+
+
+def downgrade() -> None:
+    op.execute(f'DROP INDEX IF EXISTS {INDEX}')
@@ -0,0 +1,49 @@
+"""unique_product_external_identity
+
+Revision ID: 9a3c6e2f8d14
+Revises: 4e1a8c6b2d95
+Create Date: 2026-10-19 20:21:48.530917
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9a3c6e2f8d14'
+down_revision: Union[str, None] = '4e1a8c6b2d95'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Earlier syncs could create the same external product twice: keep the
+    # oldest row, point cart items at it, then drop the copies
+    op.execute("""
+        CREATE TEMP TABLE product_duplicates ON COMMIT DROP AS
+        SELECT p.id AS duplicate_id, keep.id AS keep_id
+        FROM products p
+        JOIN LATERAL (
+            SELECT min(k.id) AS id FROM products k
+            WHERE k.business_id = p.business_id
+              AND k.provider = p.provider
+              AND k.external_id = p.external_id
+        ) keep ON keep.id < p.id
+        WHERE p.external_id IS NOT NULL AND p.provider IS NOT NULL
+    """)
+    op.execute("""
+        UPDATE cart_items ci SET product_id = d.keep_id
+        FROM product_duplicates d WHERE ci.product_id = d.duplicate_id
+    """)
+    op.execute("DELETE FROM products p USING product_duplicates d WHERE p.id = d.duplicate_id")
+    op.create_unique_constraint(
+        'uq_products_business_provider_external',
+        'products',
+        ['business_id', 'provider', 'external_id']
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint('uq_products_business_provider_external', 'products', type_='unique')
@@ -0,0 +1,39 @@
+"""add_customer_purchase_summaries
+
+Revision ID: 9b3f6d2e8a51
+Revises: 5e8a1f0c7d24
+Create Date: 2026-10-19 12:27:09.884120
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9b3f6d2e8a51'
+down_revision: Union[str, None] = '5e8a1f0c7d24'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('customer_purchase_summaries',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('business_id', sa.Integer(), nullable=False),
+    sa.Column('user_phone', sa.String(), nullable=False),
+    sa.Column('total_purchases', sa.Integer(), nullable=False),
+    sa.Column('total_spent', sa.Float(), nullable=False),
+    sa.Column('first_purchase_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('last_purchase_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['business_id'], ['businesses.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('business_id', 'user_phone', name='uq_customer_purchase_summaries_business_phone')
+    )
+    # Populate from existing carts: python scripts/backfill_purchase_summaries.py
+
+
+def downgrade() -> None:
+    op.drop_table('customer_purchase_summaries')
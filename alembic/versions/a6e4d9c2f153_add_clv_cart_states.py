@@ -0,0 +1,33 @@
+"""add_clv_cart_states
+
+Revision ID: a6e4d9c2f153
+Revises: 3f8b1c6d5e27
+Create Date: 2026-10-19 16:58:12.530914
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a6e4d9c2f153'
+down_revision: Union[str, None] = '3f8b1c6d5e27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('clv_cart_states',
+    sa.Column('cart_id', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['cart_id'], ['carts.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('cart_id')
+    )
+    # Seeded per business by python scripts/recompute_clv.py
+
+
+def downgrade() -> None:
+    op.drop_table('clv_cart_states')
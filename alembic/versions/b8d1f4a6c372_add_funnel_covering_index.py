@@ -0,0 +1,46 @@
+"""add_funnel_covering_index
+
+Revision ID: b8d1f4a6c372
+Revises: 0c9e2f7b4d31
+Create Date: 2026-10-19 19:12:37.403815
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8d1f4a6c372'
+down_revision: Union[str, None] = '0c9e2f7b4d31'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+TABLE = 'cart_recovery_events'
+INDEX = 'ix_cart_recovery_events_business_timestamp'
+DEFINITION = '(business_id, "timestamp") INCLUDE (event_type, cart_id, user_phone)'
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY is not supported on a partitioned table:
+    # create the parent index ON ONLY (invalid, instant), build each
+    # partition's index concurrently and attach it. The parent index becomes
+    # valid once every partition is attached.
+    with op.get_context().autocommit_block():
+        op.execute(f'CREATE INDEX IF NOT EXISTS {INDEX} ON ONLY {TABLE} {DEFINITION}')
+
+        partitions = op.get_bind().execute(sa.text(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = CAST(:table AS regclass)"
+        ), {"table": TABLE}).scalars().all()
+
+        for partition in partitions:
+            name = f'{partition}_business_timestamp_idx'
+            op.execute(f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {partition} {DEFINITION}')
+            op.execute(f'ALTER INDEX {INDEX} ATTACH PARTITION {name}')
+
+
+def downgrade() -> None:
+    op.execute(f'DROP INDEX IF EXISTS {INDEX}')
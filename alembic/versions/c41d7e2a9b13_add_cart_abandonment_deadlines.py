@@ -0,0 +1,35 @@
+"""add_cart_abandonment_deadlines
+
+Revision ID: c41d7e2a9b13
+Revises: 3098336b4bc4
+Create Date: 2026-10-19 10:12:41.318205
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c41d7e2a9b13'
+down_revision: Union[str, None] = '3098336b4bc4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('cart_abandonment_deadlines',
+    sa.Column('cart_id', sa.Integer(), nullable=False),
+    sa.Column('business_id', sa.Integer(), nullable=False),
+    sa.Column('deadline_at', sa.DateTime(timezone=True), nullable=False),
+    sa.ForeignKeyConstraint(['business_id'], ['businesses.id'], ),
+    sa.ForeignKeyConstraint(['cart_id'], ['carts.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('cart_id')
+    )
+    op.create_index(op.f('ix_cart_abandonment_deadlines_deadline_at'), 'cart_abandonment_deadlines', ['deadline_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_cart_abandonment_deadlines_deadline_at'), table_name='cart_abandonment_deadlines')
+    op.drop_table('cart_abandonment_deadlines')
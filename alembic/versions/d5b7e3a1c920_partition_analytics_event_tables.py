@@ -0,0 +1,108 @@
+"""partition_analytics_event_tables
+
+Revision ID: d5b7e3a1c920
+Revises: a6e4d9c2f153
+Create Date: 2026-10-19 17:42:06.318245
+
+"""
+from datetime import datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd5b7e3a1c920'
+down_revision: Union[str, None] = 'a6e4d9c2f153'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# table -> (single-column indexes, foreign keys)
+TABLES = {
+    'cart_recovery_events': (
+        ['business_id', 'event_type', 'id', 'timestamp', 'user_phone'],
+        [('business_id', 'businesses'), ('cart_id', 'carts')],
+    ),
+    'ai_performance_metrics': (
+        ['business_id', 'id', 'timestamp', 'user_phone'],
+        [('business_id', 'businesses')],
+    ),
+}
+
+
+def _months_from_now(n: int) -> str:
+    now = datetime.utcnow()
+    year, month = divmod(now.month - 1 + n, 12)
+    return f"{now.year + year:04d}-{month + 1:02d}-01 00:00:00+00"
+
+
+def upgrade() -> None:
+    # The existing table is kept as-is and attached as the partition holding
+    # everything before next month; new months get their own partitions.
+    # Nothing is rewritten: the scans below only validate, under locks that
+    # still allow writes, so ATTACH can skip its own validation scan.
+    boundary = _months_from_now(1)
+
+    with op.get_context().autocommit_block():
+        for table in TABLES:
+            op.execute(f'UPDATE {table} SET "timestamp" = now() WHERE "timestamp" IS NULL')
+            op.execute(
+                f'ALTER TABLE {table} ADD CONSTRAINT {table}_legacy_range '
+                f'CHECK ("timestamp" IS NOT NULL AND "timestamp" < \'{boundary}\') NOT VALID'
+            )
+            op.execute(f'ALTER TABLE {table} VALIDATE CONSTRAINT {table}_legacy_range')
+            op.execute(f'CREATE UNIQUE INDEX CONCURRENTLY {table}_legacy_pkey_ts ON {table} (id, "timestamp")')
+
+    # Short exclusive section: renames, empty parent, attach
+    for table, (indexes, foreign_keys) in TABLES.items():
+        legacy = f'{table}_legacy'
+        op.execute(f'ALTER TABLE {table} ALTER COLUMN "timestamp" SET NOT NULL')  # implied by the valid CHECK
+        op.execute(f'ALTER TABLE {table} RENAME TO {legacy}')
+        for column in indexes:
+            op.execute(f'ALTER INDEX ix_{table}_{column} RENAME TO ix_{legacy}_{column}')
+        op.execute(f'ALTER TABLE {legacy} DROP CONSTRAINT {table}_pkey')
+        op.execute(f'ALTER TABLE {legacy} ADD CONSTRAINT {legacy}_pkey PRIMARY KEY USING INDEX {table}_legacy_pkey_ts')
+
+        op.execute(f'CREATE TABLE {table} (LIKE {legacy} INCLUDING DEFAULTS) PARTITION BY RANGE ("timestamp")')
+        op.execute(f'ALTER TABLE {table} ADD CONSTRAINT {table}_pkey PRIMARY KEY (id, "timestamp")')
+        for column, target in foreign_keys:
+            op.execute(
+                f'ALTER TABLE {table} ADD CONSTRAINT {table}_{column}_fkey '
+                f'FOREIGN KEY ({column}) REFERENCES {target} (id)'
+            )
+        for column in indexes:
+            op.execute(f'CREATE INDEX ix_{table}_{column} ON {table} ("{column}")')
+        op.execute(f'ALTER SEQUENCE {table}_id_seq OWNED BY {table}.id')
+
+        # Matching indexes, PK and foreign keys of the legacy table are reused
+        op.execute(f"ALTER TABLE {table} ATTACH PARTITION {legacy} FOR VALUES FROM (MINVALUE) TO ('{boundary}')")
+        op.execute(f'ALTER TABLE {legacy} DROP CONSTRAINT {table}_legacy_range')
+
+        for n in (1, 2, 3):
+            start, end = _months_from_now(n), _months_from_now(n + 1)
+            op.execute(
+                f"CREATE TABLE {table}_p{start[:4]}{start[5:7]} PARTITION OF {table} "
+                f"FOR VALUES FROM ('{start}') TO ('{end}')"
+            )
+    # Later months: AnalyticsPartitionService.ensure_partitions() (startup and scripts/analytics_retention.py)
+
+
+def downgrade() -> None:
+    # Collapse back into plain tables (copies whatever partitions remain)
+    for table, (indexes, foreign_keys) in TABLES.items():
+        op.execute(f'ALTER TABLE {table} RENAME TO {table}_partitioned')
+        op.execute(f'CREATE TABLE {table} (LIKE {table}_partitioned INCLUDING DEFAULTS)')
+        op.execute(f'INSERT INTO {table} SELECT * FROM {table}_partitioned')
+        op.execute(f'ALTER SEQUENCE {table}_id_seq OWNED BY {table}.id')
+        op.execute(f'DROP TABLE {table}_partitioned CASCADE')
+        op.execute(f'ALTER TABLE {table} ALTER COLUMN "timestamp" DROP NOT NULL')
+        op.execute(f'ALTER TABLE {table} ADD CONSTRAINT {table}_pkey PRIMARY KEY (id)')
+        for column, target in foreign_keys:
+            op.execute(
+                f'ALTER TABLE {table} ADD CONSTRAINT {table}_{column}_fkey '
+                f'FOREIGN KEY ({column}) REFERENCES {target} (id)'
+            )
+        for column in indexes:
+            op.execute(f'CREATE INDEX ix_{table}_{column} ON {table} ("{column}")')
@@ -0,0 +1,42 @@
+"""add_coupons
+
+Revision ID: e27c4b9f1a06
+Revises: 9b3f6d2e8a51
+Create Date: 2026-10-19 13:40:52.107733
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e27c4b9f1a06'
+down_revision: Union[str, None] = '9b3f6d2e8a51'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('coupons',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('business_id', sa.Integer(), nullable=False),
+    sa.Column('code', sa.String(), nullable=False),
+    sa.Column('percent', sa.Float(), nullable=False),
+    sa.Column('min_amount', sa.Float(), nullable=True),
+    sa.Column('expires_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('max_uses', sa.Integer(), nullable=True),
+    sa.Column('uses_count', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['business_id'], ['businesses.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('business_id', 'code', name='uq_coupons_business_code')
+    )
+    op.add_column('carts', sa.Column('coupon_percent', sa.Float(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('carts', 'coupon_percent')
+    op.drop_table('coupons')
@@ -1,12 +1,20 @@
 # app/api/v1/analytics.py
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
-from datetime import datetime, timedelta
-from app.db.session import get_db
+from datetime import date, datetime, timedelta, timezone
+from app.db.session import get_db, AsyncSessionLocal
 from app.api.deps import get_current_user
 from app.models.user import User
 from app.services.analytics_service import AnalyticsService
+from app.services.dashboard_service import DashboardService
+from app.services.analytics_rollup_service import AnalyticsRollupService
+from app.services.analytics_cache import analytics_cache
+from app.services.analytics_export_service import AnalyticsExportService
+from app.services.analytics_funnel_service import AnalyticsFunnelService
+from app.services.unique_customer_service import UniqueCustomerCounter
+from app.models.analytics import EventType
 from pydantic import BaseModel
 
 router = APIRouter(prefix="/analytics", tags=["Analytics"])
@@ -15,12 +23,20 @@ class DateRangeParams(BaseModel):
     start_date: Optional[datetime] = None
     end_date: Optional[datetime] = None
 
+def _with_session(query):
+    # Cached results may be recomputed in the background, after the request
+    # session is gone, so every computation opens its own session
+    async def compute():
+        async with AsyncSessionLocal() as db:
+            return await query(db)
+    return compute
+
 @router.get("/cart-recovery/{business_id}")
 async def get_cart_recovery_metrics(
+    request: Request,
     business_id: int,
     start_date: Optional[str] = Query(None, description="ISO format: 2024-01-01T00:00:00"),
     end_date: Optional[str] = Query(None, description="ISO format: 2024-01-31T23:59:59"),
-    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -36,20 +52,22 @@ async def get_cart_recovery_metrics(
     start = datetime.fromisoformat(start_date) if start_date else None
     end = datetime.fromisoformat(end_date) if end_date else None
     
-    metrics = await AnalyticsService.get_cart_recovery_metrics(
-        db=db,
-        business_id=business_id,
-        start_date=start,
-        end_date=end
+    return await analytics_cache.respond(
+        request, business_id, "cart-recovery", (start_date, end_date),
+        _with_session(lambda db: AnalyticsService.get_cart_recovery_metrics(
+            db=db,
+            business_id=business_id,
+            start_date=start,
+            end_date=end
+        ))
     )
-    
-    return metrics
 
 @router.get("/clv/{business_id}")
 async def get_clv_analytics(
+    request: Request,
     business_id: int,
     min_purchases: int = Query(0, description="Minimum purchases to include"),
-    db: AsyncSession = Depends(get_db),
+    include_percentiles: bool = Query(False, description="Include CLV percentile breakdown"),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -60,21 +78,25 @@ async def get_clv_analytics(
     - Total customers
     - Customer segmentation (high/medium/low value)
     - Churn risk analysis
+    - Optional CLV percentiles (p25/p50/p75/p90/p99)
     """
-    analytics = await AnalyticsService.get_clv_analytics(
-        db=db,
-        business_id=business_id,
-        min_purchases=min_purchases
+    return await analytics_cache.respond(
+        request, business_id, "clv", (min_purchases, include_percentiles),
+        _with_session(lambda db: AnalyticsService.get_clv_analytics(
+            db=db,
+            business_id=business_id,
+            min_purchases=min_purchases,
+            include_percentiles=include_percentiles
+        ))
     )
-    
-    return analytics
 
 @router.get("/ai-performance/{business_id}")
 async def get_ai_performance(
+    request: Request,
     business_id: int,
     start_date: Optional[str] = Query(None),
     end_date: Optional[str] = Query(None),
-    db: AsyncSession = Depends(get_db),
+    bucket: str = Query("day", pattern="^(hour|day)$", description="Trend granularity"),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -85,48 +107,166 @@ async def get_ai_performance(
     - AI fallback usage rate
     - Conversation-to-action conversion rate
     - Average response time
+    - Counts, conversion and latency per response source and intent
+    - Per-hour or per-day trend
     """
     start = datetime.fromisoformat(start_date) if start_date else None
     end = datetime.fromisoformat(end_date) if end_date else None
     
-    performance = await AnalyticsService.get_ai_performance(
-        db=db,
-        business_id=business_id,
-        start_date=start,
-        end_date=end
+    return await analytics_cache.respond(
+        request, business_id, "ai-performance", (start_date, end_date, bucket),
+        _with_session(lambda db: AnalyticsService.get_ai_performance(
+            db=db,
+            business_id=business_id,
+            start_date=start,
+            end_date=end,
+            bucket=bucket
+        ))
+    )
+
+@router.get("/ai-latency/{business_id}")
+async def get_ai_latency(
+    request: Request,
+    business_id: int,
+    start_date: Optional[str] = Query(None, description="ISO format; default: 7 days ago"),
+    end_date: Optional[str] = Query(None, description="ISO format; default: now"),
+    source: Optional[str] = Query(None, description="Only this response source (faq, ai_fallback, ...)"),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Get AI response-time percentiles (p50/p90/p99/p99.9) for any window.
+    
+    Served from hourly latency sketches, never from raw interaction rows.
+    """
+    end = datetime.fromisoformat(end_date) if end_date else datetime.now(timezone.utc)
+    start = datetime.fromisoformat(start_date) if start_date else end - timedelta(days=7)
+    
+    return await analytics_cache.respond(
+        request, business_id, "ai-latency", (start_date, end_date, source),
+        _with_session(lambda db: AnalyticsRollupService.get_latency_percentiles(db, business_id, start, end, source))
+    )
+
+@router.get("/unique-customers/{business_id}")
+async def get_unique_customers(
+    request: Request,
+    business_id: int,
+    start_date: Optional[str] = Query(None, description="ISO date, inclusive; default: 6 days before end_date"),
+    end_date: Optional[str] = Query(None, description="ISO date, inclusive; default: today (UTC)"),
+    channel: Optional[str] = Query(None, description="whatsapp, instagram; default: all channels"),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Get the approximate number of distinct customers that messaged the bot.
+    
+    Merged from daily HyperLogLog counters (~1.6% standard error).
+    """
+    end = date.fromisoformat(end_date[:10]) if end_date else datetime.now(timezone.utc).date()
+    start = date.fromisoformat(start_date[:10]) if start_date else end - timedelta(days=6)
+    
+    return await analytics_cache.respond(
+        request, business_id, "unique-customers", (start_date, end_date, channel),
+        _with_session(lambda db: UniqueCustomerCounter.count(db, business_id, start, end, channel))
+    )
+
+@router.get("/funnel/{business_id}")
+async def get_conversion_funnel(
+    request: Request,
+    business_id: int,
+    start_date: Optional[str] = Query(None, description="ISO format; default: 30 days ago"),
+    end_date: Optional[str] = Query(None, description="ISO format; default: now"),
+    steps: Optional[str] = Query(None, description="Comma-separated event types in lifecycle order; default: full cart lifecycle"),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Get the cart conversion funnel.
+    
+    Returns, per step:
+    - Carts that reached it (having every previous step)
+    - Conversion from the previous step and from the first one
+    - Average / median hours since the previous step
+    """
+    try:
+        funnel_steps = AnalyticsFunnelService.parse_steps(steps.split(",") if steps else None)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    start = datetime.fromisoformat(start_date) if start_date else None
+    end = datetime.fromisoformat(end_date) if end_date else None
+    
+    return await analytics_cache.respond(
+        request, business_id, "funnel", (start_date, end_date, steps),
+        _with_session(lambda db: AnalyticsFunnelService.get_funnel(db, business_id, start, end, funnel_steps))
     )
+
+@router.get("/cohorts/{business_id}")
+async def get_weekly_cohorts(
+    request: Request,
+    business_id: int,
+    start_date: Optional[str] = Query(None, description="ISO format; default: `weeks` weeks ago"),
+    end_date: Optional[str] = Query(None, description="ISO format; default: now"),
+    cohort_event: EventType = Query(EventType.CART_CREATED, description="Event that places a customer in a cohort"),
+    conversion_event: EventType = Query(EventType.PAYMENT_COMPLETED, description="Event counted as conversion"),
+    weeks: int = Query(8, ge=1, le=52, description="Weeks after the cohort week to follow"),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Get weekly customer cohorts.
+    
+    Customers are grouped by the week of their first `cohort_event`; each
+    cohort reports how many converted, overall and week by week.
+    """
+    start = datetime.fromisoformat(start_date) if start_date else None
+    end = datetime.fromisoformat(end_date) if end_date else None
     
-    return performance
+    return await analytics_cache.respond(
+        request, business_id, "cohorts", (start_date, end_date, cohort_event.value, conversion_event.value, weeks),
+        _with_session(lambda db: AnalyticsFunnelService.get_weekly_cohorts(
+            db, business_id, start, end, cohort_event, conversion_event, weeks
+        ))
+    )
+
+@router.get("/export/{business_id}/{dataset}")
+async def export_analytics(
+    business_id: int,
+    dataset: str,
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    start_date: Optional[str] = Query(None, description="ISO format, inclusive"),
+    end_date: Optional[str] = Query(None, description="ISO format, exclusive"),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Stream raw analytics rows as CSV or NDJSON (chunked response).
+    
+    Datasets: cart_events, ai_interactions, customer_ltv
+    """
+    if dataset not in AnalyticsExportService.DATASETS:
+        raise HTTPException(status_code=404, detail=f"Unknown dataset '{dataset}'")
+    
+    start = datetime.fromisoformat(start_date) if start_date else None
+    end = datetime.fromisoformat(end_date) if end_date else None
+    
+    return StreamingResponse(
+        AnalyticsExportService.stream(dataset, business_id, format, start, end),
+        media_type=AnalyticsExportService.FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{dataset}_{business_id}.{format}"'}
+    )
 
 @router.get("/dashboard/{business_id}")
 async def get_analytics_dashboard(
+    request: Request,
     business_id: int,
     days: int = Query(30, description="Number of days to analyze"),
-    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """
     Get comprehensive analytics dashboard with all metrics.
+    Sections are fetched in parallel; a slow or failing section comes back
+    as null and is listed in `unavailable`.
     """
-    end_date = datetime.utcnow()
-    start_date = end_date - timedelta(days=days)
-    
-    # Fetch all metrics in parallel
-    cart_recovery = await AnalyticsService.get_cart_recovery_metrics(
-        db, business_id, start_date, end_date
-    )
-    clv = await AnalyticsService.get_clv_analytics(db, business_id)
-    ai_performance = await AnalyticsService.get_ai_performance(
-        db, business_id, start_date, end_date
+    return await analytics_cache.respond(
+        request, business_id, "dashboard", (days,),
+        lambda: DashboardService.get_dashboard(business_id, days)
     )
-    
-    return {
-        "business_id": business_id,
-        "period_days": days,
-        "cart_recovery": cart_recovery,
-        "customer_lifetime_value": clv,
-        "ai_performance": ai_performance
-    }
 
 @router.post("/clv/update/{business_id}/{user_phone}")
 async def update_customer_clv(
@@ -144,6 +284,7 @@ async def update_customer_clv(
         business_id=business_id,
         user_phone=user_phone
     )
+    analytics_cache.bump([business_id])
     
     return {
         "user_phone": user_phone,
@@ -153,3 +294,22 @@ async def update_customer_clv(
         "avg_order_value": clv.avg_order_value,
         "churn_risk_score": clv.churn_risk_score
     }
+
+@router.post("/clv/recompute/{business_id}", status_code=202)
+async def recompute_business_clv(
+    business_id: int,
+    background_tasks: BackgroundTasks,
+    chunk_size: int = Query(50000, ge=1000, description="Customers per statement"),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Recompute CLV for every customer of the business in the background.
+    Progress is logged per chunk; for scheduled runs use scripts/recompute_clv.py.
+    """
+    async def run():
+        async with AsyncSessionLocal() as db:
+            await AnalyticsService.recompute_clv(db, business_id, chunk_size)
+        analytics_cache.bump([business_id])
+    
+    background_tasks.add_task(run)
+    return {"business_id": business_id, "status": "started"}
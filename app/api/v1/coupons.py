@@ -0,0 +1,18 @@
+from app.core.crud_factory import generate_crud
+from app.models.coupon import Coupon
+from app.schemas.coupon import CouponCreate, CouponUpdate
+
+# Changes reach the coupon rule cache within CouponService.CACHE_TTL_SECONDS
+router = generate_crud(
+    model=Coupon,
+    schema_create=CouponCreate,
+    schema_update=CouponUpdate,
+    prefix="/coupons",
+    tag="Coupons",
+    permissions={
+        "create": "coupons:create",
+        "read": "coupons:view",
+        "update": "coupons:update",
+        "delete": "coupons:delete"
+    }
+)
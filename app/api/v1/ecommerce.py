@@ -5,8 +5,8 @@ from sqlalchemy import select
 from app.db.session import get_db
 from app.models.ecommerce_config import EcommerceConfig, EcommerceProvider
 from app.schemas.ecommerce_config import EcommerceConfigCreate, EcommerceConfigUpdate, EcommerceConfigOut
-from app.services.ecommerce_sync_service import EcommerceSyncService
-from typing import List
+from app.services.catalog_sync_jobs import catalog_sync_jobs, SyncJobConflict
+from typing import List, Optional
 from pydantic import BaseModel
 
 router = APIRouter(prefix="/ecommerce", tags=["Ecommerce"])
@@ -53,13 +53,33 @@ async def delete_integration(id: int, db: AsyncSession = Depends(get_db)):
 # --- Sync Endpoint ---
 class SyncRequest(BaseModel):
     integration_id: int
+    full: Optional[bool] = None  # None: delta unless a full sync is due
 
-@router.post("/sync")
+@router.post("/sync", status_code=202)
 async def sync_products(data: SyncRequest, db: AsyncSession = Depends(get_db)):
+    """Queue a catalog sync; poll GET /ecommerce/sync/jobs/{job_id} for progress."""
     res = await db.execute(select(EcommerceConfig).where(EcommerceConfig.id == data.integration_id))
     config = res.scalars().first()
     if not config:
         raise HTTPException(status_code=404, detail="Integration not found")
     
-    count = await EcommerceSyncService.sync_products(db, config.business_id)
-    return {"status": "success", "products_synced": count, "message": f"Synced {count} products"}
+    try:
+        job = await catalog_sync_jobs.submit(db, config, full=data.full)
+    except SyncJobConflict as e:
+        raise HTTPException(status_code=409, detail={"message": str(e), "job_id": e.job_id})
+    return {"status": job.status, "job_id": job.id, "message": f"Sync queued for integration {config.id}"}
+
+@router.get("/sync/jobs/{job_id}")
+async def get_sync_job(job_id: int, db: AsyncSession = Depends(get_db)):
+    job = await catalog_sync_jobs.get(db, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Sync job not found")
+    return catalog_sync_jobs.describe(job)
+
+@router.post("/sync/jobs/{job_id}/cancel")
+async def cancel_sync_job(job_id: int, db: AsyncSession = Depends(get_db)):
+    """Queued jobs are cancelled at once; running ones stop at their next heartbeat."""
+    job = await catalog_sync_jobs.cancel(db, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Sync job not found")
+    return catalog_sync_jobs.describe(job)
@@ -2,10 +2,12 @@
 from app.core.crud_factory import generate_crud
 from app.models.ecommerce_config import EcommerceConfig
 from app.schemas.ecommerce_config import EcommerceConfigCreate, EcommerceConfigUpdate
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException
+from typing import Optional
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.db.session import get_db
-from app.services.ecommerce_sync_service import EcommerceSyncService
+from sqlalchemy import select
+from app.services.catalog_sync_jobs import catalog_sync_jobs, SyncJobConflict
 
 router = generate_crud(
     model=EcommerceConfig,
@@ -21,7 +23,15 @@ router = generate_crud(
     }
 )
 
-@router.post("/{business_id}/sync")
-async def sync_ecommerce_products(business_id: int, db: AsyncSession = Depends(get_db)):
-    count = await EcommerceSyncService.sync_products(db, business_id)
-    return {"status": "ok", "synced_products": count}
+@router.post("/{business_id}/sync", status_code=202)
+async def sync_ecommerce_products(business_id: int, full: Optional[bool] = None, db: AsyncSession = Depends(get_db)):
+    res = await db.execute(select(EcommerceConfig).where(EcommerceConfig.business_id == business_id))
+    config = res.scalars().first()
+    if not config:
+        raise HTTPException(status_code=404, detail="No eCommerce configuration found for this business")
+    
+    try:
+        job = await catalog_sync_jobs.submit(db, config, full=full)
+    except SyncJobConflict as e:
+        raise HTTPException(status_code=409, detail={"message": str(e), "job_id": e.job_id})
+    return {"status": job.status, "job_id": job.id}
@@ -6,6 +6,8 @@ from app.db.session import get_db
 from app.models.cart import Cart, CartItem
 from app.models.product import Product
 from app.models.ecommerce_config import EcommerceConfig
+from app.services.abandonment_scheduler import abandonment_scheduler
+from app.services.cart_status_service import CartStatusService
 from datetime import datetime
 import logging
 import hashlib
@@ -105,6 +107,7 @@ async def handle_magento_cart(
         from sqlalchemy import delete
         await db.execute(delete(CartItem).where(CartItem.cart_id == cart.id))
         
+        cart_total = 0.0
         items = data.get("items", [])
         for item in items:
             sku = item.get("sku")
@@ -125,7 +128,14 @@ async def handle_magento_cart(
                     quantity=qty
                 )
                 db.add(cart_item)
+                cart_total += float(product.price) * qty
 
+        # Coming back to an abandoned cart counts as a recovery (same as the chat flow)
+        if cart.status == "abandoned":
+            await CartStatusService.set_status(db, cart, "recovered", amount=cart_total)
+
+        # Reset the abandonment timer on every cart update
+        await abandonment_scheduler.touch(db, cart)
         await db.commit()
         return {"status": "success", "cart_id": cart.id}
     except Exception as e:
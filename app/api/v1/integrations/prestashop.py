@@ -6,6 +6,8 @@ from app.db.session import get_db
 from app.models.cart import Cart, CartItem
 from app.models.product import Product
 from app.models.ecommerce_config import EcommerceConfig
+from app.services.abandonment_scheduler import abandonment_scheduler
+from app.services.cart_status_service import CartStatusService
 from datetime import datetime
 import logging
 import hashlib
@@ -99,6 +101,7 @@ async def handle_prestashop_cart(
         if not rows and "products" in cart_data:
              rows = cart_data["products"] # Alternate structure
 
+        cart_total = 0.0
         for row in rows:
             prod_id = str(row.get("product_id") or row.get("id_product"))
             qty = row.get("quantity", 1)
@@ -117,7 +120,14 @@ async def handle_prestashop_cart(
                     quantity=qty
                 )
                 db.add(cart_item)
+                cart_total += float(product.price) * qty
 
+        # Coming back to an abandoned cart counts as a recovery (same as the chat flow)
+        if cart.status == "abandoned":
+            await CartStatusService.set_status(db, cart, "recovered", amount=cart_total)
+
+        # Reset the abandonment timer on every cart update
+        await abandonment_scheduler.touch(db, cart)
         await db.commit()
         return {"status": "success", "cart_id": cart.id}
     except Exception as e:
@@ -6,6 +6,8 @@ from app.db.session import get_db
 from app.models.cart import Cart, CartItem
 from app.models.product import Product
 from app.models.ecommerce_config import EcommerceConfig
+from app.services.abandonment_scheduler import abandonment_scheduler
+from app.services.cart_status_service import CartStatusService
 from datetime import datetime
 import logging
 import hashlib
@@ -99,6 +101,7 @@ async def handle_shopify_cart(
         await db.execute(delete(CartItem).where(CartItem.cart_id == cart.id))
         
         # Shopify line_items structure
+        cart_total = 0.0
         items = data.get("line_items", [])
         for item in items:
             # Shopify Variant ID is usually the SKU key
@@ -120,6 +123,7 @@ async def handle_shopify_cart(
                     quantity=quantity
                 )
                 db.add(cart_item)
+                cart_total += float(product.price) * quantity
             else:
                 # Fallback: Try matching by name/SKU if exact ID fails (common in variant mismatches)
                 sku = item.get("sku")
@@ -132,7 +136,14 @@ async def handle_shopify_cart(
                     if product:
                          cart_item = CartItem(cart_id=cart.id, product_id=product.id, quantity=quantity)
                          db.add(cart_item)
+                         cart_total += float(product.price) * quantity
 
+        # Coming back to an abandoned cart counts as a recovery (same as the chat flow)
+        if cart.status == "abandoned":
+            await CartStatusService.set_status(db, cart, "recovered", amount=cart_total)
+
+        # Reset the abandonment timer on every cart update
+        await abandonment_scheduler.touch(db, cart)
         await db.commit()
         logger.info(f"Shopify cart {external_cart_id} synced for {phone}")
         return {"status": "success", "cart_id": cart.id}
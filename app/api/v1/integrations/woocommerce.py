@@ -7,6 +7,8 @@ from app.models.business import Business
 from app.models.cart import Cart, CartItem
 from app.models.product import Product
 from app.models.ecommerce_config import EcommerceConfig
+from app.services.abandonment_scheduler import abandonment_scheduler
+from app.services.cart_status_service import CartStatusService
 from datetime import datetime
 import logging
 import json
@@ -125,6 +127,7 @@ async def handle_cart_update(
         from sqlalchemy import delete
         await db.execute(delete(CartItem).where(CartItem.cart_id == cart.id))
         
+        cart_total = 0.0
         items = data.get("items", [])
         for item in items:
             ext_product_id = str(item.get("product_id"))
@@ -145,9 +148,16 @@ async def handle_cart_update(
                     quantity=quantity
                 )
                 db.add(cart_item)
+                cart_total += float(product.price) * quantity
             else:
                 logger.warning(f"Product {ext_product_id} not found in Chatly sync. Skipping item.")
                 
+        # Coming back to an abandoned cart counts as a recovery (same as the chat flow)
+        if cart.status == "abandoned":
+            await CartStatusService.set_status(db, cart, "recovered", amount=cart_total)
+
+        # Reset the abandonment timer on every cart update
+        await abandonment_scheduler.touch(db, cart)
         await db.commit()
         
         logger.info(f"WooCommerce cart {external_cart_id} synced for {phone}")
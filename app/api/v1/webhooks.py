@@ -6,6 +6,7 @@ from app.models.bot import Bot
 from app.services.ai_service import AIService
 from app.services.meta_service import MetaService
 from app.services.payment_service import PaymentService
+from app.services.unique_customer_service import unique_customers
 from app.models.payment_config import PaymentConfig
 from app.models.business_channel import BusinessChannel
 from app.models.bot_channel import BotChannel
@@ -68,6 +69,7 @@ async def handle_webhook_by_id(channel_name: str, business_channel_id: int, requ
                             bot = await _get_bot_for_channel(db, business_channel_id)
                             
                             if bot and bot.is_active:
+                                unique_customers.add(bot.business_id, from_num, "whatsapp")
                                 response_content, msg_type = await AIService(bot).chat(db, bot.business_id, from_num, text)
                                 if response_content:
                                     meta = MetaService(channel.token, phone_id)
@@ -83,6 +85,7 @@ async def handle_webhook_by_id(channel_name: str, business_channel_id: int, requ
                     
                     bot = await _get_bot_for_channel(db, business_channel_id)
                     if bot and bot.is_active:
+                        unique_customers.add(bot.business_id, sender_id, "instagram")
                         # AIService treats sender_id as the unique contact identifier (agnostic)
                         response_content, msg_type = await AIService(bot).chat(db, bot.business_id, sender_id, text)
                         if response_content:
@@ -2,4 +2,30 @@ import os
 
 ACCESS_TOKEN_EXPIRE_MINUTES = 15
 REFRESH_TOKEN_EXPIRE_DAYS = 7
-GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
\ No newline at end of file
+GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
+
+# Cart abandonment detection: "scan" (periodic query) or "event" (timer wheel)
+ABANDONMENT_MODE = os.getenv("ABANDONMENT_MODE", "scan")
+CART_ABANDONMENT_MINUTES = int(os.getenv("CART_ABANDONMENT_MINUTES", "60"))
+
+# Analytics writes are buffered and flushed in batches (see app/services/analytics_buffer.py)
+ANALYTICS_BUFFER_MAX_EVENTS = int(os.getenv("ANALYTICS_BUFFER_MAX_EVENTS", "10000"))
+ANALYTICS_FLUSH_BATCH = int(os.getenv("ANALYTICS_FLUSH_BATCH", "500"))
+ANALYTICS_FLUSH_SECONDS = float(os.getenv("ANALYTICS_FLUSH_SECONDS", "2"))
+ANALYTICS_OVERFLOW = os.getenv("ANALYTICS_OVERFLOW", "drop")  # "drop" or "block"
+
+# Per-section time budget of the analytics dashboard
+DASHBOARD_SECTION_TIMEOUT_SECONDS = float(os.getenv("DASHBOARD_SECTION_TIMEOUT_SECONDS", "5"))
+
+# Analytics endpoint result cache (per worker)
+ANALYTICS_CACHE_TTL_SECONDS = float(os.getenv("ANALYTICS_CACHE_TTL_SECONDS", "30"))
+ANALYTICS_CACHE_STALE_SECONDS = float(os.getenv("ANALYTICS_CACHE_STALE_SECONDS", "300"))
+
+# Analytics event tables keep this many months online; older partitions are archived here
+ANALYTICS_RETENTION_MONTHS = int(os.getenv("ANALYTICS_RETENTION_MONTHS", "13"))
+ANALYTICS_ARCHIVE_DIR = os.getenv("ANALYTICS_ARCHIVE_DIR", "archive/analytics")
+
+# Catalog sync: deltas since the stored cursor, full re-sync (catches deletions) this often
+ECOMMERCE_FULL_SYNC_HOURS = float(os.getenv("ECOMMERCE_FULL_SYNC_HOURS", "24"))
+# Catalog fetch: pages in flight per store (halved on 429/503, regrows on success)
+ECOMMERCE_FETCH_CONCURRENCY = int(os.getenv("ECOMMERCE_FETCH_CONCURRENCY", "4"))
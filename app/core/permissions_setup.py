@@ -31,6 +31,7 @@ MODELS_PERMISSIONS = {
     # Payments
     "Payments": ["create", "view", "update", "delete"],
     "PaymentConfigs": ["create", "view", "update", "delete"],
+    "Coupons": ["create", "view", "update", "delete"],
     
     # Widget
     "Widgets": ["create", "view", "update", "delete"],
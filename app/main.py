@@ -22,13 +22,23 @@ from app.api.v1.chat import router as chat_router
 from app.api.v1.widget import router as widget_router
 from app.api.v1.ecommerce import router as ecommerce_router
 from app.api.v1.payments import router as payments_router
+from app.api.v1.coupons import router as coupons_router
 from app.api.v1.carts import router as carts_router
 from app.api.v1.knowledge_base import router as kb_router
 from app.api.v1.plans import router as plans_router
 from app.api.v1.admin import router as admin_router
 from app.api.v1.learning import router as learning_router
 from app.api.v1.analytics import router as analytics_router
+from app.services.abandonment_scheduler import abandonment_scheduler
+from app.services.analytics_buffer import analytics_buffer
+from app.services.analytics_partition_service import AnalyticsPartitionService
+from app.services.unique_customer_service import unique_customers
+from app.services.adapters.base import BaseEcommerceAdapter
+from app.services.catalog_sync_jobs import catalog_sync_jobs
 from app.models import Role, Permission, User, Business, BusinessUser, BusinessChannel, Category, Product
+import logging
+
+logger = logging.getLogger(__name__)
 
 app = FastAPI(
     title="Chatly API",
@@ -58,6 +68,7 @@ v1_router.include_router(chat_router)
 v1_router.include_router(widget_router)
 v1_router.include_router(ecommerce_router)
 v1_router.include_router(payments_router)
+v1_router.include_router(coupons_router)
 v1_router.include_router(carts_router)
 v1_router.include_router(kb_router)
 v1_router.include_router(plans_router)
@@ -76,6 +87,51 @@ v1_router.include_router(presta_router)
 
 app.include_router(v1_router)
 
+@app.on_event("startup")
+async def start_abandonment_scheduler():
+    # No-op unless ABANDONMENT_MODE=event
+    await abandonment_scheduler.start()
+
+@app.on_event("shutdown")
+async def stop_abandonment_scheduler():
+    await abandonment_scheduler.stop()
+
+@app.on_event("startup")
+async def ensure_analytics_partitions():
+    try:
+        await AnalyticsPartitionService.ensure_partitions()
+    except Exception as e:
+        logger.error(f"Could not create analytics partitions: {e}")
+
+@app.on_event("startup")
+async def start_analytics_buffer():
+    await analytics_buffer.start()
+
+@app.on_event("shutdown")
+async def flush_analytics_buffer():
+    await analytics_buffer.stop()
+
+@app.on_event("startup")
+async def start_unique_customer_counters():
+    await unique_customers.start()
+
+@app.on_event("shutdown")
+async def flush_unique_customer_counters():
+    await unique_customers.stop()
+
+@app.on_event("startup")
+async def start_catalog_sync_jobs():
+    await catalog_sync_jobs.start()
+
+@app.on_event("shutdown")
+async def stop_catalog_sync_jobs():
+    # Before the HTTP client closes: running syncs are requeued, not failed
+    await catalog_sync_jobs.stop()
+
+@app.on_event("shutdown")
+async def close_ecommerce_http_client():
+    await BaseEcommerceAdapter.close_client()
+
 # @app.on_event("startup")
 # async def startup_event():
 #     async with AsyncSessionLocal() as db:
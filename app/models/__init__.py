@@ -10,12 +10,14 @@ from app.models.bot_channel import BotChannel
 from app.models.channel import Channel
 from app.models.flow import Flow
 from .product import Product
-from .cart import Cart, CartItem
+from .cart import Cart, CartItem, CartAbandonmentDeadline
 from .ecommerce_config import EcommerceConfig, EcommerceProvider
+from .catalog_sync_job import CatalogSyncJob
 from app.models.payment_config import PaymentConfig
+from app.models.coupon import Coupon
 from app.models.widget_config import WidgetConfig
 from app.models.plan import Plan
 from app.models.subscription import Subscription
 from app.models.knowledge_base import KnowledgeBase
 from app.models.learning_suggestion import LearningSuggestion
-from app.models.analytics import CartRecoveryEvent, AIPerformanceMetric, CustomerLifetimeValue, EventType
\ No newline at end of file
+from app.models.analytics import CartRecoveryEvent, AIPerformanceMetric, CustomerLifetimeValue, CustomerPurchaseSummary, CustomerCLVCartState, DailyEventRollup, DailyAIRollup, AILatencySketch, DailyUniqueCustomers, EventType
\ No newline at end of file
@@ -1,5 +1,6 @@
 # app/models/analytics.py
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, JSON, Boolean, Enum as SqlEnum
+from sqlalchemy import Column, Integer, BigInteger, String, Float, Date, DateTime, LargeBinary, ForeignKey, JSON, Boolean, Index, UniqueConstraint, Enum as SqlEnum
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.db.base_class import Base
@@ -20,14 +21,23 @@ class EventType(str, enum.Enum):
 class CartRecoveryEvent(Base):
     """Tracks all cart-related events for analytics"""
     __tablename__ = "cart_recovery_events"
+    __table_args__ = (
+        # Funnel / cohort reports (AnalyticsFunnelService): index-only scan of a business's window
+        Index(
+            "ix_cart_recovery_events_business_timestamp", "business_id", "timestamp",
+            postgresql_include=["event_type", "cart_id", "user_phone"]
+        ),
+        # Monthly partitions, managed by AnalyticsPartitionService
+        {"postgresql_partition_by": "RANGE (timestamp)"},
+    )
     
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     business_id = Column(Integer, ForeignKey("businesses.id"), nullable=False, index=True)
     cart_id = Column(Integer, ForeignKey("carts.id"), nullable=True)
     user_phone = Column(String, nullable=False, index=True)
     
     event_type = Column(SqlEnum(EventType), nullable=False, index=True)
-    timestamp = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+    timestamp = Column(DateTime(timezone=True), primary_key=True, server_default=func.now(), index=True)  # partition key
     
     # Event-specific data
     cart_value = Column(Float, nullable=True)
@@ -49,11 +59,17 @@ class CartRecoveryEvent(Base):
 class AIPerformanceMetric(Base):
     """Tracks AI assistant performance metrics"""
     __tablename__ = "ai_performance_metrics"
+    __table_args__ = (
+        # Exports (AnalyticsExportService) stream a business's window in timestamp order
+        Index("ix_ai_performance_metrics_business_timestamp", "business_id", "timestamp"),
+        # Monthly partitions, managed by AnalyticsPartitionService
+        {"postgresql_partition_by": "RANGE (timestamp)"},
+    )
     
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     business_id = Column(Integer, ForeignKey("businesses.id"), nullable=False, index=True)
     
-    timestamp = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+    timestamp = Column(DateTime(timezone=True), primary_key=True, server_default=func.now(), index=True)  # partition key
     
     # Intent detection
     intent_detected = Column(String, nullable=True)
@@ -111,5 +127,83 @@ class CustomerLifetimeValue(Base):
     
     # Unique constraint on business + user_phone
     __table_args__ = (
+        UniqueConstraint("business_id", "user_phone", name="uq_customer_lifetime_values_business_phone"),
         {"schema": None},
     )
+
+class CustomerPurchaseSummary(Base):
+    """Materialized purchase totals per customer, updated incrementally on paid/recovered carts"""
+    __tablename__ = "customer_purchase_summaries"
+    
+    id = Column(Integer, primary_key=True)
+    business_id = Column(Integer, ForeignKey("businesses.id"), nullable=False)
+    user_phone = Column(String, nullable=False)
+    
+    total_purchases = Column(Integer, nullable=False, default=0)
+    total_spent = Column(Float, nullable=False, default=0.0)
+    first_purchase_at = Column(DateTime(timezone=True), nullable=True)
+    last_purchase_at = Column(DateTime(timezone=True), nullable=True)
+    
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    
+    __table_args__ = (
+        UniqueConstraint("business_id", "user_phone", name="uq_customer_purchase_summaries_business_phone"),
+    )
+
+class DailyEventRollup(Base):
+    """Per-day cart event totals, maintained incrementally as events are written"""
+    __tablename__ = "analytics_daily_events"
+    
+    business_id = Column(Integer, ForeignKey("businesses.id"), primary_key=True)
+    day = Column(Date, primary_key=True)  # UTC day
+    event_type = Column(SqlEnum(EventType), primary_key=True)
+    
+    event_count = Column(Integer, nullable=False, default=0)
+    cart_value_sum = Column(Float, nullable=False, default=0.0)
+    recovery_hours_sum = Column(Float, nullable=False, default=0.0)
+    recovery_hours_count = Column(Integer, nullable=False, default=0)
+
+class DailyAIRollup(Base):
+    """Per-day AI interaction totals by response source, maintained incrementally"""
+    __tablename__ = "analytics_daily_ai"
+    
+    business_id = Column(Integer, ForeignKey("businesses.id"), primary_key=True)
+    day = Column(Date, primary_key=True)  # UTC day
+    response_source = Column(String, primary_key=True)
+    
+    interactions = Column(Integer, nullable=False, default=0)
+    conversions = Column(Integer, nullable=False, default=0)
+    response_time_sum = Column(Float, nullable=False, default=0.0)
+    response_time_count = Column(Integer, nullable=False, default=0)
+
+class AILatencySketch(Base):
+    """Hourly response-time sketch per response source (see app/services/latency_sketch.py)"""
+    __tablename__ = "ai_latency_sketches"
+    
+    business_id = Column(Integer, ForeignKey("businesses.id"), primary_key=True)
+    bucket_start = Column(DateTime(timezone=True), primary_key=True)  # UTC hour
+    response_source = Column(String, primary_key=True)
+    
+    count = Column(BigInteger, nullable=False, default=0)
+    sum_ms = Column(Float, nullable=False, default=0.0)
+    min_ms = Column(Float, nullable=True)
+    max_ms = Column(Float, nullable=True)
+    bins = Column(JSONB, nullable=False, default={})  # {bin key: count}
+
+class DailyUniqueCustomers(Base):
+    """Daily HyperLogLog registers of distinct customers per channel (see app/services/hyperloglog.py)"""
+    __tablename__ = "analytics_daily_uniques"
+    
+    business_id = Column(Integer, ForeignKey("businesses.id"), primary_key=True)
+    day = Column(Date, primary_key=True)  # UTC day
+    channel = Column(String, primary_key=True)  # whatsapp, instagram
+    
+    registers = Column(LargeBinary, nullable=False)
+
+class CustomerCLVCartState(Base):
+    """Last status of each cart applied to customer_lifetime_values (makes CLV deltas idempotent per cart)"""
+    __tablename__ = "clv_cart_states"
+    
+    cart_id = Column(Integer, ForeignKey("carts.id", ondelete="CASCADE"), primary_key=True)
+    status = Column(String, nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
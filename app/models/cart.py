@@ -1,5 +1,5 @@
 # app/models/cart.py
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Boolean
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Boolean, Float, Index, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.db.base_class import Base
@@ -15,19 +15,48 @@ class Cart(Base):
     source = Column(String, default="chat_native") # chat_native, woocommerce, shopify
     external_id = Column(String, nullable=True, index=True) # ID in external system
     coupon_applied = Column(String, nullable=True)
+    coupon_percent = Column(Float, nullable=True)
     metadata_json = Column(String, default="{}")
     last_interaction = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     last_notified_at = Column(DateTime(timezone=True), nullable=True)
 
     items = relationship("CartItem", back_populates="cart", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        # _get_or_create_cart / webhook upserts: one active cart per (business, phone)
+        Index(
+            "ix_carts_active_business_phone", "business_id", "user_phone",
+            postgresql_where=text("is_active")
+        ),
+        # Recovery scan: only carts that can still be recovered are indexed
+        Index(
+            "ix_carts_recovery_scan", "last_interaction",
+            postgresql_include=["last_notified_at"],
+            postgresql_where=text("is_active AND status = 'active'")
+        ),
+    )
+
 class CartItem(Base):
     __tablename__ = "cart_items"
 
     id = Column(Integer, primary_key=True)
-    cart_id = Column(Integer, ForeignKey("carts.id", ondelete="CASCADE"), nullable=False)
+    cart_id = Column(Integer, ForeignKey("carts.id", ondelete="CASCADE"), nullable=False, index=True)
     product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
     quantity = Column(Integer, default=1)
 
     cart = relationship("Cart", back_populates="items")
     product = relationship("Product")
+
+class CartAbandonmentDeadline(Base):
+    """
+    Durable abandonment deadline per cart (source of truth for the timer wheel).
+    Rescheduled on every cart interaction and claimed (deleted) when it fires;
+    a failed recovery puts it back with a backoff.
+    """
+    __tablename__ = "cart_abandonment_deadlines"
+
+    cart_id = Column(Integer, ForeignKey("carts.id", ondelete="CASCADE"), primary_key=True)
+    business_id = Column(Integer, ForeignKey("businesses.id"), nullable=False)
+    deadline_at = Column(DateTime(timezone=True), nullable=False, index=True)
+    # Failed recoveries already retried for this deadline (reset by new activity)
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
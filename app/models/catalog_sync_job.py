@@ -0,0 +1,44 @@
+# app/models/catalog_sync_job.py
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Index, text
+from sqlalchemy.sql import func
+from app.db.base_class import Base
+
+
+class CatalogSyncJob(Base):
+    """A catalog sync run in the background (see app/services/catalog_sync_jobs.py)"""
+    __tablename__ = "catalog_sync_jobs"
+
+    id = Column(Integer, primary_key=True)
+    integration_id = Column(Integer, ForeignKey("ecommerce_configs.id", ondelete="CASCADE"), nullable=False)
+    business_id = Column(Integer, ForeignKey("businesses.id"), nullable=False)
+
+    status = Column(String, nullable=False, default="queued")  # queued, running, completed, failed, cancelled
+    full = Column(Boolean, nullable=True)  # requested mode; None = delta unless a full sync is due
+    mode = Column(String, nullable=True)  # mode actually run: full / delta
+
+    # Progress
+    pages_fetched = Column(Integer, nullable=False, default=0)
+    products_fetched = Column(Integer, nullable=False, default=0)
+    products_total = Column(Integer, nullable=True)  # when the store reports it
+    inserted = Column(Integer, nullable=False, default=0)
+    updated = Column(Integer, nullable=False, default=0)
+    unchanged = Column(Integer, nullable=False, default=0)
+    deactivated = Column(Integer, nullable=False, default=0)
+
+    cancel_requested = Column(Boolean, nullable=False, default=False)
+    error = Column(String, nullable=True)
+    worker = Column(String, nullable=True)  # host:pid running it
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True)  # stale = worker died, job is picked up again
+
+    __table_args__ = (
+        # At most one queued/running sync per integration, across all workers
+        Index(
+            "uq_catalog_sync_jobs_active_integration", "integration_id",
+            unique=True,
+            postgresql_where=text("status IN ('queued', 'running')")
+        ),
+    )
@@ -0,0 +1,29 @@
+# app/models/coupon.py
+from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, ForeignKey, UniqueConstraint
+from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
+from app.db.base_class import Base
+
+class Coupon(Base):
+    __tablename__ = "coupons"
+
+    id = Column(Integer, primary_key=True)
+    business_id = Column(Integer, ForeignKey("businesses.id"), nullable=False)
+
+    code = Column(String, nullable=False)
+    percent = Column(Float, nullable=False)
+    min_amount = Column(Float, default=0.0)
+
+    # Limits
+    expires_at = Column(DateTime(timezone=True), nullable=True)
+    max_uses = Column(Integer, nullable=True)  # None = unlimited
+    uses_count = Column(Integer, nullable=False, default=0)
+    is_active = Column(Boolean, default=True)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    business = relationship("Business")
+
+    __table_args__ = (
+        UniqueConstraint("business_id", "code", name="uq_coupons_business_code"),
+    )
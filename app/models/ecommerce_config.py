@@ -1,5 +1,5 @@
 # app/models/ecommerce_config.py
-from sqlalchemy import Column, Integer, String, JSON, ForeignKey, Enum as SqlEnum, Boolean
+from sqlalchemy import Column, Integer, String, JSON, ForeignKey, DateTime, Enum as SqlEnum, Boolean
 from sqlalchemy.orm import relationship
 from app.db.base_class import Base
 import enum
@@ -25,6 +25,13 @@ class EcommerceConfig(Base):
     
     active = Column(Boolean, default=True)
     
+    # Catalog sync: deltas fetch products modified since sync_cursor; a
+    # periodic full sync (last_full_sync_at) also catches deletions
+    sync_cursor = Column(DateTime(timezone=True), nullable=True)
+    last_full_sync_at = Column(DateTime(timezone=True), nullable=True)
+    # Bumped only by syncs that changed the catalog; caches of it key on this
+    catalog_version = Column(Integer, nullable=False, default=0, server_default="0")
+    
     # Settings for the floating chat widget
     widget_settings = Column(JSON, nullable=True, default={
         "color": "#007bff",
@@ -1,5 +1,5 @@
 # app/models/product.py
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, Numeric, JSON, Enum as SqlEnum
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, Numeric, JSON, Index, UniqueConstraint, text, Enum as SqlEnum
 from sqlalchemy.orm import relationship
 from app.db.base_class import Base
 from app.models.ecommerce_config import EcommerceProvider
@@ -23,7 +23,25 @@ class Product(Base):
     external_id = Column(String, nullable=True, index=True)
     provider = Column(SqlEnum(EcommerceProvider), nullable=True)
     metadata_json = Column(JSON, nullable=True, default={})
+    # sha256 of the synced content (see EcommerceSyncService.content_hash)
+    content_hash = Column(String(64), nullable=True)
+    # Set when a full sync deactivated the product because the store no longer
+    # lists it; only those come back when the store lists them again
+    removed_from_store = Column(Boolean, nullable=False, default=False, server_default=text("false"))
 
     category = relationship("Category", back_populates="products")
     business = relationship("Business", back_populates="products")
+
+    __table_args__ = (
+        # Sellable catalog lookup on every chat message
+        Index(
+            "ix_products_business_active_stock", "business_id", "stock",
+            postgresql_where=text("is_active")
+        ),
+        # Catalog sync upserts on the external identity (NULLs, i.e. manual products, never conflict)
+        UniqueConstraint(
+            "business_id", "provider", "external_id",
+            name="uq_products_business_provider_external"
+        ),
+    )
     
@@ -0,0 +1,30 @@
+# app/schemas/coupon.py
+from pydantic import BaseModel, Field
+from typing import Optional
+from datetime import datetime
+
+class CouponBase(BaseModel):
+    code: str
+    percent: float
+    min_amount: float = 0.0
+    expires_at: Optional[datetime] = None
+    max_uses: Optional[int] = None
+    is_active: bool = True
+    business_id: int
+
+class CouponCreate(CouponBase):
+    percent: float = Field(gt=0, le=100)
+
+class CouponUpdate(BaseModel):
+    percent: Optional[float] = Field(None, gt=0, le=100)
+    min_amount: Optional[float] = None
+    expires_at: Optional[datetime] = None
+    max_uses: Optional[int] = None
+    is_active: Optional[bool] = None
+
+class CouponOut(CouponBase):
+    id: int
+    uses_count: int
+
+    class Config:
+        from_attributes = True
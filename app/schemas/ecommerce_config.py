@@ -1,6 +1,7 @@
 # app/schemas/ecommerce_config.py
 from pydantic import BaseModel
 from typing import Optional, Dict, Any
+from datetime import datetime
 from app.models.ecommerce_config import EcommerceProvider
 
 class EcommerceConfigBase(BaseModel):
@@ -21,6 +22,9 @@ class EcommerceConfigUpdate(BaseModel):
 
 class EcommerceConfigOut(EcommerceConfigBase):
     id: int
+    sync_cursor: Optional[datetime] = None
+    last_full_sync_at: Optional[datetime] = None
+    catalog_version: int = 0
 
     class Config:
         from_attributes = True
@@ -0,0 +1,198 @@
+# app/services/abandonment_scheduler.py
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+from sqlalchemy import select, delete
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import ABANDONMENT_MODE, CART_ABANDONMENT_MINUTES
+from app.db.session import AsyncSessionLocal
+from app.models.cart import Cart, CartAbandonmentDeadline
+from app.services.recovery_service import RecoveryService
+from app.services.timer_wheel import HierarchicalTimerWheel
+
+logger = logging.getLogger(__name__)
+
+
+def _epoch(dt: datetime) -> float:
+    # Naive datetimes in this codebase are UTC (datetime.utcnow())
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+class AbandonmentScheduler:
+    """
+    Event-driven cart abandonment detection.
+
+    Every cart interaction (re)schedules a deadline in an in-process hierarchical
+    timer wheel and upserts it in `cart_abandonment_deadlines`. The table is the
+    source of truth: the wheel is rebuilt from it at startup, and a firing timer
+    only recovers the cart if it can claim (delete) a row that is still due, so
+    stale timers and multiple workers never double-send.
+
+    A worker's wheel only holds the deadlines it scheduled itself, so every
+    `poll_seconds` it also fires whatever is due in the table (deadlines set
+    by other workers, retries). A recovery that fails puts its deadline back
+    with an exponential backoff, up to MAX_ATTEMPTS tries.
+    """
+
+    MAX_ATTEMPTS = 5
+    RETRY_BACKOFF = timedelta(minutes=5)
+    POLL_BATCH = 1000
+
+    def __init__(self, tick_seconds: float = 1.0, poll_seconds: float = 60.0):
+        self.enabled = ABANDONMENT_MODE == "event"
+        self.delay = timedelta(minutes=CART_ABANDONMENT_MINUTES)
+        self.tick_seconds = tick_seconds
+        self.poll_seconds = poll_seconds
+        self.wheel = HierarchicalTimerWheel(tick_seconds=tick_seconds, start=time.time())
+        self._task: Optional[asyncio.Task] = None
+
+    async def touch(self, db: AsyncSession, cart: Cart):
+        """
+        Reschedule the abandonment deadline for `cart`.
+        Rides on the caller's transaction; the caller commits.
+        """
+        if not self.enabled or cart.id is None:
+            return
+
+        deadline = datetime.utcnow() + self.delay
+        stmt = insert(CartAbandonmentDeadline).values(
+            cart_id=cart.id,
+            business_id=cart.business_id,
+            deadline_at=deadline
+        ).on_conflict_do_update(
+            index_elements=[CartAbandonmentDeadline.cart_id],
+            set_={"deadline_at": deadline, "attempts": 0}
+        )
+        await db.execute(stmt)
+        self.wheel.schedule(cart.id, _epoch(deadline))
+
+    async def cancel(self, db: AsyncSession, cart_id: int):
+        """Drop the deadline of a cart that was closed (checkout, cleared, etc.)."""
+        if not self.enabled:
+            return
+
+        await db.execute(
+            delete(CartAbandonmentDeadline).where(CartAbandonmentDeadline.cart_id == cart_id)
+        )
+        self.wheel.cancel(cart_id)
+
+    async def rebuild(self, db: AsyncSession) -> int:
+        """Load every pending deadline into the wheel."""
+        count = 0
+        result = await db.stream(
+            select(CartAbandonmentDeadline.cart_id, CartAbandonmentDeadline.deadline_at)
+            .execution_options(yield_per=5000)
+        )
+        async for cart_id, deadline_at in result:
+            self.wheel.schedule(cart_id, _epoch(deadline_at))
+            count += 1
+        return count
+
+    async def _claim(self, db: AsyncSession, cart_ids) -> List[Tuple[int, int, int]]:
+        # Only deadlines that are still due: a later touch() moved them forward
+        stmt = delete(CartAbandonmentDeadline).where(
+            CartAbandonmentDeadline.cart_id.in_(cart_ids),
+            CartAbandonmentDeadline.deadline_at <= datetime.utcnow()
+        ).returning(
+            CartAbandonmentDeadline.cart_id, CartAbandonmentDeadline.business_id, CartAbandonmentDeadline.attempts
+        )
+        claimed = (await db.execute(stmt)).all()
+        await db.commit()
+        return claimed
+
+    async def _retry(self, failed: List[Tuple[int, int, int]]):
+        """Put back the deadlines of carts whose recovery failed, with a backoff."""
+        now = datetime.utcnow()
+        rows = []
+        for cart_id, business_id, attempts in failed:
+            if attempts + 1 >= self.MAX_ATTEMPTS:
+                logger.warning(f"Giving up recovering cart {cart_id} after {attempts + 1} attempts")
+                continue
+            rows.append({
+                "cart_id": cart_id,
+                "business_id": business_id,
+                "deadline_at": now + self.RETRY_BACKOFF * 2 ** attempts,
+                "attempts": attempts + 1
+            })
+        if not rows:
+            return
+
+        # A touch() in the meantime already set a fresh deadline: keep it
+        stmt = insert(CartAbandonmentDeadline).values(rows).on_conflict_do_nothing(
+            index_elements=[CartAbandonmentDeadline.cart_id]
+        )
+        async with AsyncSessionLocal() as db:
+            await db.execute(stmt)
+            await db.commit()
+        for row in rows:
+            self.wheel.schedule(row["cart_id"], _epoch(row["deadline_at"]))
+
+    async def fire(self, cart_ids) -> int:
+        async with AsyncSessionLocal() as db:
+            claimed = await self._claim(db, cart_ids)
+            if not claimed:
+                return 0
+            try:
+                recovered, failed_ids = await RecoveryService.recover_due_carts(db, [row[0] for row in claimed])
+            except Exception as e:
+                logger.error(f"Error recovering {len(claimed)} carts: {e}", exc_info=True)
+                recovered, failed_ids = 0, [row[0] for row in claimed]
+
+        failed_ids = set(failed_ids)
+        await self._retry([row for row in claimed if row[0] in failed_ids])
+        return recovered
+
+    async def _due(self) -> List[int]:
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(CartAbandonmentDeadline.cart_id)
+                .where(CartAbandonmentDeadline.deadline_at <= datetime.utcnow())
+                .order_by(CartAbandonmentDeadline.deadline_at)
+                .limit(self.POLL_BATCH)
+            )
+            return result.scalars().all()
+
+    async def _run(self):
+        next_poll = time.monotonic() + self.poll_seconds
+        while True:
+            await asyncio.sleep(self.tick_seconds)
+            expired = set(self.wheel.advance(time.time()))
+            if time.monotonic() >= next_poll:
+                next_poll = time.monotonic() + self.poll_seconds
+                try:
+                    expired.update(await self._due())
+                except Exception as e:
+                    logger.error(f"Error polling abandonment deadlines: {e}", exc_info=True)
+            if not expired:
+                continue
+            try:
+                recovered = await self.fire(list(expired))
+                logger.info(f"Abandonment wheel fired {len(expired)} deadlines, {recovered} carts recovered")
+            except Exception as e:
+                logger.error(f"Error firing abandonment deadlines: {e}", exc_info=True)
+
+    async def start(self):
+        if not self.enabled or self._task:
+            return
+        async with AsyncSessionLocal() as db:
+            count = await self.rebuild(db)
+        logger.info(f"Abandonment wheel rebuilt with {count} pending deadlines")
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if not self._task:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+
+abandonment_scheduler = AbandonmentScheduler()
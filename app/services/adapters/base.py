@@ -1,17 +1,171 @@
 # app/services/adapters/base.py
+import asyncio
+import random
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any
+from collections import deque
+from datetime import datetime, timezone
+from typing import AsyncIterator, Awaitable, Callable, List, Dict, Any, Optional
+import httpx
+from app.core.config import ECOMMERCE_FETCH_CONCURRENCY
+
+
+class StoreLimiter:
+    """
+    Concurrency limit for one store, adapted AIMD-style: every 429/503
+    halves it, and after `limit` successful requests in a row it grows by one
+    again (up to `max_concurrency`).
+    """
+
+    def __init__(self, max_concurrency: int):
+        self.max_concurrency = max(1, max_concurrency)
+        self.limit = self.max_concurrency
+        self._active = 0
+        self._successes = 0
+        self._cond = asyncio.Condition()
+
+    async def __aenter__(self):
+        async with self._cond:
+            await self._cond.wait_for(lambda: self._active < self.limit)
+            self._active += 1
+
+    async def __aexit__(self, *exc):
+        async with self._cond:
+            self._active -= 1
+            self._cond.notify_all()
+
+    def throttled(self):
+        self.limit = max(1, self.limit // 2)
+        self._successes = 0
+
+    async def succeeded(self):
+        self._successes += 1
+        if self.limit < self.max_concurrency and self._successes >= self.limit:
+            self._successes = 0
+            async with self._cond:
+                self.limit += 1
+                self._cond.notify_all()
+
 
 class BaseEcommerceAdapter(ABC):
+    # Products requested per page (platform maximums differ, adapters may override)
+    PAGE_SIZE = 100
+
+    # Retries of a request answered with 429 / 503 or failing at the transport level
+    MAX_RETRIES = 5
+    BACKOFF_BASE_SECONDS = 1.0
+    BACKOFF_MAX_SECONDS = 30.0
+
+    # One pooled client per worker, shared by every adapter (closed on shutdown)
+    _client: Optional[httpx.AsyncClient] = None
+    # store_url -> limiter, so concurrent syncs of one store share its budget
+    _limiters: Dict[str, StoreLimiter] = {}
+
     def __init__(self, store_url: str, credentials: Dict[str, Any]):
         self.store_url = store_url.rstrip('/')
         self.credentials = credentials
+        # Products the current iteration will return, when the platform reports it
+        self.total: Optional[int] = None
+
+    @staticmethod
+    def _utc(since: datetime) -> datetime:
+        return since.astimezone(timezone.utc) if since.tzinfo else since.replace(tzinfo=timezone.utc)
+
+    # ------------------------------------------------------------------ HTTP
+
+    @staticmethod
+    def client() -> httpx.AsyncClient:
+        if BaseEcommerceAdapter._client is None or BaseEcommerceAdapter._client.is_closed:
+            BaseEcommerceAdapter._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(30.0, connect=10.0),
+                limits=httpx.Limits(max_connections=100, max_keepalive_connections=20)
+            )
+        return BaseEcommerceAdapter._client
+
+    @staticmethod
+    async def close_client():
+        if BaseEcommerceAdapter._client is not None:
+            await BaseEcommerceAdapter._client.aclose()
+            BaseEcommerceAdapter._client = None
+
+    @property
+    def limiter(self) -> StoreLimiter:
+        limiter = BaseEcommerceAdapter._limiters.get(self.store_url)
+        if limiter is None:
+            limiter = BaseEcommerceAdapter._limiters[self.store_url] = StoreLimiter(ECOMMERCE_FETCH_CONCURRENCY)
+        return limiter
+
+    def _retry_delay(self, response: Optional[httpx.Response], attempt: int) -> float:
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), self.BACKOFF_MAX_SECONDS)
+        # Exponential with jitter so throttled requests don't retry in lockstep
+        delay = min(self.BACKOFF_BASE_SECONDS * 2 ** attempt, self.BACKOFF_MAX_SECONDS)
+        return delay * random.uniform(0.5, 1.0)
+
+    async def _get(self, url: str, **kwargs) -> httpx.Response:
+        """GET through the shared client within the store's concurrency limit, backing off on 429/503."""
+        limiter = self.limiter
+        for attempt in range(self.MAX_RETRIES + 1):
+            response = None
+            async with limiter:
+                try:
+                    response = await self.client().get(url, **kwargs)
+                except httpx.TransportError:
+                    if attempt == self.MAX_RETRIES:
+                        raise
+            if response is not None and response.status_code not in (429, 503):
+                await limiter.succeeded()
+                return response
+            limiter.throttled()
+            if attempt == self.MAX_RETRIES:
+                return response
+            await asyncio.sleep(self._retry_delay(response, attempt))
+
+    async def _ordered_pages(
+        self,
+        fetch_page: Callable[[int], Awaitable[List[Dict[str, Any]]]],
+        first: int,
+        last: Optional[int] = None
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        Fetch pages first..last with up to `limiter.max_concurrency` requests
+        in flight and yield them in page order. Without `last`, pages are
+        requested speculatively until one comes back short.
+
+        Pages keep downloading while the consumer writes the previous one,
+        but at most one window of pages is buffered.
+        """
+        window = self.limiter.max_concurrency
+        pending = deque()
+        next_page = first
+
+        def schedule():
+            nonlocal next_page
+            while len(pending) < window and (last is None or next_page <= last):
+                pending.append(asyncio.create_task(fetch_page(next_page)))
+                next_page += 1
+
+        try:
+            schedule()
+            while pending:
+                items = await pending.popleft()
+                if items:
+                    yield items
+                if last is None and len(items) < self.PAGE_SIZE:
+                    break
+                schedule()
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    # --------------------------------------------------------------- catalog
 
     @abstractmethod
-    async def fetch_products(self) -> List[Dict[str, Any]]:
+    def iter_products(self, since: Optional[datetime] = None) -> AsyncIterator[List[Dict[str, Any]]]:
         """
-        Fetch products from the external platform and return them in a unified format.
-        Unified format:
+        Walk the external catalog following the platform's pagination,
+        yielding one page at a time in the unified format:
         [
             {
                 "external_id": "123",
@@ -21,5 +175,14 @@ class BaseEcommerceAdapter(ABC):
                 "metadata": {...}
             }
         ]
+        Only a bounded window of pages is held in memory, whatever the catalog size.
+        With `since`, only products modified after that instant (delta sync).
         """
         pass
+
+    async def fetch_products(self, since: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """Whole catalog (or delta) as a single list (small stores / callers that need everything at once)."""
+        products = []
+        async for batch in self.iter_products(since):
+            products.extend(batch)
+        return products
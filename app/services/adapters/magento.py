@@ -1,10 +1,25 @@
 # app/services/adapters/magento.py
-import httpx
-from typing import List, Dict, Any
+import math
+from datetime import datetime
+from typing import AsyncIterator, List, Dict, Any, Optional
 from app.services.adapters.base import BaseEcommerceAdapter
 
 class MagentoAdapter(BaseEcommerceAdapter):
-    async def fetch_products(self) -> List[Dict[str, Any]]:
+    @staticmethod
+    def _to_unified(item: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "external_id": str(item["id"]),
+            "name": item["name"],
+            "description": next((a["value"] for a in item.get("custom_attributes", []) if a["attribute_code"] == "description"), ""),
+            "price": float(item.get("price") or 0),
+            "metadata": {
+                "sku": item["sku"],
+                "type_id": item.get("type_id"),
+                "updated_at": item.get("updated_at")
+            }
+        }
+
+    async def iter_products(self, since: Optional[datetime] = None) -> AsyncIterator[List[Dict[str, Any]]]:
         access_token = self.credentials.get("access_token")
         
         if not access_token:
@@ -12,27 +27,37 @@ class MagentoAdapter(BaseEcommerceAdapter):
 
         url = f"{self.store_url}/rest/V1/products"
         headers = {"Authorization": f"Bearer {access_token}"}
-        # Magento needs search criteria
-        params = {"searchCriteria[pageSize]": 100}
+        # Magento needs search criteria; a stable sort keeps pages from overlapping
+        criteria = {
+            "searchCriteria[pageSize]": self.PAGE_SIZE,
+            "searchCriteria[sortOrders][0][field]": "entity_id",
+            "searchCriteria[sortOrders][0][direction]": "ASC"
+        }
+        if since:
+            # updated_at is stored in UTC
+            criteria.update({
+                "searchCriteria[filter_groups][0][filters][0][field]": "updated_at",
+                "searchCriteria[filter_groups][0][filters][0][value]": f"{self._utc(since):%Y-%m-%d %H:%M:%S}",
+                "searchCriteria[filter_groups][0][filters][0][condition_type]": "gt"
+            })
         
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, headers=headers, params=params)
+        async def fetch(page: int):
+            response = await self._get(url, headers=headers, params={**criteria, "searchCriteria[currentPage]": page})
             if response.status_code != 200:
                 raise Exception(f"Magento API error: {response.text}")
-            
-            data = response.json()
-            items = data.get("items", [])
-            unified = []
-            for item in items:
-                unified.append({
-                    "external_id": str(item["id"]),
-                    "name": item["name"],
-                    "description": next((a["value"] for a in item.get("custom_attributes", []) if a["attribute_code"] == "description"), ""),
-                    "price": float(item.get("price") or 0),
-                    "metadata": {
-                        "sku": item["sku"],
-                        "type_id": item.get("type_id"),
-                        "updated_at": item.get("updated_at")
-                    }
-                })
-            return unified
+            return response.json()
+
+        # Page 1 tells total_count; the remaining pages are fetched concurrently.
+        # (Past the last page Magento keeps returning the last page, so never go beyond it)
+        data = await fetch(1)
+        self.total = int(data.get("total_count") or 0)
+        items = data.get("items", [])
+        if items:
+            yield [self._to_unified(item) for item in items]
+        
+        last_page = math.ceil(self.total / self.PAGE_SIZE)
+        if items and last_page > 1:
+            async def fetch_page(page: int):
+                return [self._to_unified(item) for item in (await fetch(page)).get("items", [])]
+            async for batch in self._ordered_pages(fetch_page, 2, last_page):
+                yield batch
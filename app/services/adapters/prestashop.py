@@ -1,11 +1,48 @@
 # app/services/adapters/prestashop.py
-import httpx
 import xml.etree.ElementTree as ET
-from typing import List, Dict, Any
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from typing import AsyncIterator, List, Dict, Any, Optional
 from app.services.adapters.base import BaseEcommerceAdapter
 
 class PrestaShopAdapter(BaseEcommerceAdapter):
-    async def fetch_products(self) -> List[Dict[str, Any]]:
+    # date_upd is stored in shop-local time; without a configured timezone the
+    # delta bound is widened by the largest UTC offset there is
+    MAX_UTC_OFFSET = timedelta(hours=14)
+
+    @staticmethod
+    def _to_unified(p: Dict[str, Any]) -> Dict[str, Any]:
+        # PrestaShop name/description are often localized
+        name = p.get("name", "")
+        if isinstance(name, list): name = name[0].get("value", "")
+        
+        description = p.get("description", "")
+        if isinstance(description, list): description = description[0].get("value", "")
+
+        return {
+            "external_id": str(p["id"]),
+            "name": name,
+            "description": description,
+            "price": float(p.get("price") or 0),
+            "metadata": {
+                "reference": p.get("reference"),
+                "active": p.get("active"),
+                "id_category_default": p.get("id_category_default")
+            }
+        }
+
+    def _shop_time(self, since: datetime) -> datetime:
+        """`since` as a naive shop-local time (credentials["timezone"], an IANA name)."""
+        shop_timezone = self.credentials.get("timezone")
+        if not shop_timezone:
+            return self._utc(since).replace(tzinfo=None) - self.MAX_UTC_OFFSET
+        try:
+            tz = ZoneInfo(shop_timezone)
+        except (ZoneInfoNotFoundError, ValueError):
+            raise ValueError(f"Unknown PrestaShop timezone: {shop_timezone}")
+        return self._utc(since).astimezone(tz).replace(tzinfo=None)
+
+    async def iter_products(self, since: Optional[datetime] = None) -> AsyncIterator[List[Dict[str, Any]]]:
         api_key = self.credentials.get("api_key")
         
         if not api_key:
@@ -13,38 +50,24 @@ class PrestaShopAdapter(BaseEcommerceAdapter):
 
         # PrestaShop REST API is XML-based by default
         url = f"{self.store_url}/api/products"
-        # We use display=full to get all product details in one go
         params = {
             "ws_key": api_key,
             "display": "full",
-            "output_format": "JSON" # If supported/configured, otherwise we'd parse XML
+            "output_format": "JSON", # If supported/configured, otherwise we'd parse XML
+            "sort": "[id_ASC]"
         }
-        
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, params=params)
+        if since:
+            params.update({"date": "1", "filter[date_upd]": f">[{self._shop_time(since):%Y-%m-%d %H:%M:%S}]"})
+
+        # We use display=full to get all product details; limit=offset,count pages through them.
+        # No total is reported, so pages are requested ahead until one comes back short
+        async def fetch_page(page: int):
+            response = await self._get(url, params={**params, "limit": f"{page * self.PAGE_SIZE},{self.PAGE_SIZE}"})
             if response.status_code != 200:
                 raise Exception(f"PrestaShop API error: {response.text}")
-            
-            data = response.json()
-            products = data.get("products", [])
-            unified = []
-            for p in products:
-                # PrestaShop name/description are often localized
-                name = p.get("name", "")
-                if isinstance(name, list): name = name[0].get("value", "")
-                
-                description = p.get("description", "")
-                if isinstance(description, list): description = description[0].get("value", "")
-
-                unified.append({
-                    "external_id": str(p["id"]),
-                    "name": name,
-                    "description": description,
-                    "price": float(p.get("price") or 0),
-                    "metadata": {
-                        "reference": p.get("reference"),
-                        "active": p.get("active"),
-                        "id_category_default": p.get("id_category_default")
-                    }
-                })
-            return unified
+            # An empty page comes back as [] instead of an object
+            data = response.json() or {}
+            return [self._to_unified(p) for p in data.get("products", [])]
+
+        async for batch in self._ordered_pages(fetch_page, 0):
+            yield batch
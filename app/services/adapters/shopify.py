@@ -1,10 +1,29 @@
 # app/services/adapters/shopify.py
-import httpx
-from typing import List, Dict, Any
+from datetime import datetime
+from typing import AsyncIterator, List, Dict, Any, Optional
 from app.services.adapters.base import BaseEcommerceAdapter
 
 class ShopifyAdapter(BaseEcommerceAdapter):
-    async def fetch_products(self) -> List[Dict[str, Any]]:
+    PAGE_SIZE = 250  # REST Admin API maximum
+
+    @staticmethod
+    def _to_unified(p: Dict[str, Any]) -> Dict[str, Any]:
+        # Use the first variant for price
+        variant = p["variants"][0] if p.get("variants") else {}
+        return {
+            "external_id": str(p["id"]),
+            "name": p["title"],
+            "description": p.get("body_html", ""),
+            "price": float(variant.get("price") or 0),
+            "metadata": {
+                "sku": variant.get("sku"),
+                "vendor": p.get("vendor"),
+                "product_type": p.get("product_type"),
+                "status": p.get("status")
+            }
+        }
+
+    async def iter_products(self, since: Optional[datetime] = None) -> AsyncIterator[List[Dict[str, Any]]]:
         access_token = self.credentials.get("access_token")
         
         if not access_token:
@@ -13,28 +32,20 @@ class ShopifyAdapter(BaseEcommerceAdapter):
         # Using Shopify REST Admin API for simplicity
         url = f"{self.store_url}/admin/api/2023-10/products.json"
         headers = {"X-Shopify-Access-Token": access_token}
+        params = {"limit": self.PAGE_SIZE}
+        if since:
+            params["updated_at_min"] = self._utc(since).isoformat()
         
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, headers=headers)
+        # Cursor pagination is inherently sequential: each page's Link header
+        # carries the next page URL (with page_info, filters included)
+        while url:
+            response = await self._get(url, headers=headers, params=params)
             if response.status_code != 200:
                 raise Exception(f"Shopify API error: {response.text}")
             
-            data = response.json()
-            products = data.get("products", [])
-            unified = []
-            for p in products:
-                # Use the first variant for price
-                variant = p["variants"][0] if p.get("variants") else {}
-                unified.append({
-                    "external_id": str(p["id"]),
-                    "name": p["title"],
-                    "description": p.get("body_html", ""),
-                    "price": float(variant.get("price") or 0),
-                    "metadata": {
-                        "sku": variant.get("sku"),
-                        "vendor": p.get("vendor"),
-                        "product_type": p.get("product_type"),
-                        "status": p.get("status")
-                    }
-                })
-            return unified
+            products = response.json().get("products", [])
+            if products:
+                yield [self._to_unified(p) for p in products]
+            
+            url = response.links.get("next", {}).get("url")
+            params = None
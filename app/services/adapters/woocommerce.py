@@ -1,10 +1,24 @@
 # app/services/adapters/woocommerce.py
-import httpx
-from typing import List, Dict, Any
+from datetime import datetime
+from typing import AsyncIterator, List, Dict, Any, Optional
 from app.services.adapters.base import BaseEcommerceAdapter
 
 class WooCommerceAdapter(BaseEcommerceAdapter):
-    async def fetch_products(self) -> List[Dict[str, Any]]:
+    @staticmethod
+    def _to_unified(p: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "external_id": str(p["id"]),
+            "name": p["name"],
+            "description": p.get("description", ""),
+            "price": float(p["price"] or 0),
+            "metadata": {
+                "sku": p.get("sku"),
+                "categories": [c["name"] for c in p.get("categories", [])],
+                "permalink": p.get("permalink")
+            }
+        }
+
+    async def iter_products(self, since: Optional[datetime] = None) -> AsyncIterator[List[Dict[str, Any]]]:
         consumer_key = self.credentials.get("consumer_key")
         consumer_secret = self.credentials.get("consumer_secret")
         
@@ -13,24 +27,26 @@ class WooCommerceAdapter(BaseEcommerceAdapter):
 
         url = f"{self.store_url}/wp-json/wc/v3/products"
         auth = (consumer_key, consumer_secret)
+        params = {"per_page": self.PAGE_SIZE, "orderby": "id", "order": "asc"}
+        if since:
+            params.update({"modified_after": f"{self._utc(since):%Y-%m-%dT%H:%M:%S}", "dates_are_gmt": "true"})
         
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, auth=auth, params={"per_page": 100})
+        async def fetch(page: int):
+            response = await self._get(url, auth=auth, params={**params, "page": page})
             if response.status_code != 200:
                 raise Exception(f"WooCommerce API error: {response.text}")
-            
-            products = response.json()
-            unified = []
-            for p in products:
-                unified.append({
-                    "external_id": str(p["id"]),
-                    "name": p["name"],
-                    "description": p.get("description", ""),
-                    "price": float(p["price"] or 0),
-                    "metadata": {
-                        "sku": p.get("sku"),
-                        "categories": [c["name"] for c in p.get("categories", [])],
-                        "permalink": p.get("permalink")
-                    }
-                })
-            return unified
+            return response
+
+        # Page numbers: page 1 tells the page count (X-WP-TotalPages), the rest are fetched concurrently
+        first = await fetch(1)
+        self.total = int(first.headers["X-WP-Total"]) if first.headers.get("X-WP-Total") else None
+        products = first.json()
+        if products:
+            yield [self._to_unified(p) for p in products]
+        
+        total_pages = int(first.headers.get("X-WP-TotalPages") or 1)
+        if products and total_pages > 1:
+            async def fetch_page(page: int):
+                return [self._to_unified(p) for p in (await fetch(page)).json()]
+            async for batch in self._ordered_pages(fetch_page, 2, total_pages):
+                yield batch
@@ -10,6 +10,8 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, delete, and_
 from sqlalchemy.orm import selectinload
 from app.services.gemini_service import GeminiService
+from app.services.abandonment_scheduler import abandonment_scheduler
+from app.services.cart_status_service import CartStatusService
 
 # Modelos
 from app.models.product import Product
@@ -285,7 +287,7 @@ class AIService:
             # 3. Operaciones de Carrito (Prioridad 3)
             # Manejo de recuperación (si el usuario vuelve tras abandono)
             if cart.status == "abandoned":
-                cart.status = "recovered"
+                await CartStatusService.set_status(db, cart, "recovered")
                 await db.commit()
 
             if matched and (intent == "add_to_cart" or intent == "search"):
@@ -325,6 +327,7 @@ class AIService:
             new_item = CartItem(cart_id=cart.id, product_id=product.id, quantity=qty)
             db.add(new_item)
             cart.items.append(new_item)
+        await abandonment_scheduler.touch(db, cart)
         await db.commit()
         total = sum(i.quantity * i.product.price for i in cart.items)
         return {
@@ -346,6 +349,7 @@ class AIService:
         message = DiscountService.generate_checkout_message(cart, payment_link)
         
         cart.is_active = False  # Soft close
+        await abandonment_scheduler.cancel(db, cart.id)
         await db.commit()
         
         return message, "text"
@@ -0,0 +1,167 @@
+# app/services/analytics_buffer.py
+import asyncio
+import logging
+from typing import Dict, List, Optional
+from sqlalchemy import insert
+from app.core.config import (
+    ANALYTICS_BUFFER_MAX_EVENTS, ANALYTICS_FLUSH_BATCH, ANALYTICS_FLUSH_SECONDS, ANALYTICS_OVERFLOW
+)
+from app.db.session import AsyncSessionLocal
+from app.models.analytics import CartRecoveryEvent, AIPerformanceMetric
+from app.services.analytics_rollup_service import AnalyticsRollupService
+from app.services.analytics_cache import analytics_cache
+
+logger = logging.getLogger(__name__)
+
+
+class AnalyticsEventBuffer:
+    """
+    Process-level buffer for analytics writes.
+
+    track_event() / track_ai_interaction() only append a row here; a background
+    task writes the buffer in batches (one multi-row INSERT per table plus the
+    rollup upserts, one commit) every `flush_seconds` or as soon as
+    `batch_size` rows are pending. When `max_events` rows are pending the
+    overflow policy applies: "drop" discards the new row, "block" makes the
+    caller wait for a flush (backpressure). A batch whose write fails goes
+    back into the buffer (within `max_events`) and is retried next flush.
+    """
+
+    def __init__(
+        self,
+        max_events: int = ANALYTICS_BUFFER_MAX_EVENTS,
+        batch_size: int = ANALYTICS_FLUSH_BATCH,
+        flush_seconds: float = ANALYTICS_FLUSH_SECONDS,
+        overflow: str = ANALYTICS_OVERFLOW
+    ):
+        if overflow not in ("drop", "block"):
+            raise ValueError(f"Unsupported analytics overflow policy: {overflow}")
+        self.max_events = max_events
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.overflow = overflow
+        self.dropped = 0
+        self._events: List[Dict] = []
+        self._ai: List[Dict] = []
+        self._wake = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+    def __len__(self):
+        return len(self._events) + len(self._ai)
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    async def add_event(self, row: Dict):
+        await self._add(self._events, row)
+
+    async def add_ai_interaction(self, row: Dict):
+        await self._add(self._ai, row)
+
+    async def _add(self, queue: List[Dict], row: Dict):
+        if len(self) >= self.max_events:
+            if self.overflow == "drop":
+                self.dropped += 1
+                if self.dropped % 1000 == 1:
+                    logger.warning(f"Analytics buffer full ({self.max_events}), {self.dropped} rows dropped so far")
+                return
+            await self.flush()
+
+        queue.append(row)
+
+        # Without the background task (scripts, tests) write through immediately
+        if not self.running:
+            await self.flush()
+        elif len(self) >= self.batch_size:
+            self._wake.set()
+
+    async def flush(self) -> int:
+        """Write everything pending. Returns the number of rows written."""
+        async with self._flush_lock:
+            events, self._events = self._events, []
+            ai, self._ai = self._ai, []
+            if not events and not ai:
+                return 0
+
+            try:
+                async with AsyncSessionLocal() as db:
+                    await self._write(db, events, ai)
+            except Exception as e:
+                logger.error(f"Error flushing {len(events) + len(ai)} analytics rows, will retry: {e}", exc_info=True)
+                self._requeue(events, ai)
+                return 0
+
+            # Cached analytics of these businesses are now behind the data
+            analytics_cache.bump({row["business_id"] for row in events + ai})
+            logger.debug(f"Flushed {len(events)} events and {len(ai)} AI interactions")
+            return len(events) + len(ai)
+
+    def _requeue(self, events: List[Dict], ai: List[Dict]):
+        """Put a failed batch back in front of the buffer, dropping its oldest rows past `max_events`."""
+        excess = max(0, len(events) + len(ai) + len(self) - self.max_events)
+        if excess:
+            self.dropped += excess
+            logger.warning(f"Analytics buffer full ({self.max_events}), {excess} unflushed rows dropped")
+            dropped_events = min(excess, len(events))
+            events, ai = events[dropped_events:], ai[excess - dropped_events:]
+        self._events = events + self._events
+        self._ai = ai + self._ai
+
+    async def _write(self, db, events: List[Dict], ai: List[Dict]):
+        if events:
+            await db.execute(insert(CartRecoveryEvent), events)
+            deltas = {}
+            for e in events:
+                AnalyticsRollupService.event_delta(
+                    deltas, e["business_id"], e["event_type"], e["timestamp"],
+                    e["cart_value"], e["time_to_recovery_hours"]
+                )
+            await AnalyticsRollupService.apply_event_deltas(db, deltas)
+
+        if ai:
+            await db.execute(insert(AIPerformanceMetric), ai)
+            deltas, sketches = {}, {}
+            for m in ai:
+                AnalyticsRollupService.ai_delta(
+                    deltas, m["business_id"], m["response_source"], m["timestamp"],
+                    m["led_to_cart_action"], m["response_time_ms"]
+                )
+                AnalyticsRollupService.sketch_delta(
+                    sketches, m["business_id"], m["response_source"], m["timestamp"], m["response_time_ms"]
+                )
+            await AnalyticsRollupService.apply_ai_deltas(db, deltas)
+            await AnalyticsRollupService.apply_latency_sketches(db, sketches)
+
+        await db.commit()
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.flush_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self.flush()
+
+    async def start(self):
+        if self._task:
+            return
+        self._stopping = False
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the background task and flush whatever is still pending."""
+        if self._task:
+            # Let an in-flight flush finish instead of cancelling it mid-write
+            self._stopping = True
+            self._wake.set()
+            await self._task
+            self._task = None
+        written = await self.flush()
+        logger.info(f"Analytics buffer stopped, {written} pending rows flushed ({self.dropped} dropped overall)")
+
+
+analytics_buffer = AnalyticsEventBuffer()
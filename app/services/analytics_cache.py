@@ -0,0 +1,151 @@
+# app/services/analytics_cache.py
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from typing import Awaitable, Callable, Dict, Hashable, Iterable, NamedTuple, Optional, Set
+from fastapi import Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
+from app.core.config import ANALYTICS_CACHE_TTL_SECONDS, ANALYTICS_CACHE_STALE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+Compute = Callable[[], Awaitable[Dict]]
+
+
+class CachedResult(NamedTuple):
+    content: object  # JSON-ready payload
+    etag: Optional[str]  # None for partial results
+    computed_at: float
+    watermark: int
+    partial: bool = False
+
+
+class AnalyticsCache:
+    """
+    In-process result cache for the /analytics endpoints, keyed by
+    (business_id, endpoint, window/params).
+
+    An entry is fresh for `ttl` seconds as long as the business' write
+    watermark has not moved (the analytics buffer bumps it after every flush).
+    A stale entry younger than `ttl + stale` is served immediately while a
+    single background task recomputes it; older entries are recomputed inline,
+    with concurrent callers sharing one computation. Responses carry an ETag so
+    polling clients get 304s while nothing changed. Partial results (a
+    payload flagged `"partial": true`, e.g. a dashboard with a section that
+    failed or timed out) are returned to the callers that computed them but
+    never cached nor given an ETag, so the next request tries again.
+
+    Watermarks are per worker: writes flushed by another worker are picked up
+    once the entry's TTL runs out.
+    """
+
+    MAX_ENTRIES = 2000
+
+    def __init__(self, ttl: float = ANALYTICS_CACHE_TTL_SECONDS, stale: float = ANALYTICS_CACHE_STALE_SECONDS):
+        self.ttl = ttl
+        self.stale = stale
+        self._entries: Dict[Hashable, CachedResult] = {}
+        self._watermarks: Dict[int, int] = {}
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self._background: Set[asyncio.Task] = set()
+
+    def watermark(self, business_id: int) -> int:
+        return self._watermarks.get(business_id, 0)
+
+    def bump(self, business_ids: Iterable[int]):
+        """Mark cached results of these businesses as outdated."""
+        for business_id in business_ids:
+            self._watermarks[business_id] = self._watermarks.get(business_id, 0) + 1
+
+    def invalidate(self, business_id: Optional[int] = None):
+        if business_id is None:
+            self._entries.clear()
+        else:
+            for key in [k for k in self._entries if k[0] == business_id]:
+                del self._entries[key]
+
+    @staticmethod
+    def _etag(content) -> str:
+        digest = hashlib.sha1(json.dumps(content, sort_keys=True, separators=(",", ":")).encode()).hexdigest()
+        return f'W/"{digest[:20]}"'
+
+    async def _compute(self, key, business_id: int, compute: Compute) -> CachedResult:
+        # Single flight: concurrent misses for the same key share one computation
+        future = self._inflight.get(key)
+        if future:
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            watermark = self.watermark(business_id)
+            content = jsonable_encoder(await compute())
+            if isinstance(content, dict) and content.get("partial"):
+                result = CachedResult(content, None, time.monotonic(), watermark, partial=True)
+            else:
+                result = CachedResult(content, self._etag(content), time.monotonic(), watermark)
+                if len(self._entries) >= self.MAX_ENTRIES:
+                    self._entries.pop(next(iter(self._entries)))
+                self._entries[key] = result
+            future.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # retrieved: no "never retrieved" warning without waiters
+            raise
+        finally:
+            del self._inflight[key]
+
+    def _refresh_in_background(self, key, business_id: int, compute: Compute):
+        if key in self._inflight:
+            return
+
+        async def refresh():
+            try:
+                await self._compute(key, business_id, compute)
+            except Exception as e:
+                logger.error(f"Background refresh of analytics {key} failed: {e}", exc_info=True)
+
+        task = asyncio.create_task(refresh())
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def get(self, business_id: int, endpoint: str, params: tuple, compute: Compute) -> CachedResult:
+        key = (business_id, endpoint, params)
+        entry = self._entries.get(key)
+        if entry:
+            age = time.monotonic() - entry.computed_at
+            if age < self.ttl and entry.watermark == self.watermark(business_id):
+                return entry
+            if age < self.ttl + self.stale:
+                self._refresh_in_background(key, business_id, compute)
+                return entry
+        return await self._compute(key, business_id, compute)
+
+    async def respond(
+        self,
+        request: Request,
+        business_id: int,
+        endpoint: str,
+        params: tuple,
+        compute: Compute
+    ) -> Response:
+        """Cached JSON response, or 304 when If-None-Match matches the current ETag."""
+        result = await self.get(business_id, endpoint, params, compute)
+        if result.partial:
+            return JSONResponse(content=result.content, headers={"Cache-Control": "no-store"})
+        headers = {"ETag": result.etag, "Cache-Control": f"private, max-age={int(self.ttl)}"}
+
+        if_none_match = request.headers.get("if-none-match", "")
+        if result.etag in [tag.strip() for tag in if_none_match.split(",")]:
+            return Response(status_code=304, headers=headers)
+        return JSONResponse(content=result.content, headers=headers)
+
+
+analytics_cache = AnalyticsCache()
@@ -0,0 +1,237 @@
+# app/services/analytics_funnel_service.py
+from typing import Dict, List, Optional, Sequence
+from datetime import datetime, timedelta
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func, case, cast, literal_column, tuple_, Integer
+from app.models.analytics import CartRecoveryEvent, EventType
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Lifecycle order of a cart; funnels are any ordered subset of it
+FUNNEL_STEPS = (
+    EventType.CART_CREATED,
+    EventType.CART_ABANDONED,
+    EventType.RECOVERY_SENT,
+    EventType.CART_RECOVERED,
+    EventType.CHECKOUT_COMPLETED,
+    EventType.PAYMENT_COMPLETED,
+)
+
+def _sql_utc_week(column):
+    return func.date_trunc(literal_column("'week'"), func.timezone(literal_column("'UTC'"), column))
+
+def _pct(part: int, whole: int) -> float:
+    return round(part / whole * 100, 2) if whole else 0.0
+
+class AnalyticsFunnelService:
+    """
+    Conversion funnel (per cart) and weekly cohorts (per customer) over
+    cart_recovery_events. Each report is a single query: first occurrence
+    per key with GROUP BY, step order and gaps with window functions, and
+    the final aggregation in SQL, so only one row per step / cohort-week
+    comes back. Both read a business's time window through
+    ix_cart_recovery_events_business_timestamp, which covers every column
+    they need (index-only scans, pruned to the partitions in range).
+    """
+
+    DEFAULT_DAYS = 30
+    DEFAULT_COHORT_WEEKS = 8
+
+    @staticmethod
+    def parse_steps(names: Optional[Sequence[str]]) -> List[EventType]:
+        """Event type values -> funnel steps; raises ValueError on unknown or out-of-order steps."""
+        if not names:
+            return list(FUNNEL_STEPS)
+        steps = [EventType(name) for name in names]
+        if any(step not in FUNNEL_STEPS for step in steps):
+            raise ValueError(f"Funnel steps must be among: {', '.join(s.value for s in FUNNEL_STEPS)}")
+        if [FUNNEL_STEPS.index(s) for s in steps] != sorted({FUNNEL_STEPS.index(s) for s in steps}):
+            raise ValueError("Funnel steps must be distinct and in lifecycle order")
+        return steps
+
+    @classmethod
+    async def get_funnel(
+        cls,
+        db: AsyncSession,
+        business_id: int,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        steps: Optional[Sequence[EventType]] = None
+    ) -> Dict:
+        """
+        Step-by-step cart conversion.
+
+        A cart reaches step n when it has an event for every step 1..n inside
+        the window. Time between steps is measured between the first
+        occurrence of each step.
+
+        Returns:
+            Dict with per-step cart counts, conversion rates and hours from
+            the previous step (average and median)
+        """
+        if not end_date:
+            end_date = datetime.utcnow()
+        if not start_date:
+            start_date = end_date - timedelta(days=cls.DEFAULT_DAYS)
+        steps = list(steps or FUNNEL_STEPS)
+
+        e = CartRecoveryEvent
+        firsts = select(
+            e.cart_id,
+            e.event_type,
+            func.min(e.timestamp).label("at")
+        ).where(
+            e.business_id == business_id,
+            e.cart_id.isnot(None),
+            e.event_type.in_(steps),
+            e.timestamp >= start_date,
+            e.timestamp < end_date
+        ).group_by(e.cart_id, e.event_type).cte("firsts")
+
+        step_no = case(
+            *[(firsts.c.event_type == step, i) for i, step in enumerate(steps, 1)]
+        )
+        in_cart = dict(partition_by=firsts.c.cart_id, order_by=step_no)
+        ordered = select(
+            step_no.label("step"),
+            func.row_number().over(**in_cart).label("position"),
+            (
+                func.extract("epoch", firsts.c.at - func.lag(firsts.c.at).over(**in_cart)) / 3600.0
+            ).label("hours_from_previous")
+        ).cte("ordered")
+
+        # position == step: every earlier step is present for this cart
+        hours = ordered.c.hours_from_previous
+        stmt = select(
+            ordered.c.step,
+            func.count().label("carts"),
+            func.avg(hours).label("avg_hours"),
+            func.percentile_cont(0.5).within_group(hours).label("median_hours")
+        ).where(
+            ordered.c.position == ordered.c.step
+        ).group_by(ordered.c.step).order_by(ordered.c.step)
+
+        by_step = {r.step: r for r in (await db.execute(stmt)).all()}
+
+        result = []
+        started = by_step[1].carts if 1 in by_step else 0
+        previous = started
+        for i, step in enumerate(steps, 1):
+            row = by_step.get(i)
+            carts = row.carts if row else 0
+            result.append({
+                "step": step.value,
+                "carts": carts,
+                "conversion_from_previous_percent": _pct(carts, previous),
+                "conversion_from_start_percent": _pct(carts, started),
+                "avg_hours_from_previous": round(row.avg_hours, 2) if row and row.avg_hours is not None else None,
+                "median_hours_from_previous": round(row.median_hours, 2) if row and row.median_hours is not None else None
+            })
+            previous = carts
+
+        return {
+            "period": {
+                "start": start_date.isoformat(),
+                "end": end_date.isoformat()
+            },
+            "steps": result,
+            "overall_conversion_percent": _pct(result[-1]["carts"], started) if result else 0.0
+        }
+
+    @classmethod
+    async def get_weekly_cohorts(
+        cls,
+        db: AsyncSession,
+        business_id: int,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        cohort_event: EventType = EventType.CART_CREATED,
+        conversion_event: EventType = EventType.PAYMENT_COMPLETED,
+        max_weeks: int = DEFAULT_COHORT_WEEKS
+    ) -> Dict:
+        """
+        Weekly cohorts: customers grouped by the UTC week of their first
+        `cohort_event` in the window, with how many of them had a
+        `conversion_event` 0..max_weeks weeks later.
+
+        Returns:
+            Dict with one entry per cohort week: size, converted customers and
+            the per-week conversion curve
+        """
+        if not end_date:
+            end_date = datetime.utcnow()
+        if not start_date:
+            start_date = end_date - timedelta(weeks=max_weeks)
+
+        e = CartRecoveryEvent
+        is_cohort_event = e.event_type == cohort_event
+        events = select(
+            e.user_phone,
+            e.event_type,
+            _sql_utc_week(e.timestamp).label("week"),
+            _sql_utc_week(
+                func.min(e.timestamp).filter(is_cohort_event).over(partition_by=e.user_phone)
+            ).label("cohort_week")
+        ).where(
+            e.business_id == business_id,
+            e.event_type.in_([cohort_event, conversion_event]),
+            e.timestamp >= start_date,
+            e.timestamp < end_date
+        ).cte("events")
+
+        week_offset = cast(func.extract("day", events.c.week - events.c.cohort_week), Integer) // 7
+        placed = select(
+            events.c.user_phone,
+            events.c.event_type,
+            events.c.cohort_week,
+            week_offset.label("week_offset")
+        ).where(
+            events.c.cohort_week.isnot(None),
+            week_offset.between(0, max_weeks)
+        ).cte("placed")
+
+        stmt = select(
+            placed.c.cohort_week,
+            placed.c.week_offset,
+            func.grouping(placed.c.week_offset).label("is_cohort_total"),
+            func.count(placed.c.user_phone.distinct()).label("customers"),
+            func.count(placed.c.user_phone.distinct()).filter(
+                placed.c.event_type == conversion_event
+            ).label("converted")
+        ).group_by(
+            func.grouping_sets(
+                tuple_(placed.c.cohort_week, placed.c.week_offset),
+                tuple_(placed.c.cohort_week)
+            )
+        ).order_by(placed.c.cohort_week, placed.c.week_offset)
+
+        cohorts: Dict[datetime, Dict] = {}
+        for r in (await db.execute(stmt)).all():
+            cohort = cohorts.setdefault(r.cohort_week, {
+                "cohort_week": r.cohort_week.date().isoformat(),
+                "customers": 0,
+                "converted": 0,
+                "conversion_percent": 0.0,
+                "weeks": []
+            })
+            if r.is_cohort_total:
+                cohort["customers"] = r.customers
+                cohort["converted"] = r.converted
+            elif r.converted:
+                cohort["weeks"].append({"week": r.week_offset, "converted": r.converted})
+
+        for cohort in cohorts.values():
+            cohort["conversion_percent"] = _pct(cohort["converted"], cohort["customers"])
+            for week in cohort["weeks"]:
+                week["conversion_percent"] = _pct(week["converted"], cohort["customers"])
+
+        return {
+            "period": {
+                "start": start_date.isoformat(),
+                "end": end_date.isoformat()
+            },
+            "cohort_event": cohort_event.value,
+            "conversion_event": conversion_event.value,
+            "cohorts": list(cohorts.values())
+        }
@@ -0,0 +1,230 @@
+# app/services/analytics_partition_service.py
+import gzip
+import logging
+import os
+import re
+from datetime import datetime, timezone
+from typing import List, NamedTuple, Optional
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+from app.core.config import ANALYTICS_RETENTION_MONTHS, ANALYTICS_ARCHIVE_DIR
+from app.db.session import engine
+
+logger = logging.getLogger(__name__)
+
+# Range-partitioned by month on "timestamp" (see migration d5b7e3a1c920)
+PARTITIONED_TABLES = ("cart_recovery_events", "ai_performance_metrics")
+
+# Serializes partition DDL across workers
+PARTITION_LOCK_KEY = 7040001
+
+
+class Partition(NamedTuple):
+    name: str
+    lower: Optional[datetime]  # None = MINVALUE
+    upper: Optional[datetime]  # None = MAXVALUE
+
+
+def month_start(dt: datetime, offset: int = 0) -> datetime:
+    """First instant (UTC) of the month `offset` months after dt's month."""
+    year, month = divmod(dt.month - 1 + offset, 12)
+    return datetime(dt.year + year, month + 1, 1, tzinfo=timezone.utc)
+
+
+def _parse_bound(value: str) -> Optional[datetime]:
+    if value in ("MINVALUE", "MAXVALUE"):
+        return None
+    return datetime.fromisoformat(value.strip("'")).astimezone(timezone.utc)
+
+
+def _range_sql(lower: Optional[datetime], upper: datetime) -> str:
+    condition = f"\"timestamp\" IS NOT NULL AND \"timestamp\" < '{upper.isoformat()}'"
+    if lower:
+        condition += f" AND \"timestamp\" >= '{lower.isoformat()}'"
+    return condition
+
+
+class AnalyticsPartitionService:
+    """
+    Monthly partitions of the analytics event tables: creates upcoming
+    months ahead of time and retires months past the retention window by
+    archiving them to gzipped CSV, detaching and dropping them. Queries
+    filtered by timestamp only touch the partitions in range.
+
+    The partitioning migration attached the pre-existing table as a single
+    MINVALUE partition, so all history before it is one partition that is
+    never pruned, and retention drops it whole once its newest month ages
+    out. split_legacy_partition() backfills it into monthly partitions
+    (copied while online, then reconciled and swapped under one lock); run
+    it once after the migration (scripts/analytics_retention.py
+    --split-legacy).
+    """
+
+    MONTHS_AHEAD = 3
+
+    @staticmethod
+    async def partitions(conn: AsyncConnection, table: str) -> List[Partition]:
+        rows = await conn.execute(text("""
+            SELECT c.relname, pg_get_expr(c.relpartbound, c.oid)
+            FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = CAST(:table AS regclass)
+        """), {"table": table})
+
+        result = []
+        for name, bound in rows:
+            match = re.search(r"FROM \((.+?)\) TO \((.+?)\)", bound or "")
+            if match:
+                result.append(Partition(name, _parse_bound(match.group(1)), _parse_bound(match.group(2))))
+        return sorted(result, key=lambda p: p.upper or datetime.max.replace(tzinfo=timezone.utc))
+
+    @classmethod
+    async def ensure_partitions(cls, months_ahead: Optional[int] = None) -> List[str]:
+        """Create the monthly partitions from this month to `months_ahead` months out. Idempotent."""
+        months_ahead = cls.MONTHS_AHEAD if months_ahead is None else months_ahead
+        now = datetime.now(timezone.utc)
+        created = []
+
+        async with engine.begin() as conn:
+            await conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": PARTITION_LOCK_KEY})
+            for table in PARTITIONED_TABLES:
+                existing = await cls.partitions(conn, table)
+                for offset in range(months_ahead + 1):
+                    start, end = month_start(now, offset), month_start(now, offset + 1)
+                    # Skip months already covered (e.g. by the pre-partitioning table)
+                    if any(
+                        (p.lower is None or p.lower < end) and (p.upper is None or p.upper > start)
+                        for p in existing
+                    ):
+                        continue
+                    name = f"{table}_p{start:%Y%m}"
+                    await conn.execute(text(
+                        f"CREATE TABLE {name} PARTITION OF {table} "
+                        f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+                    ))
+                    created.append(name)
+
+        if created:
+            logger.info(f"Created analytics partitions: {', '.join(created)}")
+        return created
+
+    @staticmethod
+    async def _archive(conn: AsyncConnection, name: str, archive_dir: str) -> str:
+        """COPY a partition to <archive_dir>/<name>.csv.gz; the file only appears once complete."""
+        os.makedirs(archive_dir, exist_ok=True)
+        path = os.path.join(archive_dir, f"{name}.csv.gz")
+        tmp_path = path + ".partial"
+
+        raw = await conn.get_raw_connection()
+        with gzip.open(tmp_path, "wb") as out:
+            async def write(chunk: bytes):
+                out.write(chunk)
+            await raw.driver_connection.copy_from_table(name, output=write, format="csv", header=True)
+
+        os.replace(tmp_path, path)
+        return path
+
+    @classmethod
+    async def apply_retention(
+        cls,
+        keep_months: int = ANALYTICS_RETENTION_MONTHS,
+        archive_dir: str = ANALYTICS_ARCHIVE_DIR
+    ) -> List[str]:
+        """
+        Archive, detach and drop every partition that ends before the first
+        of the month `keep_months` months ago.
+
+        Returns:
+            Paths of the archives written
+        """
+        cutoff = month_start(datetime.now(timezone.utc), -keep_months)
+        archived = []
+
+        # DETACH ... CONCURRENTLY cannot run inside a transaction block
+        async with engine.connect() as conn:
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            for table in PARTITIONED_TABLES:
+                for partition in await cls.partitions(conn, table):
+                    if partition.upper is None or partition.upper > cutoff:
+                        continue
+
+                    # Archive while still attached: a failure leaves the partition in place
+                    path = await cls._archive(conn, partition.name, archive_dir)
+                    await conn.execute(text(f"ALTER TABLE {table} DETACH PARTITION {partition.name} CONCURRENTLY"))
+                    await conn.execute(text(f"DROP TABLE {partition.name}"))
+                    archived.append(path)
+                    logger.info(f"Archived and dropped {partition.name} (< {partition.upper:%Y-%m}) to {path}")
+
+        return archived
+
+    @classmethod
+    async def split_legacy_partition(cls, table: str) -> List[str]:
+        """
+        Replace the legacy (MINVALUE) partition of `table` with monthly partitions.
+
+        Every month is copied into its own table (same columns, indexes,
+        foreign keys and a validated range CHECK) while the legacy partition
+        keeps serving. One transaction then detaches it, copies every legacy
+        row the monthly tables are still missing (ON CONFLICT DO NOTHING on the
+        primary key, so late commits of any id are kept), attaches the monthly
+        tables (no validation scans) and drops it. That pass over the legacy
+        table blocks writes to `table` while it runs. Re-runnable: leftover
+        copies of a failed run are rebuilt.
+
+        Returns:
+            Names of the partitions created
+        """
+        async with engine.connect() as conn:
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            legacy = next((p for p in await cls.partitions(conn, table) if p.name == f"{table}_legacy"), None)
+            if legacy is None or legacy.upper is None:
+                return []
+
+            oldest = (await conn.execute(text(f'SELECT min("timestamp") FROM {legacy.name}'))).scalar()
+            if oldest is None:
+                return []
+
+            foreign_keys = (await conn.execute(text("""
+                SELECT pg_get_constraintdef(oid) FROM pg_constraint
+                WHERE conrelid = CAST(:table AS regclass) AND contype = 'f'
+            """), {"table": table})).scalars().all()
+
+            # The first month also takes whatever sorts before it (the old MINVALUE bound)
+            months = []
+            start = month_start(oldest.astimezone(timezone.utc))
+            while start < legacy.upper:
+                end = min(month_start(start, 1), legacy.upper)
+                months.append((f"{table}_p{start:%Y%m}", start if months else None, end))
+                start = end
+
+            for name, lower, upper in months:
+                await conn.execute(text(f"DROP TABLE IF EXISTS {name}"))
+                await conn.execute(text(
+                    f"CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS INCLUDING INDEXES)"
+                ))
+                await conn.execute(text(
+                    f"INSERT INTO {name} SELECT * FROM {legacy.name} WHERE {_range_sql(lower, upper)}"
+                ))
+                # Implies the partition bound, so ATTACH skips its validation scan
+                await conn.execute(text(f"ALTER TABLE {name} ADD CONSTRAINT {name}_range CHECK ({_range_sql(lower, upper)})"))
+                for i, definition in enumerate(foreign_keys):
+                    await conn.execute(text(f"ALTER TABLE {name} ADD CONSTRAINT {name}_fkey{i} {definition}"))
+
+        async with engine.begin() as conn:
+            await conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": PARTITION_LOCK_KEY})
+            await conn.execute(text(f"ALTER TABLE {table} DETACH PARTITION {legacy.name}"))
+            # Nothing can write to the legacy table any more: bring every row over
+            for name, lower, upper in months:
+                await conn.execute(text(
+                    f"INSERT INTO {name} SELECT * FROM {legacy.name} "
+                    f"WHERE {_range_sql(lower, upper)} ON CONFLICT DO NOTHING"
+                ))
+                bound = f"'{lower.isoformat()}'" if lower else "MINVALUE"
+                await conn.execute(text(
+                    f"ALTER TABLE {table} ATTACH PARTITION {name} FOR VALUES FROM ({bound}) TO ('{upper.isoformat()}')"
+                ))
+                await conn.execute(text(f"ALTER TABLE {name} DROP CONSTRAINT {name}_range"))
+            await conn.execute(text(f"DROP TABLE {legacy.name}"))
+
+        created = [name for name, _, _ in months]
+        logger.info(f"Split {legacy.name} into {len(created)} monthly partitions")
+        return created
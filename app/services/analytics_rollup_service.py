@@ -0,0 +1,480 @@
+# app/services/analytics_rollup_service.py
+from typing import Dict, Iterable, Optional, Tuple
+from datetime import date, datetime, timedelta, timezone
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func, delete, cast, literal_column, text, Date
+from sqlalchemy.dialects.postgresql import insert
+from app.models.analytics import (
+    CartRecoveryEvent, AIPerformanceMetric, DailyEventRollup, DailyAIRollup, AILatencySketch, EventType
+)
+from app.services.latency_sketch import LatencySketch
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Rollup keys and the additive counters stored under them
+EventKey = Tuple[int, date, EventType]  # (business_id, day, event_type)
+AIKey = Tuple[int, date, str]           # (business_id, day, response_source)
+SketchKey = Tuple[int, datetime, str]   # (business_id, UTC hour, response_source)
+
+# Delta writers hold it shared, reconcile() exclusively (see _lock_rollups)
+ROLLUP_LOCK_KEY = 7040002
+
+def utc_day(ts: Optional[datetime]) -> date:
+    """UTC calendar day of a timestamp (naive timestamps are taken as UTC)."""
+    if ts is None:
+        return datetime.utcnow().date()
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc)
+    return ts.date()
+
+def as_utc(ts: datetime) -> datetime:
+    """Aware UTC datetime (naive timestamps are taken as UTC)."""
+    return ts.astimezone(timezone.utc) if ts.tzinfo else ts.replace(tzinfo=timezone.utc)
+
+def utc_hour(ts: Optional[datetime]) -> datetime:
+    """Start of the UTC hour of a timestamp."""
+    return as_utc(ts or datetime.now(timezone.utc)).replace(minute=0, second=0, microsecond=0)
+
+def _sql_utc_day(column):
+    return cast(func.timezone(literal_column("'UTC'"), column), Date)
+
+class AnalyticsRollupService:
+    """
+    Daily rollups of cart events (per event type) and AI interactions
+    (per response source). Counters are incremented in the same transaction
+    as the raw rows, so dashboards read a few rows per day instead of
+    scanning the raw tables. reconcile() rebuilds recent days from the raw
+    tables to pick up late or out-of-band writes.
+    """
+
+    RECONCILE_DAYS = 2
+
+    # ------------------------------------------------------------------ write
+
+    @staticmethod
+    async def _lock_rollups(db: AsyncSession, exclusive: bool = False):
+        """
+        Transaction-scoped advisory lock on the rollup tables. Delta writers
+        share it; reconcile() takes it exclusively, so it never interleaves
+        with a flush: it waits for in-flight flushes to commit (and then sees
+        their raw rows) and flushes after it add their deltas on top.
+        """
+        lock = "pg_advisory_xact_lock" if exclusive else "pg_advisory_xact_lock_shared"
+        await db.execute(text(f"SELECT {lock}(:key)"), {"key": ROLLUP_LOCK_KEY})
+
+    @staticmethod
+    def event_delta(
+        deltas: Dict[EventKey, list],
+        business_id: int,
+        event_type: EventType,
+        timestamp: Optional[datetime],
+        cart_value: Optional[float] = None,
+        time_to_recovery_hours: Optional[float] = None
+    ):
+        """Accumulate one event into `deltas` ([count, value_sum, hours_sum, hours_count])."""
+        d = deltas.setdefault((business_id, utc_day(timestamp), event_type), [0, 0.0, 0.0, 0])
+        d[0] += 1
+        d[1] += cart_value or 0.0
+        if time_to_recovery_hours is not None:
+            d[2] += time_to_recovery_hours
+            d[3] += 1
+
+    @staticmethod
+    def ai_delta(
+        deltas: Dict[AIKey, list],
+        business_id: int,
+        response_source: str,
+        timestamp: Optional[datetime],
+        led_to_cart_action: bool = False,
+        response_time_ms: Optional[float] = None
+    ):
+        """Accumulate one interaction into `deltas` ([interactions, conversions, ms_sum, ms_count])."""
+        d = deltas.setdefault((business_id, utc_day(timestamp), response_source), [0, 0, 0.0, 0])
+        d[0] += 1
+        d[1] += 1 if led_to_cart_action else 0
+        if response_time_ms is not None:
+            d[2] += response_time_ms
+            d[3] += 1
+
+    @staticmethod
+    async def apply_event_deltas(db: AsyncSession, deltas: Dict[EventKey, list]):
+        """
+        Add accumulated deltas to the event rollup in one multi-row upsert.
+        Rides on the caller's transaction; the caller commits.
+        """
+        if not deltas:
+            return
+        await AnalyticsRollupService._lock_rollups(db)
+        table = DailyEventRollup
+        # Sorted so concurrent writers lock rollup rows in the same order
+        stmt = insert(table).values([
+            {
+                "business_id": business_id,
+                "day": day,
+                "event_type": event_type,
+                "event_count": d[0],
+                "cart_value_sum": d[1],
+                "recovery_hours_sum": d[2],
+                "recovery_hours_count": d[3]
+            }
+            for (business_id, day, event_type), d in sorted(deltas.items(), key=lambda kv: (kv[0][0], kv[0][1], kv[0][2].name))
+        ])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.business_id, table.day, table.event_type],
+            set_={
+                "event_count": table.event_count + stmt.excluded.event_count,
+                "cart_value_sum": table.cart_value_sum + stmt.excluded.cart_value_sum,
+                "recovery_hours_sum": table.recovery_hours_sum + stmt.excluded.recovery_hours_sum,
+                "recovery_hours_count": table.recovery_hours_count + stmt.excluded.recovery_hours_count
+            }
+        )
+        await db.execute(stmt)
+
+    @staticmethod
+    async def apply_ai_deltas(db: AsyncSession, deltas: Dict[AIKey, list]):
+        """
+        Add accumulated deltas to the AI rollup in one multi-row upsert.
+        Rides on the caller's transaction; the caller commits.
+        """
+        if not deltas:
+            return
+        await AnalyticsRollupService._lock_rollups(db)
+        table = DailyAIRollup
+        stmt = insert(table).values([
+            {
+                "business_id": business_id,
+                "day": day,
+                "response_source": source,
+                "interactions": d[0],
+                "conversions": d[1],
+                "response_time_sum": d[2],
+                "response_time_count": d[3]
+            }
+            for (business_id, day, source), d in sorted(deltas.items())
+        ])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.business_id, table.day, table.response_source],
+            set_={
+                "interactions": table.interactions + stmt.excluded.interactions,
+                "conversions": table.conversions + stmt.excluded.conversions,
+                "response_time_sum": table.response_time_sum + stmt.excluded.response_time_sum,
+                "response_time_count": table.response_time_count + stmt.excluded.response_time_count
+            }
+        )
+        await db.execute(stmt)
+
+    @staticmethod
+    def sketch_delta(
+        sketches: Dict[SketchKey, LatencySketch],
+        business_id: int,
+        response_source: str,
+        timestamp: Optional[datetime],
+        response_time_ms: Optional[float]
+    ):
+        """Add one response time to the in-process sketch of its hour/source."""
+        if response_time_ms is None:
+            return
+        key = (business_id, utc_hour(timestamp), response_source)
+        sketches.setdefault(key, LatencySketch()).add(response_time_ms)
+
+    @staticmethod
+    async def apply_latency_sketches(db: AsyncSession, sketches: Dict[SketchKey, LatencySketch]):
+        """
+        Merge in-process sketches into ai_latency_sketches in one multi-row upsert.
+        Bins are merged in SQL (latency_sketch_merge), so concurrent workers add up.
+        Rides on the caller's transaction; the caller commits.
+        """
+        if not sketches:
+            return
+        table = AILatencySketch
+        rows = []
+        for (business_id, hour, source), sketch in sorted(sketches.items()):
+            rows.append({
+                "business_id": business_id,
+                "bucket_start": hour,
+                "response_source": source,
+                "count": sketch.count,
+                "sum_ms": sketch.total,
+                "min_ms": sketch.min,
+                "max_ms": sketch.max,
+                "bins": sketch.bins
+            })
+        stmt = insert(table).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.business_id, table.bucket_start, table.response_source],
+            set_={
+                "count": table.count + stmt.excluded.count,
+                "sum_ms": table.sum_ms + stmt.excluded.sum_ms,
+                "min_ms": func.least(table.min_ms, stmt.excluded.min_ms),
+                "max_ms": func.greatest(table.max_ms, stmt.excluded.max_ms),
+                "bins": func.latency_sketch_merge(table.bins, stmt.excluded.bins)
+            }
+        )
+        await db.execute(stmt)
+
+    # -------------------------------------------------------------- reconcile
+
+    @staticmethod
+    async def reconcile(
+        db: AsyncSession,
+        start_day: Optional[date] = None,
+        end_day: Optional[date] = None,
+        business_id: Optional[int] = None
+    ) -> Dict:
+        """
+        Recompute the rollups for [start_day, end_day] from the raw tables
+        (default: the last RECONCILE_DAYS days). Idempotent.
+
+        Returns:
+            Dict with {events, ai} = number of rollup rows rewritten
+        """
+        end_day = end_day or datetime.utcnow().date()
+        start_day = start_day or end_day - timedelta(days=AnalyticsRollupService.RECONCILE_DAYS)
+        window_start = datetime.combine(start_day, datetime.min.time(), tzinfo=timezone.utc)
+        window_end = datetime.combine(end_day + timedelta(days=1), datetime.min.time(), tzinfo=timezone.utc)
+
+        # Blocks flushes until commit: no rollup row appears between DELETE and INSERT
+        await AnalyticsRollupService._lock_rollups(db, exclusive=True)
+
+        counts = {}
+        for table, raw, key, aggregates in (
+            (
+                DailyEventRollup, CartRecoveryEvent, "event_type",
+                lambda r: {
+                    "event_count": func.count(),
+                    "cart_value_sum": func.coalesce(func.sum(r.cart_value), 0.0),
+                    "recovery_hours_sum": func.coalesce(func.sum(r.time_to_recovery_hours), 0.0),
+                    "recovery_hours_count": func.count(r.time_to_recovery_hours)
+                }
+            ),
+            (
+                DailyAIRollup, AIPerformanceMetric, "response_source",
+                lambda r: {
+                    "interactions": func.count(),
+                    "conversions": func.count().filter(r.led_to_cart_action == True),
+                    "response_time_sum": func.coalesce(func.sum(r.response_time_ms), 0.0),
+                    "response_time_count": func.count(r.response_time_ms)
+                }
+            ),
+        ):
+            # Days in the window are replaced wholesale: clear, then re-aggregate
+            clear = delete(table).where(table.day.between(start_day, end_day))
+            if business_id is not None:
+                clear = clear.where(table.business_id == business_id)
+            await db.execute(clear)
+
+            day = _sql_utc_day(raw.timestamp)
+            values = aggregates(raw)
+            source = select(
+                raw.business_id, day.label("day"), getattr(raw, key), *[v.label(k) for k, v in values.items()]
+            ).where(
+                raw.timestamp >= window_start,
+                raw.timestamp < window_end,
+                getattr(raw, key).isnot(None)
+            ).group_by(raw.business_id, day, getattr(raw, key))
+            if business_id is not None:
+                source = source.where(raw.business_id == business_id)
+
+            result = await db.execute(
+                insert(table).from_select(["business_id", "day", key, *values.keys()], source)
+            )
+            counts["events" if table is DailyEventRollup else "ai"] = result.rowcount
+
+        await db.commit()
+        logger.info(f"Reconciled analytics rollups {start_day}..{end_day} (business={business_id or 'all'}): {counts}")
+        return counts
+
+    # ------------------------------------------------------------------- read
+
+    @staticmethod
+    def day_range(days: int) -> Tuple[date, date]:
+        """Inclusive UTC day range covering the last `days` days."""
+        end_day = datetime.utcnow().date()
+        return end_day - timedelta(days=days), end_day
+
+    @staticmethod
+    async def get_cart_recovery_metrics(
+        db: AsyncSession,
+        business_id: int,
+        start_day: date,
+        end_day: date
+    ) -> Dict:
+        """
+        get_cart_recovery_metrics() at day granularity, read from the rollup.
+
+        Returns:
+            Dict with recovery rate, revenue, average time to recovery and a daily series
+        """
+        r = DailyEventRollup
+        is_event = lambda event_type: r.event_type == event_type
+        recovered = is_event(EventType.CART_RECOVERED)
+        rows = (await db.execute(
+            select(
+                r.day,
+                func.sum(r.event_count).filter(is_event(EventType.CART_ABANDONED)).label("abandoned"),
+                func.sum(r.event_count).filter(is_event(EventType.RECOVERY_SENT)).label("sent"),
+                func.sum(r.event_count).filter(recovered).label("recovered"),
+                func.sum(r.cart_value_sum).filter(recovered).label("revenue"),
+                func.sum(r.recovery_hours_sum).filter(recovered).label("hours_sum"),
+                func.sum(r.recovery_hours_count).filter(recovered).label("hours_count")
+            ).where(
+                r.business_id == business_id,
+                r.day.between(start_day, end_day),
+                r.event_type.in_([EventType.CART_ABANDONED, EventType.RECOVERY_SENT, EventType.CART_RECOVERED])
+            ).group_by(r.day).order_by(r.day)
+        )).all()
+
+        abandoned_count = sum(row.abandoned or 0 for row in rows)
+        sent_count = sum(row.sent or 0 for row in rows)
+        recovered_count = sum(row.recovered or 0 for row in rows)
+        recovered_revenue = sum(row.revenue or 0.0 for row in rows)
+        hours_count = sum(row.hours_count or 0 for row in rows)
+        avg_recovery_time = sum(row.hours_sum or 0.0 for row in rows) / hours_count if hours_count else 0.0
+
+        recovery_rate = (recovered_count / abandoned_count * 100) if abandoned_count > 0 else 0
+        message_conversion_rate = (recovered_count / sent_count * 100) if sent_count > 0 else 0
+
+        return {
+            "period": {
+                "start": start_day.isoformat(),
+                "end": end_day.isoformat()
+            },
+            "carts_abandoned": abandoned_count,
+            "recovery_messages_sent": sent_count,
+            "carts_recovered": recovered_count,
+            "recovery_rate_percent": round(recovery_rate, 2),
+            "message_conversion_rate_percent": round(message_conversion_rate, 2),
+            "recovered_revenue": round(recovered_revenue, 2),
+            "avg_time_to_recovery_hours": round(avg_recovery_time, 2),
+            "estimated_saved_revenue": round(recovered_revenue, 2),
+            "daily": [
+                {
+                    "date": row.day.isoformat(),
+                    "carts_abandoned": row.abandoned or 0,
+                    "recovery_messages_sent": row.sent or 0,
+                    "carts_recovered": row.recovered or 0,
+                    "recovered_revenue": round(row.revenue or 0.0, 2)
+                }
+                for row in rows
+            ]
+        }
+
+    LATENCY_QUANTILES = {"p50": 0.5, "p90": 0.9, "p99": 0.99, "p999": 0.999}
+
+    @classmethod
+    def _latency_summary(cls, sketch: LatencySketch) -> Dict:
+        summary = {
+            "count": sketch.count,
+            "avg_ms": round(sketch.total / sketch.count, 2) if sketch.count else None,
+            "min_ms": sketch.min,
+            "max_ms": sketch.max
+        }
+        for name, q in cls.LATENCY_QUANTILES.items():
+            value = sketch.quantile(q)
+            summary[f"{name}_ms"] = round(value, 2) if value is not None else None
+        return summary
+
+    @classmethod
+    async def get_latency_percentiles(
+        cls,
+        db: AsyncSession,
+        business_id: int,
+        start: datetime,
+        end: datetime,
+        response_source: Optional[str] = None
+    ) -> Dict:
+        """
+        Response-time percentiles over [start, end) from the hourly sketches
+        (hour resolution, ~1% relative error), overall and per source.
+        """
+        s = AILatencySketch
+        stmt = select(s.response_source, s.bins, s.sum_ms, s.min_ms, s.max_ms).where(
+            s.business_id == business_id,
+            s.bucket_start >= utc_hour(start),
+            s.bucket_start < as_utc(end)
+        )
+        if response_source:
+            stmt = stmt.where(s.response_source == response_source)
+
+        overall = LatencySketch()
+        by_source: Dict[str, LatencySketch] = {}
+        for row in await db.execute(stmt):
+            sketch = LatencySketch(row.bins, row.sum_ms, row.min_ms, row.max_ms)
+            overall.merge(sketch)
+            by_source.setdefault(row.response_source, LatencySketch()).merge(sketch)
+
+        return {
+            "period": {
+                "start": start.isoformat(),
+                "end": end.isoformat()
+            },
+            **cls._latency_summary(overall),
+            "by_source": {source: cls._latency_summary(sk) for source, sk in sorted(by_source.items())}
+        }
+
+    @staticmethod
+    async def get_ai_performance(
+        db: AsyncSession,
+        business_id: int,
+        start_day: date,
+        end_day: date
+    ) -> Dict:
+        """
+        get_ai_performance() at day granularity, read from the rollup.
+        Latency percentiles and per-intent breakdowns need the raw table
+        and are only available from AnalyticsService.get_ai_performance().
+        """
+        r = DailyAIRollup
+        rows = (await db.execute(
+            select(
+                r.day, r.response_source, r.interactions, r.conversions,
+                r.response_time_sum, r.response_time_count
+            ).where(
+                r.business_id == business_id,
+                r.day.between(start_day, end_day)
+            ).order_by(r.day, r.response_source)
+        )).all()
+
+        total_interactions = sum(row.interactions for row in rows)
+        if total_interactions == 0:
+            return {"total_interactions": 0, "faq_hit_rate": 0, "ai_usage_rate": 0}
+
+        def stats(items: Iterable) -> Dict:
+            items = list(items)
+            interactions = sum(i.interactions for i in items)
+            conversions = sum(i.conversions for i in items)
+            ms_count = sum(i.response_time_count for i in items)
+            return {
+                "interactions": interactions,
+                "share_percent": round(interactions / total_interactions * 100, 2),
+                "conversion_rate_percent": round(conversions / interactions * 100, 2) if interactions else 0,
+                "avg_response_time_ms": round(sum(i.response_time_sum for i in items) / ms_count, 2) if ms_count else 0
+            }
+
+        sources = sorted({row.response_source for row in rows})
+        days = sorted({row.day for row in rows})
+        by_source = {s: stats(row for row in rows if row.response_source == s) for s in sources}
+        total = stats(rows)
+
+        return {
+            "period": {
+                "start": start_day.isoformat(),
+                "end": end_day.isoformat()
+            },
+            "total_interactions": total_interactions,
+            "faq_hit_rate_percent": by_source.get("faq", {}).get("share_percent", 0),
+            "ai_usage_rate_percent": by_source.get("ai_fallback", {}).get("share_percent", 0),
+            "conversation_to_action_rate_percent": total["conversion_rate_percent"],
+            "avg_response_time_ms": total["avg_response_time_ms"],
+            "by_source": by_source,
+            "bucket": "day",
+            "trend": [
+                {
+                    "bucket_start": d.isoformat(),
+                    **stats(row for row in rows if row.day == d),
+                    "by_source": {row.response_source: stats([row]) for row in rows if row.day == d}
+                }
+                for d in days
+            ]
+        }
@@ -1,11 +1,14 @@
 # app/services/analytics_service.py
-from typing import Dict, List, Optional
-from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+from datetime import datetime, timedelta, timezone
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, and_, or_, case
-from app.models.analytics import CartRecoveryEvent, AIPerformanceMetric, CustomerLifetimeValue, EventType
+from sqlalchemy import select, update, func, and_, or_, case, cast, literal_column, tuple_, Integer
+from sqlalchemy.dialects.postgresql import insert
+from app.models.analytics import CartRecoveryEvent, AIPerformanceMetric, CustomerLifetimeValue, CustomerCLVCartState, EventType
 from app.models.cart import Cart, CartItem
 from app.models.product import Product
+from app.services.purchase_summary_service import PurchaseSummaryService, PURCHASE_STATUSES
+from app.services.analytics_buffer import analytics_buffer
 import logging
 
 logger = logging.getLogger(__name__)
@@ -32,8 +35,11 @@ class AnalyticsService:
         """
         Track a cart or AI event for analytics.
         
+        The row is appended to the process analytics buffer and written in a
+        later batch; nothing is added to or committed on `db`.
+        
         Args:
-            db: Database session
+            db: Database session (unused, kept for call-site compatibility)
             business_id: Business ID
             event_type: Type of event (from EventType enum)
             user_phone: Customer phone number
@@ -41,21 +47,21 @@ class AnalyticsService:
             **kwargs: Additional event-specific data (cart_value, discount_code, etc.)
         """
         try:
-            event = CartRecoveryEvent(
-                business_id=business_id,
-                cart_id=cart_id,
-                user_phone=user_phone,
-                event_type=event_type,
-                cart_value=kwargs.get('cart_value'),
-                discount_code=kwargs.get('discount_code'),
-                discount_percent=kwargs.get('discount_percent'),
-                discount_amount=kwargs.get('discount_amount'),
-                time_to_recovery_hours=kwargs.get('time_to_recovery_hours'),
-                recovery_channel=kwargs.get('recovery_channel', 'whatsapp'),
-                metadata_json=kwargs.get('metadata', {})
-            )
-            db.add(event)
-            await db.commit()
+            # Timestamp taken now, not at flush time; late events pass their original `timestamp`
+            await analytics_buffer.add_event({
+                "business_id": business_id,
+                "timestamp": kwargs.get('timestamp') or datetime.now(timezone.utc),
+                "cart_id": cart_id,
+                "user_phone": user_phone,
+                "event_type": event_type,
+                "cart_value": kwargs.get('cart_value'),
+                "discount_code": kwargs.get('discount_code'),
+                "discount_percent": kwargs.get('discount_percent'),
+                "discount_amount": kwargs.get('discount_amount'),
+                "time_to_recovery_hours": kwargs.get('time_to_recovery_hours'),
+                "recovery_channel": kwargs.get('recovery_channel', 'whatsapp'),
+                "metadata_json": kwargs.get('metadata', {})
+            })
             logger.debug(f"Tracked event: {event_type} for business {business_id}")
         except Exception as e:
             logger.error(f"Error tracking event: {e}")
@@ -72,9 +78,10 @@ class AnalyticsService:
     ):
         """
         Track AI assistant interactions for performance analysis.
+        Buffered like track_event().
         
         Args:
-            db: Database session
+            db: Database session (unused, kept for call-site compatibility)
             business_id: Business ID
             user_phone: Customer phone
             user_message: User's message
@@ -83,24 +90,36 @@ class AnalyticsService:
             **kwargs: Additional data (ai_model, intent, confidence, etc.)
         """
         try:
-            metric = AIPerformanceMetric(
-                business_id=business_id,
-                user_phone=user_phone,
-                user_message=user_message[:500],  # Truncate for storage
-                bot_response=bot_response[:500],
-                response_source=response_source,
-                ai_model_used=kwargs.get('ai_model'),
-                intent_detected=kwargs.get('intent'),
-                confidence_score=kwargs.get('confidence'),
-                response_time_ms=kwargs.get('response_time_ms'),
-                led_to_cart_action=kwargs.get('led_to_cart_action', False),
-                metadata_json=kwargs.get('metadata', {})
-            )
-            db.add(metric)
-            await db.commit()
+            await analytics_buffer.add_ai_interaction({
+                "business_id": business_id,
+                "timestamp": kwargs.get('timestamp') or datetime.now(timezone.utc),
+                "user_phone": user_phone,
+                "user_message": user_message[:500],  # Truncate for storage
+                "bot_response": bot_response[:500],
+                "response_source": response_source,
+                "ai_model_used": kwargs.get('ai_model'),
+                "intent_detected": kwargs.get('intent'),
+                "confidence_score": kwargs.get('confidence'),
+                "response_time_ms": kwargs.get('response_time_ms'),
+                "led_to_cart_action": kwargs.get('led_to_cart_action', False),
+                "metadata_json": kwargs.get('metadata', {})
+            })
         except Exception as e:
             logger.error(f"Error tracking AI interaction: {e}")
     
+    # ============================================================================
+    # QUERY HELPERS
+    # ============================================================================
+    
+    TIME_BUCKETS = ("hour", "day", "week")
+    
+    @classmethod
+    def _time_bucket(cls, column, bucket: str = "day"):
+        """date_trunc() with the unit inlined, so SELECT and GROUP BY render the same expression."""
+        if bucket not in cls.TIME_BUCKETS:
+            raise ValueError(f"Unsupported time bucket: {bucket}")
+        return func.date_trunc(literal_column(f"'{bucket}'"), column)
+    
     # ============================================================================
     # CART RECOVERY METRICS
     # ============================================================================
@@ -124,46 +143,45 @@ class AnalyticsService:
         if not end_date:
             end_date = datetime.utcnow()
         
-        # Count abandoned carts
-        abandoned_stmt = select(func.count(CartRecoveryEvent.id)).where(
-            CartRecoveryEvent.business_id == business_id,
-            CartRecoveryEvent.event_type == EventType.CART_ABANDONED,
-            CartRecoveryEvent.timestamp.between(start_date, end_date)
-        )
-        abandoned_count = (await db.execute(abandoned_stmt)).scalar() or 0
-        
-        # Count recovered carts
-        recovered_stmt = select(func.count(CartRecoveryEvent.id)).where(
-            CartRecoveryEvent.business_id == business_id,
-            CartRecoveryEvent.event_type == EventType.CART_RECOVERED,
-            CartRecoveryEvent.timestamp.between(start_date, end_date)
-        )
-        recovered_count = (await db.execute(recovered_stmt)).scalar() or 0
-        
-        # Count recovery messages sent
-        sent_stmt = select(func.count(CartRecoveryEvent.id)).where(
-            CartRecoveryEvent.business_id == business_id,
-            CartRecoveryEvent.event_type == EventType.RECOVERY_SENT,
-            CartRecoveryEvent.timestamp.between(start_date, end_date)
-        )
-        sent_count = (await db.execute(sent_stmt)).scalar() or 0
-        
-        # Calculate revenue from recovered carts
-        revenue_stmt = select(func.sum(CartRecoveryEvent.cart_value)).where(
-            CartRecoveryEvent.business_id == business_id,
-            CartRecoveryEvent.event_type == EventType.CART_RECOVERED,
-            CartRecoveryEvent.timestamp.between(start_date, end_date)
-        )
-        recovered_revenue = (await db.execute(revenue_stmt)).scalar() or 0.0
-        
-        # Average time to recovery
-        avg_time_stmt = select(func.avg(CartRecoveryEvent.time_to_recovery_hours)).where(
+        # One pass over the window: conditional aggregates per day plus the
+        # grand total row (GROUPING SETS), instead of one query per metric
+        event = CartRecoveryEvent.event_type
+        day = cls._time_bucket(CartRecoveryEvent.timestamp, "day")
+        stmt = select(
+            day.label("day"),
+            func.grouping(day).label("is_total"),
+            func.count().filter(event == EventType.CART_ABANDONED).label("abandoned"),
+            func.count().filter(event == EventType.RECOVERY_SENT).label("sent"),
+            func.count().filter(event == EventType.CART_RECOVERED).label("recovered"),
+            func.sum(CartRecoveryEvent.cart_value).filter(event == EventType.CART_RECOVERED).label("revenue"),
+            func.avg(CartRecoveryEvent.time_to_recovery_hours).filter(event == EventType.CART_RECOVERED).label("avg_recovery_time")
+        ).where(
             CartRecoveryEvent.business_id == business_id,
-            CartRecoveryEvent.event_type == EventType.CART_RECOVERED,
             CartRecoveryEvent.timestamp.between(start_date, end_date),
-            CartRecoveryEvent.time_to_recovery_hours.isnot(None)
-        )
-        avg_recovery_time = (await db.execute(avg_time_stmt)).scalar() or 0.0
+            event.in_([EventType.CART_ABANDONED, EventType.RECOVERY_SENT, EventType.CART_RECOVERED])
+        ).group_by(
+            func.grouping_sets(day, tuple_())
+        ).order_by(day)
+        
+        rows = (await db.execute(stmt)).all()
+        total = next((r for r in rows if r.is_total), None)
+        
+        abandoned_count = total.abandoned if total else 0
+        sent_count = total.sent if total else 0
+        recovered_count = total.recovered if total else 0
+        recovered_revenue = (total.revenue if total else None) or 0.0
+        avg_recovery_time = (total.avg_recovery_time if total else None) or 0.0
+        
+        daily = [
+            {
+                "date": r.day.date().isoformat(),
+                "carts_abandoned": r.abandoned,
+                "recovery_messages_sent": r.sent,
+                "carts_recovered": r.recovered,
+                "recovered_revenue": round(r.revenue or 0.0, 2)
+            }
+            for r in rows if not r.is_total
+        ]
         
         # Calculate rates
         recovery_rate = (recovered_count / abandoned_count * 100) if abandoned_count > 0 else 0
@@ -181,13 +199,32 @@ class AnalyticsService:
             "message_conversion_rate_percent": round(message_conversion_rate, 2),
             "recovered_revenue": round(recovered_revenue, 2),
             "avg_time_to_recovery_hours": round(avg_recovery_time, 2),
-            "estimated_saved_revenue": round(recovered_revenue, 2)  # Same as recovered for now
+            "estimated_saved_revenue": round(recovered_revenue, 2),  # Same as recovered for now
+            "daily": daily
         }
     
     # ============================================================================
     # CLV TRACKING
     # ============================================================================
     
+    # (days since last purchase above, churn risk score); below every band: low risk
+    CHURN_RISK_BANDS = [
+        (90, 0.8),  # High risk
+        (60, 0.5),  # Medium risk
+        (30, 0.3),  # Low-medium risk
+    ]
+    CHURN_RISK_LOW = 0.1
+    
+    # Cart statuses that feed CLV (purchases plus abandonment)
+    CLV_CART_STATUSES = PURCHASE_STATUSES + ("abandoned",)
+    
+    @classmethod
+    def churn_risk(cls, days_since_last_purchase: int) -> float:
+        for days, score in cls.CHURN_RISK_BANDS:
+            if days_since_last_purchase > days:
+                return score
+        return cls.CHURN_RISK_LOW
+    
     @classmethod
     async def update_customer_clv(
         cls,
@@ -213,29 +250,12 @@ class AnalyticsService:
             )
             db.add(clv)
         
-        # Calculate purchase metrics from completed carts
-        purchase_stmt = select(
-            func.count(Cart.id),
-            func.sum(
-                select(func.sum(CartItem.quantity * Product.price))
-                .where(CartItem.cart_id == Cart.id)
-                .join(Product, CartItem.product_id == Product.id)
-                .correlate(Cart)
-                .scalar_subquery()
-            ),
-            func.min(Cart.created_at),
-            func.max(Cart.created_at)
-        ).where(
-            Cart.business_id == business_id,
-            Cart.user_phone == user_phone,
-            Cart.status.in_(["paid", "recovered"])
-        )
-        
-        result = (await db.execute(purchase_stmt)).first()
-        total_purchases = result[0] if result and result[0] else 0
-        total_spent = float(result[1]) if result and result[1] else 0.0
-        first_purchase = result[2]
-        last_purchase = result[3]
+        # Purchase metrics from the materialized summary (O(1), see PurchaseSummaryService)
+        summary = await PurchaseSummaryService.get_summary(db, business_id, user_phone)
+        total_purchases = summary["total_purchases"]
+        total_spent = summary["total_spent"]
+        first_purchase = summary["first_purchase_at"]
+        last_purchase = summary["last_purchase_at"]
         
         # Calculate abandoned/recovered carts
         abandoned = (await db.execute(
@@ -265,29 +285,256 @@ class AnalyticsService:
         clv.recovery_rate = (recovered / abandoned * 100) if abandoned > 0 else 0
         
         if last_purchase:
-            clv.days_since_last_purchase = (datetime.utcnow() - last_purchase).days
+            now = datetime.now(timezone.utc) if last_purchase.tzinfo else datetime.utcnow()
+            clv.days_since_last_purchase = (now - last_purchase).days
             
             # Simple churn risk calculation
-            if clv.days_since_last_purchase > 90:
-                clv.churn_risk_score = 0.8  # High risk
-            elif clv.days_since_last_purchase > 60:
-                clv.churn_risk_score = 0.5  # Medium risk
-            elif clv.days_since_last_purchase > 30:
-                clv.churn_risk_score = 0.3  # Low-medium risk
-            else:
-                clv.churn_risk_score = 0.1  # Low risk
+            clv.churn_risk_score = cls.churn_risk(clv.days_since_last_purchase)
         
         await db.commit()
         logger.info(f"Updated CLV for {user_phone} in business {business_id}")
         
         return clv
     
+    @classmethod
+    async def apply_clv_transition(
+        cls,
+        db: AsyncSession,
+        cart: Cart,
+        previous: Optional[str],
+        status: str,
+        amount: float,
+        at: Optional[datetime] = None
+    ) -> Optional[str]:
+        """
+        O(1) delta update of the customer's CLV row for one cart status change,
+        with the same meaning as recompute_clv() (counts by current cart status).
+        
+        Idempotent per cart: clv_cart_states records the last status applied,
+        so replaying a transition changes nothing. `previous` is only used for
+        carts without a recorded state (counted by the last full recompute).
+        Rides on the caller's transaction; the caller commits.
+        
+        Returns:
+            The status the delta was computed from, or `status` if nothing was applied
+        """
+        state = CustomerCLVCartState
+        applied = (await db.execute(
+            select(state.status).where(state.cart_id == cart.id).with_for_update()
+        )).scalar_one_or_none()
+        
+        if applied is None:
+            # First transition recorded for this cart; a concurrent first insert wins the race
+            inserted = (await db.execute(
+                insert(state).values(cart_id=cart.id, status=status)
+                .on_conflict_do_nothing(index_elements=[state.cart_id])
+                .returning(state.cart_id)
+            )).scalar_one_or_none()
+            if inserted is None:
+                return await cls.apply_clv_transition(db, cart, previous, status, amount, at)
+            applied = previous
+        elif applied == status:
+            return status
+        else:
+            await db.execute(
+                update(state).where(state.cart_id == cart.id).values(status=status)
+                .execution_options(synchronize_session=False)
+            )
+        
+        def bucket(s: Optional[str], statuses) -> int:
+            return int(s in statuses)
+        
+        d_purchases = bucket(status, PURCHASE_STATUSES) - bucket(applied, PURCHASE_STATUSES)
+        d_abandoned = bucket(status, ("abandoned",)) - bucket(applied, ("abandoned",))
+        d_recovered = bucket(status, ("recovered",)) - bucket(applied, ("recovered",))
+        if not (d_purchases or d_abandoned or d_recovered):
+            return applied
+        
+        at = at or datetime.utcnow()
+        d_spent = amount * d_purchases
+        table = CustomerLifetimeValue
+        purchases = func.coalesce(table.total_purchases, 0) + d_purchases
+        spent = func.coalesce(table.total_spent, 0) + d_spent
+        abandoned = func.greatest(func.coalesce(table.carts_abandoned, 0) + d_abandoned, 0)
+        recovered = func.greatest(func.coalesce(table.carts_recovered, 0) + d_recovered, 0)
+        
+        set_ = {
+            "total_purchases": purchases,
+            "total_spent": spent,
+            "avg_order_value": case((purchases > 0, spent / purchases), else_=0),
+            "carts_abandoned": abandoned,
+            "carts_recovered": recovered,
+            "recovery_rate": case((abandoned > 0, recovered * 100.0 / abandoned), else_=0),
+            "updated_at": func.now()
+        }
+        if d_purchases > 0:
+            # least()/greatest() ignore NULLs
+            set_.update({
+                "first_purchase_date": func.least(table.first_purchase_date, at),
+                "last_purchase_date": func.greatest(table.last_purchase_date, at),
+                "days_since_last_purchase": 0,
+                "churn_risk_score": cls.CHURN_RISK_LOW
+            })
+        
+        new_abandoned = max(d_abandoned, 0)
+        new_recovered = max(d_recovered, 0)
+        stmt = insert(table).values(
+            business_id=cart.business_id,
+            user_phone=cart.user_phone,
+            total_purchases=max(d_purchases, 0),
+            total_spent=max(d_spent, 0),
+            avg_order_value=amount if d_purchases > 0 else 0,
+            first_purchase_date=at if d_purchases > 0 else None,
+            last_purchase_date=at if d_purchases > 0 else None,
+            days_since_last_purchase=0 if d_purchases > 0 else None,
+            carts_abandoned=new_abandoned,
+            carts_recovered=new_recovered,
+            recovery_rate=new_recovered * 100.0 / new_abandoned if new_abandoned else 0,
+            churn_risk_score=cls.CHURN_RISK_LOW if d_purchases > 0 else 0.0
+        ).on_conflict_do_update(
+            index_elements=[table.business_id, table.user_phone],
+            set_=set_
+        )
+        await db.execute(stmt)
+        return applied
+    
+    @classmethod
+    async def recompute_clv(
+        cls,
+        db: AsyncSession,
+        business_id: int,
+        chunk_size: int = 50000,
+        on_progress: Optional[Callable[[int, int], None]] = None
+    ) -> int:
+        """
+        Recompute CLV for every customer of a business from cart history.
+        
+        Customers are processed in phone-ordered chunks; each chunk is a single
+        INSERT ... SELECT ... ON CONFLICT DO UPDATE with the same formulas as
+        update_customer_clv(), committed on its own.
+        
+        Args:
+            chunk_size: Customers per statement
+            on_progress: Called with (customers_done, customers_total) after each chunk
+            
+        Returns:
+            Number of CLV rows written
+        """
+        # Chunk boundaries: every chunk_size-th distinct phone, in one query
+        phones = select(
+            Cart.user_phone,
+            func.row_number().over(order_by=Cart.user_phone).label("n")
+        ).where(
+            Cart.business_id == business_id,
+            Cart.status.in_(cls.CLV_CART_STATUSES)
+        ).group_by(Cart.user_phone).subquery()
+        total = (await db.execute(select(func.count()).select_from(phones))).scalar() or 0
+        bounds = (await db.execute(
+            select(phones.c.user_phone).where(phones.c.n % chunk_size == 0).order_by(phones.c.user_phone)
+        )).scalars().all()
+        
+        written = 0
+        lower = None
+        for upper in [*bounds, None]:
+            stmt = cls._clv_upsert(business_id, lower, upper)
+            written += (await db.execute(stmt)).rowcount
+            # Incremental updates continue from the statuses counted here
+            await db.execute(cls._clv_states_upsert(business_id, lower, upper))
+            await db.commit()
+            
+            done = min(written, total) if upper is not None else total
+            if on_progress:
+                on_progress(done, total)
+            logger.info(f"CLV recompute for business {business_id}: {done}/{total} customers")
+            lower = upper
+        
+        return written
+    
+    @classmethod
+    def _clv_states_upsert(cls, business_id: int, lower: Optional[str], upper: Optional[str]):
+        """Record the status of every cart counted by _clv_upsert() in clv_cart_states."""
+        carts = select(Cart.id, Cart.status).where(
+            Cart.business_id == business_id,
+            Cart.status.in_(cls.CLV_CART_STATUSES)
+        )
+        if lower is not None:
+            carts = carts.where(Cart.user_phone > lower)
+        if upper is not None:
+            carts = carts.where(Cart.user_phone <= upper)
+        
+        state = CustomerCLVCartState
+        stmt = insert(state).from_select(["cart_id", "status"], carts)
+        return stmt.on_conflict_do_update(
+            index_elements=[state.cart_id],
+            set_={"status": stmt.excluded.status, "updated_at": func.now()}
+        )
+    
+    @classmethod
+    def _clv_upsert(cls, business_id: int, lower: Optional[str], upper: Optional[str]):
+        """INSERT ... ON CONFLICT for the customers with lower < phone <= upper."""
+        # Phone range applied on carts directly so each chunk only aggregates its own carts
+        carts = PurchaseSummaryService.cart_totals(business_id, statuses=cls.CLV_CART_STATUSES)
+        if lower is not None:
+            carts = carts.where(Cart.user_phone > lower)
+        if upper is not None:
+            carts = carts.where(Cart.user_phone <= upper)
+        carts = carts.subquery()
+        
+        is_purchase = carts.c.status.in_(PURCHASE_STATUSES)
+        per_customer = select(
+            carts.c.business_id,
+            carts.c.user_phone,
+            func.count().filter(is_purchase).label("total_purchases"),
+            func.coalesce(func.sum(carts.c.cart_total).filter(is_purchase), 0).label("total_spent"),
+            func.min(carts.c.last_interaction).filter(is_purchase).label("first_purchase_date"),
+            func.max(carts.c.last_interaction).filter(is_purchase).label("last_purchase_date"),
+            func.count().filter(carts.c.status == "abandoned").label("carts_abandoned"),
+            func.count().filter(carts.c.status == "recovered").label("carts_recovered")
+        ).group_by(carts.c.business_id, carts.c.user_phone)
+        c = per_customer.subquery()
+        
+        days_since = cast(func.extract("day", func.now() - c.c.last_purchase_date), Integer)
+        churn = case(
+            *[(days_since > days, score) for days, score in cls.CHURN_RISK_BANDS],
+            else_=cls.CHURN_RISK_LOW
+        )
+        rows = select(
+            c.c.business_id,
+            c.c.user_phone,
+            c.c.total_purchases,
+            c.c.total_spent,
+            case((c.c.total_purchases > 0, c.c.total_spent / c.c.total_purchases), else_=0).label("avg_order_value"),
+            c.c.first_purchase_date,
+            c.c.last_purchase_date,
+            days_since.label("days_since_last_purchase"),
+            c.c.carts_abandoned,
+            c.c.carts_recovered,
+            case((c.c.carts_abandoned > 0, c.c.carts_recovered * 100.0 / c.c.carts_abandoned), else_=0).label("recovery_rate"),
+            case((c.c.last_purchase_date.isnot(None), churn), else_=0.0).label("churn_risk_score")
+        )
+        
+        table = CustomerLifetimeValue
+        columns = [
+            "business_id", "user_phone", "total_purchases", "total_spent", "avg_order_value",
+            "first_purchase_date", "last_purchase_date", "days_since_last_purchase",
+            "carts_abandoned", "carts_recovered", "recovery_rate", "churn_risk_score"
+        ]
+        stmt = insert(table).from_select(columns, rows)
+        return stmt.on_conflict_do_update(
+            index_elements=[table.business_id, table.user_phone],
+            set_={
+                **{name: getattr(stmt.excluded, name) for name in columns[2:]},
+                "updated_at": func.now()
+            }
+        )
+    
     @classmethod
     async def get_clv_analytics(
         cls,
         db: AsyncSession,
         business_id: int,
-        min_purchases: int = 0
+        min_purchases: int = 0,
+        include_percentiles: bool = False
     ) -> Dict:
         """
         Get aggregated CLV analytics for a business.
@@ -295,19 +542,48 @@ class AnalyticsService:
         Args:
             business_id: Business ID
             min_purchases: Minimum purchases to include in analysis
+            include_percentiles: Also return the CLV (total spent) distribution
             
         Returns:
             Dict with avg CLV, total customers, segmentation, etc.
         """
-        # Get all CLV records
-        stmt = select(CustomerLifetimeValue).where(
-            CustomerLifetimeValue.business_id == business_id,
-            CustomerLifetimeValue.total_purchases >= min_purchases
-        )
-        
-        clvs = (await db.execute(stmt)).scalars().all()
-        
-        if not clvs:
+        # Single statement: the window average feeds the segment FILTERs,
+        # so no CLV rows are loaded into Python
+        clv = CustomerLifetimeValue
+        spent = func.coalesce(clv.total_spent, 0.0)
+        customers = select(
+            spent.label("spent"),
+            func.coalesce(clv.total_purchases, 0).label("purchases"),
+            func.coalesce(clv.avg_order_value, 0.0).label("aov"),
+            func.coalesce(clv.churn_risk_score, 0.0).label("churn"),
+            func.avg(spent).over().label("avg_clv")
+        ).where(
+            clv.business_id == business_id,
+            clv.total_purchases >= min_purchases
+        ).subquery()
+        c = customers.c
+        
+        columns = [
+            func.count().label("total_customers"),
+            func.sum(c.spent).label("total_revenue"),
+            func.avg(c.spent).label("avg_clv"),
+            func.avg(c.purchases).label("avg_purchases"),
+            func.avg(c.aov).label("avg_order_value"),
+            func.count().filter(c.spent >= c.avg_clv * 2).label("high_value"),
+            func.count().filter(and_(c.spent >= c.avg_clv, c.spent < c.avg_clv * 2)).label("medium_value"),
+            func.count().filter(c.spent < c.avg_clv).label("low_value"),
+            func.count().filter(c.churn >= 0.7).label("high_churn_risk")
+        ]
+        percentiles = {"p25": 0.25, "p50": 0.5, "p75": 0.75, "p90": 0.9, "p99": 0.99}
+        if include_percentiles:
+            columns += [
+                func.percentile_cont(q).within_group(c.spent).label(name)
+                for name, q in percentiles.items()
+            ]
+        
+        row = (await db.execute(select(*columns))).one()
+        
+        if not row.total_customers:
             return {
                 "total_customers": 0,
                 "avg_clv": 0,
@@ -316,36 +592,30 @@ class AnalyticsService:
                 "total_revenue": 0
             }
         
-        total_customers = len(clvs)
-        total_revenue = sum(c.total_spent for c in clvs)
-        avg_clv = total_revenue / total_customers
-        avg_purchases = sum(c.total_purchases for c in clvs) / total_customers
-        avg_order_value = sum(c.avg_order_value for c in clvs) / total_customers
-        
-        # Segment customers
-        high_value = [c for c in clvs if c.total_spent >= avg_clv * 2]
-        medium_value = [c for c in clvs if avg_clv <= c.total_spent < avg_clv * 2]
-        low_value = [c for c in clvs if c.total_spent < avg_clv]
-        
-        # Churn risk
-        high_churn_risk = [c for c in clvs if c.churn_risk_score >= 0.7]
-        
-        return {
+        total_customers = row.total_customers
+        result = {
             "total_customers": total_customers,
-            "total_revenue": round(total_revenue, 2),
-            "avg_clv": round(avg_clv, 2),
-            "avg_purchases_per_customer": round(avg_purchases, 2),
-            "avg_order_value": round(avg_order_value, 2),
+            "total_revenue": round(float(row.total_revenue), 2),
+            "avg_clv": round(float(row.avg_clv), 2),
+            "avg_purchases_per_customer": round(float(row.avg_purchases), 2),
+            "avg_order_value": round(float(row.avg_order_value), 2),
             "customer_segments": {
-                "high_value": len(high_value),
-                "medium_value": len(medium_value),
-                "low_value": len(low_value)
+                "high_value": row.high_value,
+                "medium_value": row.medium_value,
+                "low_value": row.low_value
             },
             "churn_risk": {
-                "high_risk_customers": len(high_churn_risk),
-                "percentage": round(len(high_churn_risk) / total_customers * 100, 2)
+                "high_risk_customers": row.high_churn_risk,
+                "percentage": round(row.high_churn_risk / total_customers * 100, 2)
             }
         }
+        
+        if include_percentiles:
+            result["clv_percentiles"] = {
+                name: round(float(getattr(row, name)), 2) for name in percentiles
+            }
+        
+        return result
     
     # ============================================================================
     # AI PERFORMANCE METRICS
@@ -357,60 +627,84 @@ class AnalyticsService:
         db: AsyncSession,
         business_id: int,
         start_date: Optional[datetime] = None,
-        end_date: Optional[datetime] = None
+        end_date: Optional[datetime] = None,
+        bucket: str = "day"
     ) -> Dict:
         """
         Analyze AI assistant performance.
         
+        Args:
+            bucket: Trend granularity ("hour" or "day")
+        
         Returns:
-            Dict with FAQ hit rate, AI usage, conversion rate, etc.
+            Dict with FAQ hit rate, AI usage, conversion rate, etc., plus
+            per-source / per-intent breakdowns and a per-bucket trend
         """
         if not start_date:
             start_date = datetime.utcnow() - timedelta(days=30)
         if not end_date:
             end_date = datetime.utcnow()
         
-        # Total interactions
-        total_stmt = select(func.count(AIPerformanceMetric.id)).where(
-            AIPerformanceMetric.business_id == business_id,
-            AIPerformanceMetric.timestamp.between(start_date, end_date)
-        )
-        total_interactions = (await db.execute(total_stmt)).scalar() or 0
+        # One grouped aggregation; GROUPING() bits tell which set a row belongs to
+        # (bucket=4, source=2, intent=1; a set bit means "aggregated over")
+        m = AIPerformanceMetric
+        time_bucket = cls._time_bucket(m.timestamp, bucket)
+        latency = m.response_time_ms
+        stmt = select(
+            func.grouping(time_bucket, m.response_source, m.intent_detected).label("grouping"),
+            time_bucket.label("bucket"),
+            m.response_source,
+            m.intent_detected,
+            func.count().label("interactions"),
+            func.count().filter(m.led_to_cart_action == True).label("conversions"),
+            func.avg(latency).label("avg_ms"),
+            func.percentile_cont(0.5).within_group(latency).label("p50_ms"),
+            func.percentile_cont(0.95).within_group(latency).label("p95_ms"),
+            func.max(latency).label("max_ms")
+        ).where(
+            m.business_id == business_id,
+            m.timestamp.between(start_date, end_date)
+        ).group_by(
+            func.grouping_sets(
+                tuple_(),
+                tuple_(m.response_source),
+                tuple_(m.intent_detected),
+                tuple_(time_bucket),
+                tuple_(time_bucket, m.response_source)
+            )
+        ).order_by(time_bucket)
+        
+        rows = (await db.execute(stmt)).all()
+        total = next((r for r in rows if r.grouping == 7), None)
+        total_interactions = total.interactions if total else 0
         
         if total_interactions == 0:
             return {"total_interactions": 0, "faq_hit_rate": 0, "ai_usage_rate": 0}
         
-        # FAQ hits
-        faq_stmt = select(func.count(AIPerformanceMetric.id)).where(
-            AIPerformanceMetric.business_id == business_id,
-            AIPerformanceMetric.response_source == 'faq',
-            AIPerformanceMetric.timestamp.between(start_date, end_date)
-        )
-        faq_hits = (await db.execute(faq_stmt)).scalar() or 0
+        def stats(r) -> Dict:
+            return {
+                "interactions": r.interactions,
+                "share_percent": round(r.interactions / total_interactions * 100, 2),
+                "conversion_rate_percent": round(r.conversions / r.interactions * 100, 2),
+                "avg_response_time_ms": round(float(r.avg_ms or 0), 2),
+                "p50_response_time_ms": round(float(r.p50_ms or 0), 2),
+                "p95_response_time_ms": round(float(r.p95_ms or 0), 2),
+                "max_response_time_ms": r.max_ms or 0
+            }
         
-        # AI fallback usage
-        ai_stmt = select(func.count(AIPerformanceMetric.id)).where(
-            AIPerformanceMetric.business_id == business_id,
-            AIPerformanceMetric.response_source == 'ai_fallback',
-            AIPerformanceMetric.timestamp.between(start_date, end_date)
-        )
-        ai_usage = (await db.execute(ai_stmt)).scalar() or 0
+        by_source = {r.response_source: stats(r) for r in rows if r.grouping == 5}
+        by_intent = {(r.intent_detected or "unknown"): stats(r) for r in rows if r.grouping == 6}
         
-        # Conversations that led to cart actions
-        conversion_stmt = select(func.count(AIPerformanceMetric.id)).where(
-            AIPerformanceMetric.business_id == business_id,
-            AIPerformanceMetric.led_to_cart_action == True,
-            AIPerformanceMetric.timestamp.between(start_date, end_date)
-        )
-        conversions = (await db.execute(conversion_stmt)).scalar() or 0
+        trend = {}
+        for r in rows:
+            if r.grouping == 3:
+                trend[r.bucket] = {"bucket_start": r.bucket.isoformat(), **stats(r), "by_source": {}}
+        for r in rows:
+            if r.grouping == 1 and r.bucket in trend:
+                trend[r.bucket]["by_source"][r.response_source] = stats(r)
         
-        # Average response time
-        avg_time_stmt = select(func.avg(AIPerformanceMetric.response_time_ms)).where(
-            AIPerformanceMetric.business_id == business_id,
-            AIPerformanceMetric.timestamp.between(start_date, end_date),
-            AIPerformanceMetric.response_time_ms.isnot(None)
-        )
-        avg_response_time = (await db.execute(avg_time_stmt)).scalar() or 0
+        faq_hits = by_source.get("faq", {}).get("interactions", 0)
+        ai_usage = by_source.get("ai_fallback", {}).get("interactions", 0)
         
         return {
             "period": {
@@ -420,6 +714,10 @@ class AnalyticsService:
             "total_interactions": total_interactions,
             "faq_hit_rate_percent": round(faq_hits / total_interactions * 100, 2),
             "ai_usage_rate_percent": round(ai_usage / total_interactions * 100, 2),
-            "conversation_to_action_rate_percent": round(conversions / total_interactions * 100, 2),
-            "avg_response_time_ms": round(avg_response_time, 2)
+            "conversation_to_action_rate_percent": round(total.conversions / total_interactions * 100, 2),
+            "avg_response_time_ms": round(float(total.avg_ms or 0), 2),
+            "by_source": by_source,
+            "by_intent": by_intent,
+            "bucket": bucket,
+            "trend": list(trend.values())
         }
@@ -0,0 +1,50 @@
+# app/services/cart_status_service.py
+from typing import Optional
+from datetime import datetime
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.cart import Cart
+from app.services.purchase_summary_service import PurchaseSummaryService, PURCHASE_STATUSES
+from app.services.analytics_service import AnalyticsService
+from app.services.analytics_cache import analytics_cache
+import logging
+
+logger = logging.getLogger(__name__)
+
+class CartStatusService:
+    """
+    Single entry point for cart status changes.
+    Keeps the derived per-customer tables in step with the cart lifecycle.
+    """
+
+    @staticmethod
+    def cart_total(cart: Cart) -> float:
+        return float(sum(item.quantity * item.product.price for item in cart.items if item.product))
+
+    @classmethod
+    async def set_status(cls, db: AsyncSession, cart: Cart, status: str, amount: Optional[float] = None):
+        """
+        Move `cart` to `status` and apply the matching summary and CLV deltas.
+        Replayed transitions are no-ops (see AnalyticsService.apply_clv_transition).
+        Rides on the caller's transaction; the caller commits.
+
+        Args:
+            amount: Cart total, when `cart.items` is not loaded (e.g. webhooks)
+        """
+        previous = cart.status
+        if previous == status:
+            return
+
+        cart.status = status
+        if amount is None:
+            amount = cls.cart_total(cart)
+        now = datetime.utcnow()
+
+        applied = await AnalyticsService.apply_clv_transition(db, cart, previous, status, amount, now)
+
+        # recovered -> paid is the same purchase: only count the first entry
+        if status in PURCHASE_STATUSES and applied not in PURCHASE_STATUSES:
+            await PurchaseSummaryService.record_purchase(
+                db, cart.business_id, cart.user_phone, amount, now
+            )
+
+        analytics_cache.bump([cart.business_id])
@@ -0,0 +1,338 @@
+# app/services/catalog_sync_jobs.py
+import asyncio
+import logging
+import os
+import socket
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+from sqlalchemy import select, update, func, or_, and_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.session import AsyncSessionLocal
+from app.models.catalog_sync_job import CatalogSyncJob
+from app.models.ecommerce_config import EcommerceConfig
+from app.services.ecommerce_sync_service import EcommerceSyncService
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = ("queued", "running")
+
+
+class SyncJobConflict(Exception):
+    """A sync of the integration is already queued or running."""
+
+    def __init__(self, job_id: Optional[int]):
+        super().__init__(f"Sync already in progress (job {job_id})")
+        self.job_id = job_id
+
+
+class CatalogSyncJobRunner:
+    """
+    Catalog syncs as background jobs.
+
+    Jobs live in catalog_sync_jobs, so any worker can report or cancel them
+    and they outlive the process that runs them. Every worker polls for
+    queued jobs and claims them with FOR UPDATE SKIP LOCKED. A running job
+    heartbeats every `heartbeat_seconds`, writing its progress and picking
+    up cancel requests. A job whose heartbeat goes stale (its worker died)
+    is claimed again and re-run; the sync is idempotent and its cursor only
+    moves on success. Every write is fenced on the claim (worker and
+    started_at), so a slow worker whose job was taken over stops its sync
+    instead of overwriting the new run. A partial unique index allows one
+    queued/running job per integration.
+    """
+
+    def __init__(
+        self,
+        max_jobs: int = 2,
+        poll_seconds: float = 10.0,
+        heartbeat_seconds: float = 5.0,
+        stale_seconds: float = 60.0
+    ):
+        self.max_jobs = max_jobs
+        self.poll_seconds = poll_seconds
+        self.heartbeat_seconds = heartbeat_seconds
+        self.stale_seconds = stale_seconds
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._running: Dict[int, asyncio.Task] = {}
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+    # ------------------------------------------------------------------ API
+
+    async def submit(self, db: AsyncSession, config: EcommerceConfig, full: Optional[bool] = None) -> CatalogSyncJob:
+        """Queue a sync of `config`. Raises SyncJobConflict if one is already queued or running."""
+        job = CatalogSyncJob(integration_id=config.id, business_id=config.business_id, full=full, status="queued")
+        db.add(job)
+        try:
+            await db.commit()
+        except IntegrityError:
+            await db.rollback()
+            active = await db.execute(
+                select(CatalogSyncJob.id).where(
+                    CatalogSyncJob.integration_id == config.id,
+                    CatalogSyncJob.status.in_(ACTIVE_STATUSES)
+                )
+            )
+            raise SyncJobConflict(active.scalar())
+        await db.refresh(job)
+        self._wake.set()
+        return job
+
+    @staticmethod
+    async def get(db: AsyncSession, job_id: int) -> Optional[CatalogSyncJob]:
+        return await db.get(CatalogSyncJob, job_id)
+
+    @staticmethod
+    async def cancel(db: AsyncSession, job_id: int) -> Optional[CatalogSyncJob]:
+        """Cancel a queued job at once; ask a running one to stop at its next heartbeat."""
+        now = datetime.now(timezone.utc)
+        await db.execute(
+            update(CatalogSyncJob)
+            .where(CatalogSyncJob.id == job_id, CatalogSyncJob.status == "queued")
+            .values(status="cancelled", finished_at=now)
+        )
+        await db.execute(
+            update(CatalogSyncJob)
+            .where(CatalogSyncJob.id == job_id, CatalogSyncJob.status == "running")
+            .values(cancel_requested=True)
+        )
+        await db.commit()
+        job = await db.get(CatalogSyncJob, job_id)
+        if job is not None:
+            await db.refresh(job)
+        return job
+
+    @staticmethod
+    def describe(job: CatalogSyncJob) -> Dict:
+        """Job status with rate (products/s) and ETA when the store reports a total."""
+        rate = eta = None
+        if job.started_at:
+            end = job.finished_at or datetime.now(timezone.utc)
+            elapsed = (end - job.started_at).total_seconds()
+            if elapsed > 0:
+                rate = job.products_fetched / elapsed
+        if job.status == "running" and rate and job.products_total is not None:
+            eta = max(job.products_total - job.products_fetched, 0) / rate
+
+        return {
+            "job_id": job.id,
+            "integration_id": job.integration_id,
+            "business_id": job.business_id,
+            "status": job.status,
+            "mode": job.mode,
+            "pages_fetched": job.pages_fetched,
+            "products_fetched": job.products_fetched,
+            "products_total": job.products_total,
+            "rows_upserted": job.inserted + job.updated,
+            "inserted": job.inserted,
+            "updated": job.updated,
+            "unchanged": job.unchanged,
+            "deactivated": job.deactivated,
+            "rate_per_second": round(rate, 2) if rate is not None else None,
+            "eta_seconds": round(eta) if eta is not None else None,
+            "cancel_requested": job.cancel_requested,
+            "error": job.error,
+            "created_at": job.created_at,
+            "started_at": job.started_at,
+            "finished_at": job.finished_at
+        }
+
+    # --------------------------------------------------------------- worker
+
+    async def _claim(self) -> Optional[CatalogSyncJob]:
+        """Take the oldest queued (or abandoned) job; progress restarts from zero."""
+        stale = datetime.now(timezone.utc) - timedelta(seconds=self.stale_seconds)
+        candidate = (
+            select(CatalogSyncJob.id)
+            .where(or_(
+                CatalogSyncJob.status == "queued",
+                and_(CatalogSyncJob.status == "running", CatalogSyncJob.heartbeat_at < stale)
+            ))
+            .where(CatalogSyncJob.id.notin_(list(self._running)))
+            .order_by(CatalogSyncJob.id)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                update(CatalogSyncJob)
+                .where(CatalogSyncJob.id == candidate)
+                .values(
+                    status="running", worker=self.worker_id,
+                    started_at=func.now(), heartbeat_at=func.now(), finished_at=None,
+                    pages_fetched=0, products_fetched=0, products_total=None,
+                    inserted=0, updated=0, unchanged=0, deactivated=0, error=None
+                )
+                .returning(CatalogSyncJob)
+            )
+            job = result.scalars().first()
+            await db.commit()
+            return job
+
+    async def _write(self, job: CatalogSyncJob, **values) -> Optional[bool]:
+        """
+        Update a job row we still own; returns its cancel_requested flag, or
+        None when the job was claimed by another run since.
+        """
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                update(CatalogSyncJob)
+                .where(
+                    CatalogSyncJob.id == job.id,
+                    CatalogSyncJob.worker == self.worker_id,
+                    CatalogSyncJob.started_at == job.started_at
+                )
+                .values(**values)
+                .returning(CatalogSyncJob.cancel_requested)
+            )
+            cancel_requested = result.scalar()
+            await db.commit()
+            return cancel_requested
+
+    async def _write_status(self, job: CatalogSyncJob, **values) -> Optional[bool]:
+        """
+        _write() for a terminal status once the sync has stopped. A failure is
+        only logged: the row stays running until its heartbeat goes stale and
+        the (idempotent) sync is run again.
+        """
+        try:
+            return await self._write(job, **values)
+        except Exception as e:
+            logger.error(f"Could not record status {values.get('status')} of catalog sync job {job.id}: {e}")
+            return False
+
+    @staticmethod
+    def _progress_values(report: Dict) -> Dict:
+        return {
+            "mode": report.get("mode"),
+            "pages_fetched": report.get("pages", 0),
+            "products_fetched": report.get("fetched", 0),
+            "products_total": report.get("total"),
+            "inserted": report.get("inserted", 0),
+            "updated": report.get("updated", 0),
+            "unchanged": report.get("unchanged", 0),
+            "deactivated": report.get("deactivated", 0)
+        }
+
+    async def _sync(self, job: CatalogSyncJob, on_progress) -> Dict:
+        async with AsyncSessionLocal() as db:
+            return await EcommerceSyncService.sync_products(
+                db, job.business_id, full=job.full, integration_id=job.integration_id, on_progress=on_progress
+            )
+
+    async def _execute(self, job: CatalogSyncJob):
+        progress: Dict = {}
+        sync_task = asyncio.create_task(self._sync(job, lambda report: progress.update(report)))
+        cancelled_by_user = False
+        last_heartbeat = time.monotonic()
+        logger.info(f"Catalog sync job {job.id} (integration {job.integration_id}) started on {self.worker_id}")
+
+        try:
+            # Heartbeat: persist progress, pick up cancel requests
+            while not sync_task.done():
+                await asyncio.wait({sync_task}, timeout=self.heartbeat_seconds)
+                if sync_task.done():
+                    break
+                values = {"heartbeat_at": func.now()}
+                if progress:
+                    values.update(self._progress_values(progress))
+                try:
+                    cancel_requested = await self._write(job, **values)
+                except Exception as e:
+                    # Keep going through brief outages, but stop before the job
+                    # can be reclaimed: two syncs of one integration must not overlap
+                    if time.monotonic() - last_heartbeat + 2 * self.heartbeat_seconds < self.stale_seconds:
+                        logger.warning(f"Heartbeat of catalog sync job {job.id} failed, retrying: {e}")
+                        continue
+                    logger.error(f"Catalog sync job {job.id} lost its heartbeat; stopping: {e}")
+                    return
+                last_heartbeat = time.monotonic()
+                if cancel_requested is None:
+                    # Taken over after a stale heartbeat: the new run owns the job now
+                    logger.warning(f"Catalog sync job {job.id} was reclaimed by another run; stopped here")
+                    return
+                if cancel_requested:
+                    cancelled_by_user = True
+                    sync_task.cancel()
+                    break
+
+            try:
+                report = await sync_task
+            except asyncio.CancelledError:
+                if not cancelled_by_user:
+                    raise
+                await self._write_status(job, status="cancelled", finished_at=func.now(), **self._progress_values(progress))
+                logger.info(f"Catalog sync job {job.id} cancelled")
+                return
+            except Exception as e:
+                await self._write_status(
+                    job, status="failed", finished_at=func.now(), error=str(e)[:1000],
+                    **self._progress_values(progress)
+                )
+                logger.error(f"Catalog sync job {job.id} failed: {e}", exc_info=True)
+                return
+
+            if await self._write_status(job, status="completed", finished_at=func.now(), **self._progress_values(report)) is None:
+                logger.warning(f"Catalog sync job {job.id} finished after being reclaimed by another run")
+                return
+            logger.info(f"Catalog sync job {job.id} completed: {report}")
+
+        except asyncio.CancelledError:
+            # Worker shutting down: hand the job back so another worker (or the next start) re-runs it
+            sync_task.cancel()
+            await asyncio.gather(sync_task, return_exceptions=True)
+            await self._write_status(job, status="queued", worker=None, heartbeat_at=None)
+            logger.info(f"Catalog sync job {job.id} requeued on shutdown")
+            raise
+
+        finally:
+            # Never leave a sync running that nothing watches
+            if not sync_task.done():
+                sync_task.cancel()
+                await asyncio.gather(sync_task, return_exceptions=True)
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                while len(self._running) < self.max_jobs:
+                    job = await self._claim()
+                    if job is None:
+                        break
+                    task = asyncio.create_task(self._execute(job))
+                    self._running[job.id] = task
+                    task.add_done_callback(lambda _, job_id=job.id: self._running.pop(job_id, None))
+            except Exception as e:
+                logger.error(f"Error claiming catalog sync jobs: {e}")
+
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    async def start(self):
+        if self._task:
+            return
+        self._stopping = False
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop polling; running jobs are requeued for another worker."""
+        if not self._task:
+            return
+        self._stopping = True
+        self._wake.set()
+        await self._task
+        self._task = None
+
+        running = list(self._running.values())
+        for task in running:
+            task.cancel()
+        await asyncio.gather(*running, return_exceptions=True)
+
+
+catalog_sync_jobs = CatalogSyncJobRunner()
@@ -0,0 +1,126 @@
+# app/services/coupon_service.py
+import time
+import logging
+from typing import Dict, NamedTuple, Optional, Tuple
+from datetime import datetime, timezone
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update, or_, func
+from app.models.coupon import Coupon
+
+logger = logging.getLogger(__name__)
+
+class CompiledCoupon(NamedTuple):
+    code: str
+    percent: float
+    min_amount: float
+    expires_at: Optional[datetime]
+    coupon_id: Optional[int]  # None for built-in recovery codes (no usage counter)
+
+class CouponService:
+    """
+    Coupon rules compiled per business into an in-process {code: rule} map.
+    Lookups are a dict hit; only redemption touches the database, with a
+    conditional UPDATE so usage limits hold under concurrent redemption.
+    """
+
+    CACHE_TTL_SECONDS = 30
+
+    _cache: Dict[int, Tuple[float, Dict[str, CompiledCoupon]]] = {}
+    _builtin: Optional[Dict[str, CompiledCoupon]] = None
+
+    @staticmethod
+    def normalize(code: str) -> str:
+        return (code or "").strip().upper()
+
+    @classmethod
+    def builtin_rules(cls) -> Dict[str, CompiledCoupon]:
+        """Codes issued by the recovery engine (tier codes and reachable FIELnn codes)."""
+        if cls._builtin is None:
+            from app.services.discount_service import DiscountService
+
+            rules = {}
+            for tier in DiscountService.CART_VALUE_TIERS:
+                rules[tier["code"]] = CompiledCoupon(tier["code"], tier["percent"], tier["min_value"], None, None)
+
+            # Same arithmetic as calculate_recovery_discount: tier + urgency + loyalty
+            for tier in DiscountService.CART_VALUE_TIERS:
+                for bonus in DiscountService.URGENCY_BONUSES.values():
+                    percent = tier["percent"] + bonus + 5
+                    code = f"FIEL{int(percent)}"
+                    rules[code] = CompiledCoupon(code, min(percent, 30), 0, None, None)
+
+            cls._builtin = rules
+        return cls._builtin
+
+    @classmethod
+    def builtin_percent(cls, code: str) -> Optional[float]:
+        rule = cls.builtin_rules().get(cls.normalize(code))
+        return rule.percent if rule else None
+
+    @classmethod
+    async def get_rules(cls, db: AsyncSession, business_id: int) -> Dict[str, CompiledCoupon]:
+        """Compiled rule map for a business, reloaded at most every CACHE_TTL_SECONDS."""
+        entry = cls._cache.get(business_id)
+        if entry and time.monotonic() - entry[0] < cls.CACHE_TTL_SECONDS:
+            return entry[1]
+
+        rows = (await db.execute(
+            select(Coupon).where(Coupon.business_id == business_id, Coupon.is_active == True)
+        )).scalars().all()
+
+        # Business coupons override built-in codes with the same name
+        rules = dict(cls.builtin_rules())
+        for coupon in rows:
+            if coupon.max_uses is not None and coupon.uses_count >= coupon.max_uses:
+                continue
+            code = cls.normalize(coupon.code)
+            rules[code] = CompiledCoupon(code, coupon.percent, coupon.min_amount or 0, coupon.expires_at, coupon.id)
+
+        cls._cache[business_id] = (time.monotonic(), rules)
+        return rules
+
+    @classmethod
+    def invalidate(cls, business_id: Optional[int] = None):
+        if business_id is None:
+            cls._cache.clear()
+        else:
+            cls._cache.pop(business_id, None)
+
+    @classmethod
+    async def lookup(cls, db: AsyncSession, business_id: int, code: str) -> Optional[CompiledCoupon]:
+        rules = await cls.get_rules(db, business_id)
+        return rules.get(cls.normalize(code))
+
+    @staticmethod
+    def is_applicable(rule: CompiledCoupon, cart_total: float) -> bool:
+        if rule.expires_at and rule.expires_at <= datetime.now(timezone.utc):
+            return False
+        return cart_total >= rule.min_amount
+
+    @classmethod
+    async def redeem(cls, db: AsyncSession, business_id: int, rule: CompiledCoupon) -> bool:
+        """
+        Atomically consume one use of the coupon.
+        Rides on the caller's transaction; the caller commits.
+        """
+        if rule.coupon_id is None:
+            return True
+
+        stmt = (
+            update(Coupon)
+            .where(
+                Coupon.id == rule.coupon_id,
+                Coupon.is_active == True,
+                or_(Coupon.max_uses == None, Coupon.uses_count < Coupon.max_uses),
+                or_(Coupon.expires_at == None, Coupon.expires_at > func.now())
+            )
+            .values(uses_count=Coupon.uses_count + 1)
+            .returning(Coupon.id)
+            .execution_options(synchronize_session=False)
+        )
+        redeemed = (await db.execute(stmt)).scalar_one_or_none() is not None
+        if not redeemed:
+            # Exhausted, expired or disabled since the rules were compiled
+            cls.invalidate(business_id)
+            logger.info(f"Coupon {rule.code} rejected at redemption for business {business_id}")
+        return redeemed
@@ -0,0 +1,80 @@
+# app/services/dashboard_service.py
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import DASHBOARD_SECTION_TIMEOUT_SECONDS
+from app.db.session import AsyncSessionLocal
+from app.services.analytics_service import AnalyticsService
+from app.services.analytics_rollup_service import AnalyticsRollupService
+
+logger = logging.getLogger(__name__)
+
+Section = Callable[[AsyncSession], Awaitable[Dict]]
+
+
+class DashboardService:
+    """
+    Analytics dashboard assembly. Each section runs concurrently on its own
+    pooled session (one AsyncSession cannot run queries in parallel), so the
+    response takes as long as the slowest section. A section that times out
+    or fails is reported as unavailable instead of failing the dashboard.
+    """
+
+    SECTION_TIMEOUT_SECONDS = DASHBOARD_SECTION_TIMEOUT_SECONDS
+
+    @classmethod
+    def sections(cls, business_id: int, days: int) -> Dict[str, Section]:
+        # Cart and AI sections read the daily rollups (whole UTC days)
+        start_day, end_day = AnalyticsRollupService.day_range(days)
+        now = datetime.now(timezone.utc)
+        return {
+            "cart_recovery": lambda db: AnalyticsRollupService.get_cart_recovery_metrics(db, business_id, start_day, end_day),
+            "customer_lifetime_value": lambda db: AnalyticsService.get_clv_analytics(db, business_id),
+            "ai_performance": lambda db: AnalyticsRollupService.get_ai_performance(db, business_id, start_day, end_day),
+            "ai_latency": lambda db: AnalyticsRollupService.get_latency_percentiles(
+                db, business_id, now - timedelta(days=days), now
+            )
+        }
+
+    @staticmethod
+    async def _on_own_session(section: Section) -> Dict:
+        async with AsyncSessionLocal() as db:
+            return await section(db)
+
+    @classmethod
+    async def _run_section(cls, name: str, section: Section, timeout: float) -> Tuple[str, Optional[Dict], Optional[str]]:
+        # The budget includes waiting for a pooled connection
+        try:
+            return name, await asyncio.wait_for(cls._on_own_session(section), timeout=timeout), None
+        except asyncio.TimeoutError:
+            logger.warning(f"Dashboard section {name} timed out after {timeout}s")
+            return name, None, "timeout"
+        except Exception as e:
+            logger.error(f"Dashboard section {name} failed: {e}", exc_info=True)
+            return name, None, "error"
+
+    @classmethod
+    async def get_dashboard(cls, business_id: int, days: int = 30, timeout: Optional[float] = None) -> Dict:
+        """
+        Returns:
+            Dict with one key per section (None when unavailable), plus
+            `partial` and `unavailable` ({section: "timeout" | "error"})
+        """
+        timeout = timeout or cls.SECTION_TIMEOUT_SECONDS
+        results = await asyncio.gather(*[
+            cls._run_section(name, section, timeout)
+            for name, section in cls.sections(business_id, days).items()
+        ])
+
+        dashboard = {"business_id": business_id, "period_days": days}
+        unavailable = {}
+        for name, data, error in results:
+            dashboard[name] = data
+            if error:
+                unavailable[name] = error
+
+        dashboard["partial"] = bool(unavailable)
+        dashboard["unavailable"] = unavailable
+        return dashboard
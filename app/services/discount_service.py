@@ -1,10 +1,13 @@
 # app/services/discount_service.py
-from typing import Dict, Optional
+from typing import Dict, Optional, Sequence
 from datetime import datetime, timedelta
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
 from app.models.cart import Cart, CartItem
 from app.models.product import Product
+from app.services.purchase_summary_service import PurchaseSummaryService
+from app.services.coupon_service import CouponService
+import numpy as np
 import logging
 
 logger = logging.getLogger(__name__)
@@ -33,7 +36,8 @@ class DiscountService:
     @staticmethod
     def calculate_cart_total(cart: Cart) -> float:
         """Calculate total cart value."""
-        return sum(item.quantity * item.product.price for item in cart.items)
+        # float: prices are Numeric (Decimal) and the discount math below is float
+        return float(sum(item.quantity * item.product.price for item in cart.items))
     
     @classmethod
     def calculate_recovery_discount(
@@ -93,6 +97,81 @@ class DiscountService:
             "message": base_discount["message"]
         }
     
+    @classmethod
+    def calculate_recovery_discounts(
+        cls,
+        totals: Sequence[float],
+        urgency_hours: Sequence[int],
+        is_repeat: Sequence[bool]
+    ) -> Dict:
+        """
+        Vectorized calculate_recovery_discount() for many carts in one NumPy pass.
+        Results match the scalar function element by element.
+        
+        Args:
+            totals: Cart totals
+            urgency_hours: Hours before each discount expires
+            is_repeat: Whether each customer already purchased before
+            
+        Returns:
+            Dict of arrays: {tier, code, percent, min_amount, discount_amount,
+            final_total, message, expires_in_hours} plus the shared issued_at
+        """
+        totals = np.asarray(totals, dtype=np.float64)
+        urgency = np.asarray(urgency_hours, dtype=np.int64)
+        repeat = np.asarray(is_repeat, dtype=bool)
+        
+        # 1. Tier: first tier (highest min_value) the total reaches, lowest tier otherwise
+        mins_asc = np.array([t["min_value"] for t in reversed(cls.CART_VALUE_TIERS)], dtype=np.float64)
+        asc_idx = np.clip(np.searchsorted(mins_asc, totals, side="right") - 1, 0, None)
+        tier = len(cls.CART_VALUE_TIERS) - 1 - asc_idx
+        
+        tier_percent = np.array([t["percent"] for t in cls.CART_VALUE_TIERS], dtype=np.int64)
+        tier_min = np.array([t["min_value"] for t in cls.CART_VALUE_TIERS])
+        tier_code = np.array([t["code"] for t in cls.CART_VALUE_TIERS], dtype=object)
+        tier_message = np.array([t["message"] for t in cls.CART_VALUE_TIERS], dtype=object)
+        
+        # 2. Urgency bonus (unknown hours -> 0)
+        bonus = np.zeros_like(urgency)
+        for hours, value in cls.URGENCY_BONUSES.items():
+            bonus[urgency == hours] = value
+        percent = tier_percent[tier] + bonus
+        
+        # 3. Loyalty bonus; the FIEL code carries the pre-cap percent like the scalar path
+        percent = percent + np.where(repeat, 5, 0)
+        code = np.where(repeat, "FIEL" + percent.astype(str).astype(object), tier_code[tier])
+        message = np.where(repeat, "¡Gracias por volver!", tier_message[tier])
+        
+        # 4. Cap at reasonable maximum
+        percent = np.minimum(percent, 30)
+        
+        return {
+            "tier": tier,
+            "code": code,
+            "percent": percent,
+            "min_amount": tier_min[tier],
+            "discount_amount": totals * (percent / 100),
+            "final_total": totals * (1 - percent / 100),
+            "message": message,
+            "expires_in_hours": urgency,
+            "issued_at": datetime.utcnow()
+        }
+    
+    @staticmethod
+    def discount_at(batch: Dict, i: int) -> Dict:
+        """Row `i` of calculate_recovery_discounts() in the scalar result format."""
+        hours = int(batch["expires_in_hours"][i])
+        return {
+            "code": str(batch["code"][i]),
+            "percent": int(batch["percent"][i]),
+            "min_amount": int(batch["min_amount"][i]),
+            "discount_amount": float(batch["discount_amount"][i]),
+            "final_total": float(batch["final_total"][i]),
+            "expires_at": batch["issued_at"] + timedelta(hours=hours),
+            "expires_in_hours": hours,
+            "message": str(batch["message"][i])
+        }
+    
     @classmethod
     async def get_customer_history(cls, db: AsyncSession, business_id: int, user_phone: str) -> Dict:
         """
@@ -101,27 +180,10 @@ class DiscountService:
         Returns:
             Dict with {total_purchases, total_spent, avg_order_value, is_repeat}
         """
-        # Count completed purchases
-        stmt = select(func.count(Cart.id), func.sum(
-            func.coalesce(
-                select(func.sum(CartItem.quantity * Product.price))
-                .where(CartItem.cart_id == Cart.id)
-                .join(Product, CartItem.product_id == Product.id)
-                .correlate(Cart)
-                .scalar_subquery(),
-                0
-            )
-        )).where(
-            Cart.business_id == business_id,
-            Cart.user_phone == user_phone,
-            Cart.status.in_(["paid", "recovered"])
-        )
-        
-        result = await db.execute(stmt)
-        row = result.first()
-        
-        total_purchases = row[0] if row and row[0] else 0
-        total_spent = float(row[1]) if row and row[1] else 0.0
+        # O(1) lookup on the materialized summary (see PurchaseSummaryService)
+        summary = await PurchaseSummaryService.get_summary(db, business_id, user_phone)
+        total_purchases = summary["total_purchases"]
+        total_spent = summary["total_spent"]
         
         return {
             "total_purchases": total_purchases,
@@ -143,33 +205,32 @@ class DiscountService:
         Returns:
             Dict with {success, discount_amount, final_total, message}
         """
-        # For now, simple validation against known codes
-        # TODO: Add Coupon model to database with expiration, usage limits, etc.
-        
-        known_codes = {tier["code"]: tier["percent"] for tier in cls.CART_VALUE_TIERS}
-        
-        # Check for VIP/FIEL codes (loyalty)
-        if coupon_code.startswith("FIEL"):
-            try:
-                percent = int(coupon_code.replace("FIEL", ""))
-                if 5 <= percent <= 30:
-                    known_codes[coupon_code] = percent
-            except ValueError:
-                pass
+        # O(1) lookup in the business' compiled coupon rules
+        rule = await CouponService.lookup(db, cart.business_id, coupon_code)
+        total = cls.calculate_cart_total(cart)
         
-        if coupon_code not in known_codes:
+        if not rule or not CouponService.is_applicable(rule, total):
             return {
                 "success": False,
                 "message": f"Cupón '{coupon_code}' no válido o expirado."
             }
         
-        total = cls.calculate_cart_total(cart)
-        percent = known_codes[coupon_code]
+        # Re-applying the same code to the cart does not consume another use
+        if cart.coupon_applied != rule.code:
+            if not await CouponService.redeem(db, cart.business_id, rule):
+                return {
+                    "success": False,
+                    "message": f"Cupón '{coupon_code}' no válido o expirado."
+                }
+        
+        coupon_code = rule.code
+        percent = rule.percent
         discount_amount = total * (percent / 100)
         final_total = total - discount_amount
         
-        # Apply to cart
+        # Apply to cart (percent stored so checkout needs no lookup)
         cart.coupon_applied = coupon_code
+        cart.coupon_percent = percent
         await db.commit()
         
         logger.info(f"Coupon {coupon_code} applied to cart {cart.id}. Discount: ${discount_amount:.2f}")
@@ -181,7 +242,7 @@ class DiscountService:
             "discount_amount": discount_amount,
             "original_total": total,
             "final_total": final_total,
-            "message": f"✅ ¡Cupón aplicado! Ahorraste ${discount_amount:.0f} ({percent}%)"
+            "message": f"✅ ¡Cupón aplicado! Ahorraste ${discount_amount:.0f} ({percent:g}%)"
         }
     
     @classmethod
@@ -236,19 +297,17 @@ class DiscountService:
         message = "🌟 *¡Excelente selección!*\n\n"
         
         if cart.coupon_applied:
-            # Show discount details
-            # Try to extract percent from code
-            percent = 10  # Default
-            for tier in cls.CART_VALUE_TIERS:
-                if tier["code"] == cart.coupon_applied:
-                    percent = tier["percent"]
-                    break
+            # Show discount details (percent stored when the coupon was applied)
+            percent = cart.coupon_percent
+            if percent is None:
+                # Carts from before coupon_percent existed
+                percent = CouponService.builtin_percent(cart.coupon_applied) or 10
             
             original_total = total / (1 - percent/100)
             discount = original_total - total
             
             message += f"💸 Total original: ${original_total:,.0f}\n"
-            message += f"🎁 Descuento ({percent}%): -${discount:,.0f}\n"
+            message += f"🎁 Descuento ({percent:g}%): -${discount:,.0f}\n"
             message += f"💰 *Total a pagar: ${total:,.0f}*\n\n"
         else:
             message += f"💰 *Total a pagar: ${total:,.0f}*\n\n"
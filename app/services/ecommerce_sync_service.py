@@ -1,26 +1,61 @@
 # app/services/ecommerce_sync_service.py
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from app.models.ecommerce_config import EcommerceConfig
+from sqlalchemy import select, update, literal_column, tuple_, bindparam, all_, any_, case, true, false, String
+from sqlalchemy.dialects.postgresql import insert, ARRAY
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+import hashlib
+import json
+from app.core.config import ECOMMERCE_FULL_SYNC_HOURS
+from app.models.ecommerce_config import EcommerceConfig, EcommerceProvider
 from app.models.product import Product
 from app.models.category import Category
 from app.services.ecommerce_factory import EcommerceFactory
-from typing import Optional
+from typing import Callable, Dict, List, Optional
 
 class EcommerceSyncService:
+    # Rows per INSERT ... ON CONFLICT statement (11 bind params per row, well under the 32767 limit)
+    UPSERT_CHUNK = 1000
+    # Deltas re-read this much before the cursor (clock skew between us and the store)
+    CURSOR_OVERLAP = timedelta(minutes=5)
+
     @staticmethod
-    async def sync_products(db: AsyncSession, business_id: int):
+    async def sync_products(
+        db: AsyncSession,
+        business_id: int,
+        full: Optional[bool] = None,
+        integration_id: Optional[int] = None,
+        on_progress: Optional[Callable[[Dict], None]] = None
+    ) -> Dict:
+        """
+        Pull the external catalog and upsert it in chunks.
+        
+        Routine syncs only fetch products modified since the stored cursor.
+        A full sync runs on the first sync, every ECOMMERCE_FULL_SYNC_HOURS or
+        when `full` is True, and deactivates synced products the store no
+        longer lists. Only products whose content hash changed are written,
+        and the integration's catalog_version only moves when something was.
+        
+        Args:
+            integration_id: Sync this integration (default: the business's first one)
+            on_progress: Called with the running report after every page and chunk
+        
+        Returns:
+            Dict with the mode, fetched / inserted / updated / unchanged /
+            deactivated product counts and the resulting catalog_version
+        """
         # Fetch the active eCommerce config for this business
-        res = await db.execute(
-            select(EcommerceConfig).where(EcommerceConfig.business_id == business_id)
-        )
+        stmt = select(EcommerceConfig).where(EcommerceConfig.business_id == business_id)
+        if integration_id is not None:
+            stmt = stmt.where(EcommerceConfig.id == integration_id)
+        res = await db.execute(stmt)
         config = res.scalars().first()
         
         if not config:
             raise ValueError("No eCommerce configuration found for this business")
             
         adapter = EcommerceFactory.get_adapter(config.provider, config.store_url, config.credentials)
-        external_products = await adapter.fetch_products()
+        provider = config.provider
         
         # Determine a default category for the business (or create one)
         cat_res = await db.execute(select(Category).where(Category.business_id == business_id))
@@ -29,37 +64,149 @@ class EcommerceSyncService:
             category = Category(name="General", business_id=business_id)
             db.add(category)
             await db.flush()
+        category_id = category.id
+
+        started_at = datetime.now(timezone.utc)
+        if full is None:
+            full = (
+                config.sync_cursor is None
+                or config.last_full_sync_at is None
+                or started_at - config.last_full_sync_at >= timedelta(hours=ECOMMERCE_FULL_SYNC_HOURS)
+            )
+        since = None if full else config.sync_cursor - EcommerceSyncService.CURSOR_OVERLAP
 
-        for ep in external_products:
-            # Check if product already exists
-            p_res = await db.execute(
-                select(Product).where(
+        report = {
+            "mode": "full" if full else "delta", "pages": 0, "total": None,
+            "fetched": 0, "inserted": 0, "updated": 0, "unchanged": 0, "deactivated": 0,
+            "catalog_version": config.catalog_version
+        }
+        seen = set()
+        pending: List[Dict] = []
+        # Pages are gathered into chunks; each chunk is one statement and one commit
+        async for external_products in adapter.iter_products(since):
+            report["pages"] += 1
+            report["fetched"] += len(external_products)
+            report["total"] = adapter.total
+            if full:
+                seen.update(ep["external_id"] for ep in external_products)
+            pending.extend(external_products)
+            while len(pending) >= EcommerceSyncService.UPSERT_CHUNK:
+                chunk, pending = pending[:EcommerceSyncService.UPSERT_CHUNK], pending[EcommerceSyncService.UPSERT_CHUNK:]
+                await EcommerceSyncService._upsert_chunk(db, business_id, provider, category_id, chunk, report)
+            if on_progress:
+                on_progress(report)
+        if pending:
+            await EcommerceSyncService._upsert_chunk(db, business_id, provider, category_id, pending, report)
+        
+        # An empty full listing is more likely an API problem than an empty store
+        if full and seen:
+            result = await db.execute(
+                update(Product).where(
                     Product.business_id == business_id,
-                    Product.external_id == ep["external_id"],
-                    Product.provider == config.provider
-                )
+                    Product.provider == provider,
+                    Product.external_id.isnot(None),
+                    Product.is_active == True,
+                    Product.external_id != all_(bindparam("seen", list(seen), type_=ARRAY(String)))
+                ).values(is_active=False, removed_from_store=True)
             )
-            product = p_res.scalars().first()
-            
-            if product:
-                # Update
-                product.name = ep["name"]
-                product.description = ep["description"]
-                product.price = ep["price"]
-                product.metadata_json = ep["metadata"]
-            else:
-                # Create
-                product = Product(
-                    business_id=business_id,
-                    category_id=category.id,
-                    name=ep["name"],
-                    description=ep["description"],
-                    price=ep["price"],
-                    external_id=ep["external_id"],
-                    provider=config.provider,
-                    metadata_json=ep["metadata"]
-                )
-                db.add(product)
+            report["deactivated"] = result.rowcount
+        
+        if report["inserted"] or report["updated"] or report["deactivated"]:
+            bumped = await db.execute(
+                update(EcommerceConfig)
+                .where(EcommerceConfig.id == config.id)
+                .values(catalog_version=EcommerceConfig.catalog_version + 1)
+                .returning(EcommerceConfig.catalog_version)
+            )
+            report["catalog_version"] = bumped.scalar()
         
+        # The cursor only moves once everything up to started_at is stored
+        config.sync_cursor = started_at
+        if full:
+            config.last_full_sync_at = started_at
         await db.commit()
-        return len(external_products)
+        
+        if on_progress:
+            on_progress(report)
+        return report
+
+    @staticmethod
+    def content_hash(external_product: Dict) -> str:
+        """Stable sha256 of the synced fields: key order and price formatting don't matter."""
+        content = [
+            external_product["name"],
+            external_product["description"],
+            f"{Decimal(str(external_product['price'])):.2f}",
+            external_product["metadata"]
+        ]
+        canonical = json.dumps(content, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+        return hashlib.sha256(canonical.encode()).hexdigest()
+
+    @staticmethod
+    async def _upsert_chunk(
+        db: AsyncSession,
+        business_id: int,
+        provider: EcommerceProvider,
+        category_id: int,
+        external_products: List[Dict],
+        report: Dict[str, int]
+    ):
+        # A statement may touch each row once: the last copy of a repeated product wins
+        rows = {
+            ep["external_id"]: {
+                "business_id": business_id,
+                "category_id": category_id,
+                "name": ep["name"],
+                "description": ep["description"],
+                "price": ep["price"],
+                "external_id": ep["external_id"],
+                "provider": provider,
+                "metadata_json": ep["metadata"],
+                "content_hash": EcommerceSyncService.content_hash(ep),
+                "is_active": True,
+                "removed_from_store": False
+            }
+            for ep in external_products
+        }
+
+        # Compare hashes in one indexed read; unchanged products are never written (not even locked)
+        stored = await db.execute(
+            select(Product.external_id, Product.content_hash, Product.removed_from_store).where(
+                Product.business_id == business_id,
+                Product.provider == provider,
+                Product.external_id == any_(bindparam("external_ids", list(rows), type_=ARRAY(String)))
+            )
+        )
+        for external_id, content_hash, removed_from_store in stored.all():
+            if content_hash == rows[external_id]["content_hash"] and not removed_from_store:
+                del rows[external_id]
+
+        written = []
+        if rows:
+            stmt = insert(Product).values(list(rows.values()))
+            excluded = stmt.excluded
+            # New rows are inserted with the default category; existing rows keep theirs
+            stmt = stmt.on_conflict_do_update(
+                constraint="uq_products_business_provider_external",
+                set_={
+                    "name": excluded.name,
+                    "description": excluded.description,
+                    "price": excluded.price,
+                    "metadata_json": excluded.metadata_json,
+                    "content_hash": excluded.content_hash,
+                    # Products a full sync removed come back; ones switched off by the merchant stay off
+                    "is_active": case((Product.removed_from_store, true()), else_=Product.is_active),
+                    "removed_from_store": false()
+                },
+                # Rows another sync brought up to date meanwhile are skipped (not returned)
+                where=tuple_(Product.content_hash, Product.removed_from_store).is_distinct_from(
+                    tuple_(excluded.content_hash, excluded.removed_from_store)
+                )
+            ).returning(literal_column("xmax = 0").label("inserted"))
+            written = (await db.execute(stmt)).scalars().all()
+        await db.commit()
+
+        inserted = sum(1 for is_new in written if is_new)
+        report["inserted"] += inserted
+        report["updated"] += len(written) - inserted
+        report["unchanged"] += len(external_products) - len(written)
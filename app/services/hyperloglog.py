@@ -0,0 +1,60 @@
+# app/services/hyperloglog.py
+import hashlib
+import math
+from typing import Iterable, Optional
+
+
+class HyperLogLog:
+    """
+    Approximate distinct counter (HyperLogLog, 64-bit hashes).
+
+    2^precision one-byte registers each keep the longest run of leading
+    zeros seen among the hashes routed to them. The state is a fixed-size
+    byte string (4 KiB at the default precision, ~1.6% standard error), and
+    two counters merge by taking the per-register maximum, in Python or in
+    SQL (see hll_merge() in migration 4e1a8c6b2d95).
+    """
+
+    PRECISION = 12
+
+    def __init__(self, registers: Optional[bytes] = None, precision: int = PRECISION):
+        self.precision = precision
+        self.m = 1 << precision
+        if registers is not None and len(registers) != self.m:
+            raise ValueError(f"Expected {self.m} registers, got {len(registers)}")
+        self.registers = bytearray(registers) if registers is not None else bytearray(self.m)
+
+    @property
+    def relative_error(self) -> float:
+        return 1.04 / math.sqrt(self.m)
+
+    def add(self, value: str):
+        h = int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "big")
+        index = h >> (64 - self.precision)
+        rest = h & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def update(self, values: Iterable[str]):
+        for value in values:
+            self.add(value)
+
+    def merge(self, other: "HyperLogLog") -> "HyperLogLog":
+        if other.m != self.m:
+            raise ValueError("Cannot merge HyperLogLog counters of different precision")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    def count(self) -> int:
+        m = self.m
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        # Small cardinalities: linear counting over the empty registers
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)
+        return round(estimate)
+
+    def to_bytes(self) -> bytes:
+        return bytes(self.registers)
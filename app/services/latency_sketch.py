@@ -0,0 +1,92 @@
+# app/services/latency_sketch.py
+import math
+from typing import Dict, Iterable, Optional
+
+
+class LatencySketch:
+    """
+    Mergeable latency histogram with relative-error guarantees (DDSketch-style).
+
+    Values land in logarithmic bins: bin k holds (gamma^(k-1), gamma^k], so any
+    quantile is returned within `relative_accuracy` of the true value. Two
+    sketches merge by adding bin counts, which makes them safe to build per
+    worker / per flush and combine later (in Python or in SQL, see
+    latency_sketch_merge() in migration 0c9e2f7b4d31).
+    """
+
+    RELATIVE_ACCURACY = 0.01
+    ZERO_KEY = "z"  # values <= 0
+
+    def __init__(
+        self,
+        bins: Optional[Dict[str, int]] = None,
+        total: float = 0.0,
+        min_value: Optional[float] = None,
+        max_value: Optional[float] = None,
+        relative_accuracy: float = RELATIVE_ACCURACY
+    ):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.bins: Dict[str, int] = {k: int(c) for k, c in (bins or {}).items()}
+        # Exact side statistics
+        self.total = total
+        self.min = min_value
+        self.max = max_value
+
+    @property
+    def count(self) -> int:
+        return sum(self.bins.values())
+
+    def key(self, value: float) -> str:
+        if value <= 0:
+            return self.ZERO_KEY
+        return str(math.ceil(math.log(value) / self._log_gamma))
+
+    def add(self, value: float, count: int = 1):
+        k = self.key(value)
+        self.bins[k] = self.bins.get(k, 0) + count
+        self.total += value * count
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def extend(self, values: Iterable[float]):
+        for value in values:
+            self.add(value)
+
+    def merge(self, other: "LatencySketch") -> "LatencySketch":
+        for k, c in other.bins.items():
+            self.bins[k] = self.bins.get(k, 0) + c
+        self.total += other.total
+        self.min = min((v for v in (self.min, other.min) if v is not None), default=None)
+        self.max = max((v for v in (self.max, other.max) if v is not None), default=None)
+        return self
+
+    def _value(self, key: str) -> float:
+        if key == self.ZERO_KEY:
+            return 0.0
+        k = int(key)
+        # Midpoint (in relative terms) of (gamma^(k-1), gamma^k]
+        return 2 * self.gamma ** k / (self.gamma + 1)
+
+    def quantile(self, q: float) -> Optional[float]:
+        total = self.count
+        if total == 0:
+            return None
+
+        rank = q * (total - 1)
+        seen = 0
+        ordered = sorted(self.bins, key=lambda k: -math.inf if k == self.ZERO_KEY else int(k))
+        estimate = self._value(ordered[-1])
+        for k in ordered:
+            seen += self.bins[k]
+            if seen > rank:
+                estimate = self._value(k)
+                break
+        # Bin midpoints can fall outside the observed range at the extremes
+        if self.min is not None and self.max is not None:
+            estimate = min(max(estimate, self.min), self.max)
+        return estimate
+
+    def quantiles(self, qs: Iterable[float]) -> Dict[float, Optional[float]]:
+        return {q: self.quantile(q) for q in qs}
@@ -0,0 +1,166 @@
+# app/services/purchase_summary_service.py
+from typing import Dict, Iterable, Optional, Sequence, Set, Tuple
+from datetime import datetime
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from app.models.analytics import CustomerPurchaseSummary
+from app.models.cart import Cart, CartItem
+from app.models.product import Product
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Cart statuses that count as a purchase
+PURCHASE_STATUSES = ("paid", "recovered")
+
+class PurchaseSummaryService:
+    """
+    Per-(business, phone) purchase totals kept in `customer_purchase_summaries`.
+    Updated with an O(1) upsert when a cart becomes a purchase, so readers
+    never have to re-aggregate cart history.
+    """
+
+    @staticmethod
+    async def record_purchase(
+        db: AsyncSession,
+        business_id: int,
+        user_phone: str,
+        amount: float,
+        purchased_at: Optional[datetime] = None
+    ):
+        """
+        Add one purchase to the customer's summary row.
+        Rides on the caller's transaction; the caller commits.
+        """
+        purchased_at = purchased_at or datetime.utcnow()
+        table = CustomerPurchaseSummary
+        stmt = insert(table).values(
+            business_id=business_id,
+            user_phone=user_phone,
+            total_purchases=1,
+            total_spent=amount,
+            first_purchase_at=purchased_at,
+            last_purchase_at=purchased_at
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.business_id, table.user_phone],
+            set_={
+                "total_purchases": table.total_purchases + 1,
+                "total_spent": table.total_spent + stmt.excluded.total_spent,
+                "first_purchase_at": func.least(table.first_purchase_at, stmt.excluded.first_purchase_at),
+                "last_purchase_at": func.greatest(table.last_purchase_at, stmt.excluded.last_purchase_at),
+                "updated_at": func.now()
+            }
+        )
+        await db.execute(stmt)
+
+    @staticmethod
+    async def get_summary(db: AsyncSession, business_id: int, user_phone: str) -> Dict:
+        """
+        Single-row lookup of a customer's purchase totals.
+
+        Returns:
+            Dict with {total_purchases, total_spent, first_purchase_at, last_purchase_at}
+        """
+        row = (await db.execute(
+            select(
+                CustomerPurchaseSummary.total_purchases,
+                CustomerPurchaseSummary.total_spent,
+                CustomerPurchaseSummary.first_purchase_at,
+                CustomerPurchaseSummary.last_purchase_at
+            ).where(
+                CustomerPurchaseSummary.business_id == business_id,
+                CustomerPurchaseSummary.user_phone == user_phone
+            )
+        )).first()
+
+        return {
+            "total_purchases": row.total_purchases if row else 0,
+            "total_spent": float(row.total_spent) if row and row.total_spent else 0.0,
+            "first_purchase_at": row.first_purchase_at if row else None,
+            "last_purchase_at": row.last_purchase_at if row else None
+        }
+
+    @staticmethod
+    async def get_repeat_customers(
+        db: AsyncSession,
+        customers: Iterable[Tuple[int, str]]
+    ) -> Set[Tuple[int, str]]:
+        """Subset of (business_id, phone) pairs with at least one purchase, in one query."""
+        customers = list(customers)
+        if not customers:
+            return set()
+
+        rows = await db.execute(
+            select(CustomerPurchaseSummary.business_id, CustomerPurchaseSummary.user_phone).where(
+                tuple_(CustomerPurchaseSummary.business_id, CustomerPurchaseSummary.user_phone).in_(customers),
+                CustomerPurchaseSummary.total_purchases > 0
+            )
+        )
+        return {(row.business_id, row.user_phone) for row in rows}
+
+    @staticmethod
+    def cart_totals(business_id: Optional[int] = None, statuses: Sequence[str] = PURCHASE_STATUSES):
+        """
+        SELECT of one row per cart in `statuses`: cart_id, business_id,
+        user_phone, status, last_interaction, cart_total. Totals are computed
+        per cart first so multi-item carts are counted once.
+        """
+        stmt = (
+            select(
+                Cart.id.label("cart_id"),
+                Cart.business_id,
+                Cart.user_phone,
+                Cart.status,
+                Cart.last_interaction,
+                func.coalesce(func.sum(CartItem.quantity * Product.price), 0).label("cart_total")
+            )
+            .outerjoin(CartItem, CartItem.cart_id == Cart.id)
+            .outerjoin(Product, CartItem.product_id == Product.id)
+            .where(Cart.status.in_(statuses))
+            .group_by(Cart.id)
+        )
+        if business_id is not None:
+            stmt = stmt.where(Cart.business_id == business_id)
+        return stmt
+
+    @staticmethod
+    async def backfill(db: AsyncSession, business_id: Optional[int] = None) -> int:
+        """
+        Rebuild summaries from cart history in one set-based
+        INSERT ... SELECT ... ON CONFLICT DO UPDATE pass.
+
+        Returns:
+            Number of summary rows written
+        """
+        cart_totals = PurchaseSummaryService.cart_totals(business_id).subquery()
+
+        per_customer = select(
+            cart_totals.c.business_id,
+            cart_totals.c.user_phone,
+            func.count().label("total_purchases"),
+            func.sum(cart_totals.c.cart_total).label("total_spent"),
+            func.min(cart_totals.c.last_interaction).label("first_purchase_at"),
+            func.max(cart_totals.c.last_interaction).label("last_purchase_at")
+        ).group_by(cart_totals.c.business_id, cart_totals.c.user_phone)
+
+        table = CustomerPurchaseSummary
+        stmt = insert(table).from_select(
+            ["business_id", "user_phone", "total_purchases", "total_spent", "first_purchase_at", "last_purchase_at"],
+            per_customer
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.business_id, table.user_phone],
+            set_={
+                "total_purchases": stmt.excluded.total_purchases,
+                "total_spent": stmt.excluded.total_spent,
+                "first_purchase_at": stmt.excluded.first_purchase_at,
+                "last_purchase_at": stmt.excluded.last_purchase_at,
+                "updated_at": func.now()
+            }
+        )
+        result = await db.execute(stmt)
+        await db.commit()
+        logger.info(f"Backfilled {result.rowcount} purchase summaries (business={business_id or 'all'})")
+        return result.rowcount
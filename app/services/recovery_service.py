@@ -1,10 +1,14 @@
 # app/services/recovery_service.py
 import logging
 from datetime import datetime, timedelta
-from sqlalchemy import select, and_
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import select, and_, literal_column
 from sqlalchemy.orm import selectinload
+from app.core.config import CART_ABANDONMENT_MINUTES
 from app.models.cart import Cart, CartItem
 from app.services.meta_service import MetaService
+from app.services.cart_status_service import CartStatusService
+from app.services.purchase_summary_service import PurchaseSummaryService
 from app.models.business_channel import BusinessChannel
 
 logger = logging.getLogger(__name__)
@@ -14,64 +18,135 @@ class RecoveryService:
     Automates abandoned cart recovery via WhatsApp.
     Scans for carts without activity for > 1 hour.
     """
-    
+
     @staticmethod
-    async def scan_and_recover(db):
+    def _recoverable(now: datetime):
+        # Activos y no notificados recientemente.
+        # 'active' va como literal para que calce con el índice parcial ix_carts_recovery_scan
+        return and_(
+            Cart.is_active == True,
+            Cart.status == literal_column("'active'"),
+            (Cart.last_notified_at == None) | (Cart.last_notified_at < now - timedelta(hours=24))
+        )
+
+    @classmethod
+    async def scan_and_recover(cls, db):
         now = datetime.utcnow()
-        threshold = now - timedelta(hours=1)
-        
+        threshold = now - timedelta(minutes=CART_ABANDONMENT_MINUTES)
+
         # 1. Identificar carritos abandonados (activos, última interacción > 1h, no notificados recientemente)
         stmt = select(Cart).where(
-            Cart.is_active == True,
-            Cart.status == "active",
-            Cart.last_interaction < threshold,
-            (Cart.last_notified_at == None) | (Cart.last_notified_at < now - timedelta(hours=24))
+            cls._recoverable(now),
+            Cart.last_interaction < threshold
         ).options(selectinload(Cart.items).selectinload(CartItem.product))
-        
+
         result = await db.execute(stmt)
         abandoned_carts = result.scalars().all()
-        
-        for cart in abandoned_carts:
-            if not cart.items: continue
-            
-            try:
-                # 2. Obtener canal de WhatsApp del negocio
-                chan_stmt = select(BusinessChannel).where(
-                    BusinessChannel.business_id == cart.business_id,
-                    BusinessChannel.channel_type == "WHATSAPP"
-                )
-                chan = (await db.execute(chan_stmt)).scalar_one_or_none()
-                
-                if not chan or not chan.token:
-                    continue
-                
-                # 3. Preparar mensaje de recuperación persuasivo con descuento dinámico
-                from app.services.discount_service import DiscountService
-                
+
+        await cls._recover_batch(db, abandoned_carts, now)
+
+        return len(abandoned_carts)
+
+    @classmethod
+    async def recover_due_carts(cls, db, cart_ids: Iterable[int]) -> Tuple[int, List[int]]:
+        """
+        Recover specific carts whose abandonment deadline already fired.
+        The deadline itself acts as the inactivity threshold.
+
+        Returns:
+            (carts recovered, ids of carts whose recovery failed and should be retried)
+        """
+        cart_ids = list(cart_ids)
+        if not cart_ids:
+            return 0, []
+
+        now = datetime.utcnow()
+        stmt = select(Cart).where(
+            Cart.id.in_(cart_ids),
+            cls._recoverable(now)
+        ).options(selectinload(Cart.items).selectinload(CartItem.product))
+
+        carts = (await db.execute(stmt)).scalars().all()
+        failed = await cls._recover_batch(db, carts, now)
+
+        return len([cart for cart in carts if cart.items]) - len(failed), failed
+
+    @classmethod
+    async def _recover_batch(cls, db, carts: List[Cart], now: datetime) -> List[int]:
+        """
+        Recover many carts with one repeat-customer query and one vectorized
+        discount pass instead of per-cart history lookups.
+        Returns the ids of the carts that could not be recovered.
+        """
+        from app.services.discount_service import DiscountService
+
+        carts = [cart for cart in carts if cart.items]
+        if not carts:
+            return []
+
+        repeat = await PurchaseSummaryService.get_repeat_customers(
+            db, {(cart.business_id, cart.user_phone) for cart in carts}
+        )
+        batch = DiscountService.calculate_recovery_discounts(
+            totals=[DiscountService.calculate_cart_total(cart) for cart in carts],
+            urgency_hours=[2] * len(carts),
+            is_repeat=[(cart.business_id, cart.user_phone) in repeat for cart in carts]
+        )
+
+        failed = []
+        for i, cart in enumerate(carts):
+            if not await cls.recover_cart(db, cart, now, DiscountService.discount_at(batch, i)):
+                failed.append(cart.id)
+        return failed
+
+    @staticmethod
+    async def recover_cart(db, cart: Cart, now: datetime, discount_info: Optional[Dict] = None) -> bool:
+        """
+        Send the recovery message for one cart and mark it as abandoned.
+        `discount_info` comes precomputed on batch runs.
+        """
+        if not cart.items:
+            return False
+
+        try:
+            # 2. Obtener canal de WhatsApp del negocio
+            chan_stmt = select(BusinessChannel).where(
+                BusinessChannel.business_id == cart.business_id,
+                BusinessChannel.channel_type == "WHATSAPP"
+            )
+            chan = (await db.execute(chan_stmt)).scalar_one_or_none()
+
+            if not chan or not chan.token:
+                return False
+
+            # 3. Preparar mensaje de recuperación persuasivo con descuento dinámico
+            from app.services.discount_service import DiscountService
+
+            if discount_info is None:
                 # Get customer history for personalization
                 customer_history = await DiscountService.get_customer_history(db, cart.business_id, cart.user_phone)
-                
+
                 # Calculate personalized discount
                 discount_info = DiscountService.calculate_recovery_discount(
                     cart=cart,
                     urgency_hours=2,
                     customer_history=customer_history
                 )
-                
-                # Generate persuasive message
-                message = DiscountService.generate_recovery_message(cart, discount_info)
-                
-                # 4. Enviar vía MetaService
-                meta = MetaService(chan.token, chan.provider_id)
-                await meta.send_whatsapp_message(cart.user_phone, message)
-                
-                # 5. Marcar como notificado
-                cart.last_notified_at = now
-                cart.status = "abandoned"
-                await db.commit()
-                logger.info(f"Recovery message sent to {cart.user_phone} for business {cart.business_id}")
-                
-            except Exception as e:
-                logger.error(f"Error recovering cart {cart.id}: {e}")
-                
-        return len(abandoned_carts)
+
+            # Generate persuasive message
+            message = DiscountService.generate_recovery_message(cart, discount_info)
+
+            # 4. Enviar vía MetaService
+            meta = MetaService(chan.token, chan.provider_id)
+            await meta.send_whatsapp_message(cart.user_phone, message)
+
+            # 5. Marcar como notificado
+            cart.last_notified_at = now
+            await CartStatusService.set_status(db, cart, "abandoned")
+            await db.commit()
+            logger.info(f"Recovery message sent to {cart.user_phone} for business {cart.business_id}")
+            return True
+
+        except Exception as e:
+            logger.error(f"Error recovering cart {cart.id}: {e}")
+            return False
@@ -0,0 +1,127 @@
+# app/services/timer_wheel.py
+import math
+from typing import Dict, Hashable, List, Optional, Tuple
+
+
+class HierarchicalTimerWheel:
+    """
+    Hierarchical timing wheel (Varghese & Lauck style).
+    Schedule, reschedule and cancel are O(1); expiring a tick costs only the
+    timers that actually fire plus an occasional cascade from the upper levels.
+
+    With the defaults (1s ticks, 4 levels of 64 slots) a single wheel covers
+    ~194 days; farther deadlines are parked on the top level and re-cascaded
+    until they come into range.
+    """
+
+    def __init__(
+        self,
+        tick_seconds: float = 1.0,
+        slots_per_level: int = 64,
+        levels: int = 4,
+        start: float = 0.0
+    ):
+        self.tick_seconds = tick_seconds
+        self.slots_per_level = slots_per_level
+        self.levels = levels
+        self._tick = self._to_tick(start)
+        self._slots: List[List[Dict[Hashable, int]]] = [
+            [dict() for _ in range(slots_per_level)] for _ in range(levels)
+        ]
+        # Timers already due when scheduled; handed out on the next advance()
+        self._due: Dict[Hashable, int] = {}
+        # key -> (level, slot) or None when parked in self._due
+        self._index: Dict[Hashable, Optional[Tuple[int, int]]] = {}
+
+    def _to_tick(self, timestamp: float) -> int:
+        return int(math.floor(timestamp / self.tick_seconds))
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._index
+
+    def _place(self, key: Hashable, deadline_tick: int):
+        delta = deadline_tick - self._tick
+        if delta <= 0:
+            self._due[key] = deadline_tick
+            self._index[key] = None
+            return
+
+        level = self.levels - 1
+        for lvl in range(self.levels):
+            if delta < self.slots_per_level ** (lvl + 1):
+                level = lvl
+                break
+
+        slot = (deadline_tick // self.slots_per_level ** level) % self.slots_per_level
+        self._slots[level][slot][key] = deadline_tick
+        self._index[key] = (level, slot)
+
+    def schedule(self, key: Hashable, deadline: float):
+        """Schedule `key` to fire at `deadline` (seconds), replacing any previous timer."""
+        self.cancel(key)
+        self._place(key, int(math.ceil(deadline / self.tick_seconds)))
+
+    def cancel(self, key: Hashable) -> bool:
+        """Remove the timer for `key`. Returns False if it was not scheduled."""
+        if key not in self._index:
+            return False
+        position = self._index.pop(key)
+        if position is None:
+            self._due.pop(key, None)
+        else:
+            level, slot = position
+            self._slots[level][slot].pop(key, None)
+        return True
+
+    def _cascade(self, level: int):
+        slot = (self._tick // self.slots_per_level ** level) % self.slots_per_level
+        bucket = self._slots[level][slot]
+        if not bucket:
+            return
+        self._slots[level][slot] = {}
+        for key, deadline_tick in bucket.items():
+            self._place(key, deadline_tick)
+
+    def advance(self, now: float) -> List[Hashable]:
+        """
+        Move the wheel forward to `now` (seconds) and return the keys that expired.
+        Expired keys are removed from the wheel.
+        """
+        target = self._to_tick(now)
+        expired: List[Hashable] = []
+
+        if self._due:
+            expired.extend(self._due)
+            for key in self._due:
+                self._index.pop(key, None)
+            self._due = {}
+
+        while self._tick < target:
+            if not self._index:
+                # Nothing pending: jump straight to the target tick
+                self._tick = target
+                break
+
+            self._tick += 1
+            for level in range(self.levels - 1, 0, -1):
+                if self._tick % self.slots_per_level ** level == 0:
+                    self._cascade(level)
+
+            slot = self._tick % self.slots_per_level
+            bucket = self._slots[0][slot]
+            if bucket:
+                self._slots[0][slot] = {}
+                for key in bucket:
+                    self._index.pop(key, None)
+                expired.extend(bucket)
+
+            if self._due:
+                expired.extend(self._due)
+                for key in self._due:
+                    self._index.pop(key, None)
+                self._due = {}
+
+        return expired
@@ -0,0 +1,145 @@
+# app/services/unique_customer_service.py
+import asyncio
+import logging
+from datetime import date, datetime
+from typing import Dict, Optional, Tuple
+from sqlalchemy import select, func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import ANALYTICS_FLUSH_SECONDS
+from app.db.session import AsyncSessionLocal
+from app.models.analytics import DailyUniqueCustomers
+from app.services.analytics_rollup_service import utc_day
+from app.services.analytics_cache import analytics_cache
+from app.services.hyperloglog import HyperLogLog
+
+logger = logging.getLogger(__name__)
+
+UniqueKey = Tuple[int, date, str]  # (business_id, UTC day, channel)
+
+
+class UniqueCustomerCounter:
+    """
+    Approximate unique customers per business, day and channel.
+
+    The chat pipeline calls add() for every inbound message; it only touches
+    an in-memory HyperLogLog, so it costs a hash and no I/O. A background
+    task flushes the registers every `flush_seconds` into
+    analytics_daily_uniques, merging them in SQL with hll_merge() so workers
+    never overwrite each other. Any date range is answered by merging its
+    daily registers: constant memory, no COUNT(DISTINCT) over raw rows.
+    Registers whose flush fails are merged back and written next time.
+    """
+
+    def __init__(self, flush_seconds: float = ANALYTICS_FLUSH_SECONDS):
+        self.flush_seconds = flush_seconds
+        self._pending: Dict[UniqueKey, HyperLogLog] = {}
+        self._flush_lock = asyncio.Lock()
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+    def add(self, business_id: int, customer: str, channel: str, at: Optional[datetime] = None):
+        key = (business_id, utc_day(at), channel)
+        hll = self._pending.get(key)
+        if hll is None:
+            hll = self._pending[key] = HyperLogLog()
+        hll.add(customer)
+
+    async def flush(self) -> int:
+        """Merge pending registers into the database. Returns the number of rows upserted."""
+        async with self._flush_lock:
+            pending, self._pending = self._pending, {}
+            if not pending:
+                return 0
+
+            stmt = insert(DailyUniqueCustomers).values([
+                {"business_id": bid, "day": day, "channel": channel, "registers": hll.to_bytes()}
+                for (bid, day, channel), hll in sorted(pending.items())
+            ])
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["business_id", "day", "channel"],
+                set_={"registers": func.hll_merge(DailyUniqueCustomers.registers, stmt.excluded.registers)}
+            )
+            try:
+                async with AsyncSessionLocal() as db:
+                    await db.execute(stmt)
+                    await db.commit()
+            except Exception as e:
+                logger.warning(f"Error flushing {len(pending)} unique-customer counters, will retry: {e}")
+                self._requeue(pending)
+                return 0
+
+            analytics_cache.bump({bid for bid, _, _ in pending})
+            return len(pending)
+
+    def _requeue(self, failed: Dict[UniqueKey, HyperLogLog]):
+        """Merge registers that could not be written back into the pending ones (merging is idempotent)."""
+        for key, hll in failed.items():
+            pending = self._pending.get(key)
+            if pending is None:
+                self._pending[key] = hll
+            else:
+                pending.merge(hll)
+
+    @staticmethod
+    async def count(
+        db: AsyncSession,
+        business_id: int,
+        start_day: date,
+        end_day: date,
+        channel: Optional[str] = None
+    ) -> Dict:
+        """
+        Approximate unique customers between start_day and end_day (inclusive).
+
+        Counts written in the last flush interval may not be visible yet.
+        """
+        stmt = select(DailyUniqueCustomers.registers).where(
+            DailyUniqueCustomers.business_id == business_id,
+            DailyUniqueCustomers.day.between(start_day, end_day)
+        )
+        if channel:
+            stmt = stmt.where(DailyUniqueCustomers.channel == channel)
+
+        merged = HyperLogLog()
+        for registers in (await db.execute(stmt)).scalars():
+            merged.merge(HyperLogLog(registers))
+
+        return {
+            "period": {
+                "start": start_day.isoformat(),
+                "end": end_day.isoformat()
+            },
+            "channel": channel or "all",
+            "unique_customers": merged.count(),
+            "relative_error": round(merged.relative_error, 4)
+        }
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.flush_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self.flush()
+
+    async def start(self):
+        if self._task:
+            return
+        self._stopping = False
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the background task and flush whatever is still pending."""
+        if self._task:
+            # Let an in-flight flush finish instead of cancelling it mid-write
+            self._stopping = True
+            self._wake.set()
+            await self._task
+            self._task = None
+        await self.flush()
+
+
+unique_customers = UniqueCustomerCounter()
@@ -0,0 +1,48 @@
+# scripts/analytics_retention.py
+"""
+Monthly maintenance of the partitioned analytics tables (run from cron):
+
+    python scripts/analytics_retention.py --keep-months 13 --archive-dir archive/analytics
+
+Creates the upcoming monthly partitions, then archives partitions older than
+--keep-months to <archive-dir>/<partition>.csv.gz and drops them.
+
+Once after migration d5b7e3a1c920, split the pre-partitioning history into
+monthly partitions (copies it online; the final swap blocks writes while it
+re-checks the legacy rows). --dry-run skips it along with retention:
+
+    python scripts/analytics_retention.py --split-legacy
+"""
+import argparse
+import asyncio
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.config import ANALYTICS_RETENTION_MONTHS, ANALYTICS_ARCHIVE_DIR
+from app.services.analytics_partition_service import AnalyticsPartitionService, PARTITIONED_TABLES
+
+async def main(keep_months, archive_dir, dry_run, split_legacy):
+    if split_legacy and not dry_run:
+        for table in PARTITIONED_TABLES:
+            split = await AnalyticsPartitionService.split_legacy_partition(table)
+            print(f"✅ {table}: legacy partition split into {len(split)} monthly partitions")
+
+    created = await AnalyticsPartitionService.ensure_partitions()
+    print(f"✅ {len(created)} partitions created" + (f": {', '.join(created)}" if created else ""))
+
+    if dry_run:
+        return
+    archived = await AnalyticsPartitionService.apply_retention(keep_months, archive_dir)
+    for path in archived:
+        print(f"📦 {path}")
+    print(f"✅ {len(archived)} partitions archived and dropped")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--keep-months", type=int, default=ANALYTICS_RETENTION_MONTHS, help="Months kept online")
+    parser.add_argument("--archive-dir", default=ANALYTICS_ARCHIVE_DIR, help="Where archived partitions are written")
+    parser.add_argument("--dry-run", action="store_true", help="Only create upcoming partitions (no retention, no --split-legacy)")
+    parser.add_argument("--split-legacy", action="store_true", help="Split the pre-partitioning table into months")
+    args = parser.parse_args()
+    asyncio.run(main(args.keep_months, args.archive_dir, args.dry_run, args.split_legacy))
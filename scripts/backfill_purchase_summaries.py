@@ -0,0 +1,21 @@
+# scripts/backfill_purchase_summaries.py
+import argparse
+import asyncio
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.db.session import AsyncSessionLocal
+from app.services.purchase_summary_service import PurchaseSummaryService
+import app.models
+
+async def backfill(business_id):
+    async with AsyncSessionLocal() as db:
+        count = await PurchaseSummaryService.backfill(db, business_id)
+    print(f"✅ {count} purchase summaries rebuilt")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild customer_purchase_summaries from cart history")
+    parser.add_argument("--business-id", type=int, default=None, help="Only rebuild this business")
+    args = parser.parse_args()
+    asyncio.run(backfill(args.business_id))
@@ -0,0 +1,134 @@
+# scripts/explain_cart_indexes.py
+"""
+EXPLAIN-based check for the hot cart/product query indexes.
+
+    python scripts/explain_cart_indexes.py --seed 1000000
+
+--seed creates a throwaway business with N carts (set-based, generate_series)
+before checking. Each hot query must be planned as an index / index-only /
+bitmap index scan on the expected index; exits with status 1 otherwise.
+"""
+import argparse
+import asyncio
+import json
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from app.db.session import engine
+
+SEED_CODE = "__explain_seed__"
+INDEX_NODES = {"Index Scan", "Index Only Scan", "Bitmap Index Scan"}
+
+# (label, query, expected index)
+CHECKS = [
+    (
+        "_get_or_create_cart",
+        "SELECT * FROM carts WHERE business_id = :bid AND user_phone = :phone AND is_active = true",
+        "ix_carts_active_business_phone",
+    ),
+    (
+        "recovery scan",
+        "SELECT * FROM carts WHERE is_active = true AND status = 'active' "
+        "AND last_interaction < now() - interval '1 hour' "
+        "AND (last_notified_at IS NULL OR last_notified_at < now() - interval '24 hours')",
+        "ix_carts_recovery_scan",
+    ),
+    (
+        "cart items",
+        "SELECT * FROM cart_items WHERE cart_id = :cart_id",
+        "ix_cart_items_cart_id",
+    ),
+    (
+        "sellable products",
+        "SELECT * FROM products WHERE business_id = :bid AND is_active = true AND stock > 0",
+        "ix_products_business_active_stock",
+    ),
+]
+
+
+async def seed(conn, carts: int) -> int:
+    bid = (await conn.execute(text("SELECT id FROM businesses WHERE code = :code"), {"code": SEED_CODE})).scalar()
+    if bid:
+        print(f"Seed business already exists (id={bid}), skipping seed.")
+        return bid
+
+    bid = (await conn.execute(text(
+        "INSERT INTO businesses (code, name, is_active) VALUES (:code, 'Explain Seed', true) RETURNING id"
+    ), {"code": SEED_CODE})).scalar()
+    cid = (await conn.execute(text(
+        "INSERT INTO categories (business_id, name, is_active) VALUES (:bid, 'General', true) RETURNING id"
+    ), {"bid": bid})).scalar()
+
+    await conn.execute(text("""
+        INSERT INTO products (business_id, category_id, name, price, stock, is_active)
+        SELECT :bid, :cid, 'Producto ' || g, (g % 200) + 1, g % 50, (g % 10) <> 0
+        FROM generate_series(1, 5000) AS g
+    """), {"bid": bid, "cid": cid})
+
+    # ~2% active carts, the rest closed (paid/abandoned), spread over 90 days
+    await conn.execute(text("""
+        INSERT INTO carts (business_id, user_phone, is_active, status, source, last_interaction)
+        SELECT :bid,
+               '+569' || lpad((g % 200000)::text, 8, '0'),
+               (g % 50) = 0,
+               CASE WHEN (g % 50) = 0 THEN 'active' WHEN (g % 3) = 0 THEN 'abandoned' ELSE 'paid' END,
+               'chat_native',
+               now() - (g % 129600) * interval '1 minute'
+        FROM generate_series(1, :n) AS g
+    """), {"bid": bid, "n": carts})
+
+    await conn.execute(text("""
+        INSERT INTO cart_items (cart_id, product_id, quantity)
+        SELECT c.id, p.min_id + (c.id % 5000), 1 + (c.id % 3)
+        FROM carts c, (SELECT min(id) AS min_id FROM products WHERE business_id = :bid) p
+        WHERE c.business_id = :bid
+    """), {"bid": bid})
+
+    for table in ("carts", "cart_items", "products"):
+        await conn.execute(text(f"ANALYZE {table}"))
+
+    print(f"Seeded business {bid} with {carts} carts.")
+    return bid
+
+
+def index_nodes(plan: dict):
+    if plan.get("Node Type") in INDEX_NODES:
+        yield plan["Node Type"], plan.get("Index Name")
+    for child in plan.get("Plans", []):
+        yield from index_nodes(child)
+
+
+async def main(seed_carts: int) -> int:
+    async with engine.begin() as conn:
+        bid = await seed(conn, seed_carts) if seed_carts else (
+            await conn.execute(text("SELECT business_id FROM carts GROUP BY business_id ORDER BY count(*) DESC LIMIT 1"))
+        ).scalar()
+        if not bid:
+            print("No carts found; run with --seed N.")
+            return 1
+
+        sample = (await conn.execute(text(
+            "SELECT id, user_phone FROM carts WHERE business_id = :bid ORDER BY id DESC LIMIT 1"
+        ), {"bid": bid})).first()
+        params = {"bid": bid, "phone": sample.user_phone, "cart_id": sample.id}
+
+        failures = 0
+        for label, query, expected in CHECKS:
+            raw = (await conn.execute(text(f"EXPLAIN (FORMAT JSON) {query}"), params)).scalar()
+            plan = (json.loads(raw) if isinstance(raw, str) else raw)[0]["Plan"]
+            nodes = list(index_nodes(plan))
+            ok = any(name == expected for _, name in nodes)
+            failures += 0 if ok else 1
+            used = ", ".join(f"{node} on {name}" for node, name in nodes) or plan["Node Type"]
+            print(f"[{'OK' if ok else 'FAIL'}] {label}: {used} (expected {expected})")
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seed", type=int, default=0, help="Seed a throwaway business with N carts first")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.seed)))
@@ -0,0 +1,36 @@
+# scripts/recompute_clv.py
+import argparse
+import asyncio
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import select
+from app.db.session import AsyncSessionLocal
+from app.models.business import Business
+from app.services.analytics_service import AnalyticsService
+import app.models
+
+def report(business_id):
+    def on_progress(done, total):
+        percent = done / total * 100 if total else 100
+        print(f"  business {business_id}: {done}/{total} customers ({percent:.0f}%)")
+    return on_progress
+
+async def recompute(business_id, chunk_size):
+    async with AsyncSessionLocal() as db:
+        if business_id is None:
+            business_ids = (await db.execute(select(Business.id).order_by(Business.id))).scalars().all()
+        else:
+            business_ids = [business_id]
+
+        for bid in business_ids:
+            count = await AnalyticsService.recompute_clv(db, bid, chunk_size, on_progress=report(bid))
+            print(f"✅ Business {bid}: {count} CLV rows recomputed")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recompute customer_lifetime_values from cart history")
+    parser.add_argument("--business-id", type=int, default=None, help="Only recompute this business (default: all)")
+    parser.add_argument("--chunk-size", type=int, default=50000, help="Customers per statement")
+    args = parser.parse_args()
+    asyncio.run(recompute(args.business_id, args.chunk_size))
@@ -0,0 +1,24 @@
+# scripts/reconcile_analytics_rollups.py
+import argparse
+import asyncio
+import sys
+import os
+from datetime import datetime, timedelta
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.db.session import AsyncSessionLocal
+from app.services.analytics_rollup_service import AnalyticsRollupService
+import app.models
+
+async def reconcile(days, business_id):
+    end_day = datetime.utcnow().date()
+    async with AsyncSessionLocal() as db:
+        counts = await AnalyticsRollupService.reconcile(db, end_day - timedelta(days=days), end_day, business_id)
+    print(f"✅ Rollups rebuilt for the last {days} days: {counts['events']} event rows, {counts['ai']} AI rows")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild analytics daily rollups from raw events (run periodically for late events)")
+    parser.add_argument("--days", type=int, default=AnalyticsRollupService.RECONCILE_DAYS, help="Days back to rebuild")
+    parser.add_argument("--business-id", type=int, default=None, help="Only rebuild this business")
+    args = parser.parse_args()
+    asyncio.run(reconcile(args.days, args.business_id))